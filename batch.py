@@ -0,0 +1,306 @@
+"""Solve a batch of instances and stream the results as JSON lines.
+
+Every line of the input file is a JSON object that describes an instance:
+
+    {"balancer": "2x2", "grid": "4x2", "R": 4, "time_limit": 60}
+
+Only `balancer` and `grid` are required. The other keys are `id`, `R`, `costs`,
+`strengthen`, `aggregate`, `break_symmetry`, `cutoff` to skip the job if it
+can't cost less, the solver settings `solver`, `threads`, `time_limit`,
+`gap_rel`, `gap_abs` and `seed`, and `timeout` to override the timeout of the
+batch for this job.
+
+Every finished job appends a line to the output file, so an interrupted batch
+resumes by skipping the jobs that are already in the output.
+
+Usage:
+    python batch.py instances.jsonl results.jsonl --workers 4 --timeout 600
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+import warnings
+from collections import deque
+from multiprocessing import Process, Queue
+from queue import Empty
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from factorizer.cache import DEFAULT_CACHE_DIR, SolutionCache
+from factorizer.models import DEFAULT_MODEL_CACHE_DIR, ModelCache
+from factorizer.portfolio import kill_process_group
+from factorizer.solve import ModelStore, SolveResult, solve_instance
+from factorizer.solvers import SolverConfig
+from factorizer.utils import centered_tiles
+from main import R, c
+
+
+class Job(NamedTuple):
+    """An instance of the batch."""
+
+    id: str
+    spec: Dict
+
+
+def job_id(spec: Dict) -> str:
+    """Get the id of the spec, or a hash of the spec if it has none."""
+    if "id" in spec:
+        return str(spec["id"])
+
+    encoded = json.dumps(spec, sort_keys=True, separators=(",", ":"))
+
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def read_jobs(path: str) -> List[Job]:
+    """Read the specs of the jobs, one JSON object per line."""
+    jobs = []
+
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                spec = json.loads(line)
+                jobs.append(Job(job_id(spec), spec))
+
+    return jobs
+
+
+def finished_jobs(path: str) -> Set[str]:
+    """Get the ids of the jobs in the output file."""
+    if not os.path.exists(path):
+        return set()
+
+    ids = set()
+
+    with open(path) as file:
+        for line in file:
+            try:
+                ids.add(json.loads(line)["id"])
+            except (ValueError, KeyError):
+                # A line cut off by an interrupted batch
+                continue
+
+    return ids
+
+
+def parse_size(value: str) -> Tuple[int, int]:
+    """Parse a size like "2x4"."""
+    (n, m) = value.split("x")
+
+    return int(n), int(m)
+
+
+def solve_spec(
+    spec: Dict,
+    cache: Optional[SolutionCache] = None,
+    models: Optional[ModelStore] = None,
+    model_cache: Optional[ModelCache] = None,
+) -> SolveResult:
+    """Solve the instance of a spec."""
+    (belt_n, belt_m) = parse_size(spec["balancer"])
+    (grid_n, grid_m) = parse_size(spec["grid"])
+
+    solver = SolverConfig(
+        spec.get("solver", "cbc"),
+        threads=spec.get("threads"),
+        time_limit=spec.get("time_limit"),
+        gap_rel=spec.get("gap_rel"),
+        gap_abs=spec.get("gap_abs"),
+        seed=spec.get("seed"),
+    )
+
+    return solve_instance(
+        grid_n,
+        grid_m,
+        centered_tiles(grid_m, belt_n),
+        centered_tiles(grid_m, belt_m),
+        spec.get("R", R),
+        spec.get("costs", c),
+        cache=cache,
+        strengthen=spec.get("strengthen", False),
+        solver=solver,
+        cutoff=spec.get("cutoff"),
+        aggregate=spec.get("aggregate", False),
+        models=models,
+        break_symmetry=spec.get("break_symmetry", False),
+        model_cache=model_cache,
+    )
+
+
+def _run_job(
+    job: Job, cache_dir: Optional[str], model_cache_dir: Optional[str], queue: Queue
+) -> None:
+    # Start a new process group, so the solver can be killed together with us
+    if hasattr(os, "setsid"):
+        os.setsid()
+
+    cache = SolutionCache(cache_dir) if cache_dir is not None else None
+    model_cache = ModelCache(model_cache_dir) if model_cache_dir is not None else None
+
+    try:
+        result = solve_spec(job.spec, cache, model_cache=model_cache)
+        queue.put((job.id, result.to_dict(), None))
+    except Exception as error:
+        queue.put((job.id, None, repr(error)))
+
+
+def run_batch(
+    jobs: List[Job],
+    output: str,
+    workers: int = 1,
+    timeout: Optional[float] = None,
+    cache_dir: Optional[str] = None,
+    model_cache_dir: Optional[str] = None,
+) -> int:
+    """Solve the jobs that aren't in the output yet and append their results.
+
+    Every job runs in its own process, which is killed together with its
+    solver once the job runs longer than its timeout. Of several jobs with the
+    same id, e.g. identical specs without id, only the first one runs.
+
+    Args:
+        jobs: The jobs of the batch.
+        output: The JSON lines file to append the results to.
+        workers: The number of jobs to run at the same time.
+        timeout: The default timeout of a job in seconds.
+        cache_dir: The directory of the solution cache, or None to not use it.
+        model_cache_dir: The directory of the cache of built problems, or None
+            to not use it.
+
+    Returns:
+        The number of jobs that were run.
+    """
+    done = finished_jobs(output)
+    pending: deque = deque()
+    queued: Set[str] = set()
+
+    for job in jobs:
+        if job.id in queued:
+            warnings.warn(f"Skipped a second job with the id {job.id}.")
+        elif job.id not in done:
+            pending.append(job)
+            queued.add(job.id)
+
+    count = len(pending)
+    queue: Queue = Queue()
+    # The process, start time and timeout of the running jobs
+    running: Dict[str, tuple] = {}
+    specs = {job.id: job.spec for job in pending}
+
+    with open(output, "a") as file:
+
+        def write(job_id: str, start: float, record: Dict) -> None:
+            record = {
+                "id": job_id,
+                "spec": specs[job_id],
+                **record,
+                "elapsed": time.perf_counter() - start,
+            }
+            file.write(json.dumps(record) + "\n")
+            file.flush()
+
+        try:
+            while pending or running:
+                while pending and len(running) < workers:
+                    job = pending.popleft()
+                    process = Process(
+                        target=_run_job,
+                        args=(job, cache_dir, model_cache_dir, queue),
+                        daemon=True,
+                    )
+                    process.start()
+                    running[job.id] = (
+                        process,
+                        time.perf_counter(),
+                        job.spec.get("timeout", timeout),
+                    )
+
+                try:
+                    (job_id, result, error) = queue.get(timeout=0.2)
+
+                    # Ignore the late result of a job that timed out
+                    if job_id in running:
+                        (process, start, _) = running.pop(job_id)
+                        process.join()
+                        record = result if error is None else {"status": "Error"}
+                        write(job_id, start, {**record, "error": error})
+                except Empty:
+                    pass
+
+                now = time.perf_counter()
+
+                for (job_id, (process, start, limit)) in list(running.items()):
+                    if limit is not None and now - start > limit:
+                        kill_process_group(process)
+                        del running[job_id]
+                        write(job_id, start, {"status": "Timeout", "error": None})
+                    elif not process.is_alive() and process.exitcode != 0:
+                        del running[job_id]
+                        write(
+                            job_id,
+                            start,
+                            {
+                                "status": "Error",
+                                "error": f"Exited with code {process.exitcode}",
+                            },
+                        )
+        finally:
+            for (process, _, _) in running.values():
+                kill_process_group(process)
+
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser("Factorio belt balancer batch")
+
+    parser.add_argument("specs", help="The JSON lines file of the instances.")
+    parser.add_argument("output", help="The JSON lines file to append the results to.")
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="The number of jobs to run at the same time. Defaults to the number of CPUs.",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Kill a job after this many seconds and record it as timed out.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help="The directory of the solution cache.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't look up or store solutions in the cache.",
+    )
+    parser.add_argument(
+        "--model-cache-dir",
+        default=DEFAULT_MODEL_CACHE_DIR,
+        help="The directory of the cache of built problems.",
+    )
+    parser.add_argument(
+        "--no-model-cache",
+        action="store_true",
+        help="Don't load or store built problems in the model cache.",
+    )
+
+    args = parser.parse_args()
+
+    jobs = read_jobs(args.specs)
+    count = run_batch(
+        jobs,
+        args.output,
+        workers=args.workers,
+        timeout=args.timeout,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        model_cache_dir=None if args.no_model_cache else args.model_cache_dir,
+    )
+
+    print(f"Ran {count} of {len(jobs)} jobs, results in {args.output}.")
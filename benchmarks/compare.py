@@ -0,0 +1,88 @@
+"""Compare two benchmark result files, e.g. of two commits.
+
+Exits with status 1 if a phase got slower than the threshold or a case lost
+its optimal cost.
+
+Usage:
+    python -m benchmarks.compare output/benchmark_quick_abc1234.json output/benchmark_quick_def5678.json
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List
+
+# Phases faster than this are too noisy to compare
+MIN_DURATION = 0.05
+
+
+def compare(base: Dict, head: Dict, threshold: float) -> List[str]:
+    """Get the regressions of head against base."""
+    base_results = {result["case"]: result for result in base["results"]}
+    regressions = []
+
+    for result in head["results"]:
+        if (previous := base_results.get(result["case"])) is None:
+            continue
+
+        name = result["case"]
+
+        if result["status"] != previous["status"]:
+            regressions.append(
+                f"{name}: status {previous['status']} -> {result['status']}"
+            )
+        elif (
+            result["cost"] is not None
+            and previous["cost"] is not None
+            and result["cost"] > previous["cost"] + 1e-6
+        ):
+            regressions.append(
+                f"{name}: cost {previous['cost']:.2f} -> {result['cost']:.2f}"
+            )
+
+        for (phase, duration) in result["times"].items():
+            before = previous["times"].get(phase)
+
+            if before is None or max(before, duration) < MIN_DURATION:
+                continue
+
+            ratio = duration / before
+            line = f"{name}: {phase} {before:.3f}s -> {duration:.3f}s ({ratio:.2f}x)"
+            print(line)
+
+            if ratio > threshold:
+                regressions.append(line)
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser("Compare factorizer benchmarks")
+
+    parser.add_argument("base", help="The results to compare against.")
+    parser.add_argument("head", help="The new results.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="The slowdown factor of a phase that counts as regression.",
+    )
+
+    args = parser.parse_args()
+
+    with open(args.base) as file:
+        base = json.load(file)
+
+    with open(args.head) as file:
+        head = json.load(file)
+
+    print(f"Comparing {head['commit']} against {base['commit']}")
+
+    if regressions := compare(base, head, args.threshold):
+        print("Regressions:")
+
+        for regression in regressions:
+            print(f"  {regression}")
+
+        sys.exit(1)
+
+    print("No regressions.")
@@ -0,0 +1,271 @@
+"""Benchmark the phases of the pipeline over a matrix of instances.
+
+Every phase is timed separately, together with the size of the model and the
+optimal cost, and the results are written to a JSON file.
+Compare two of these files with `benchmarks.compare`.
+
+Usage:
+    python -m benchmarks.run --suite quick
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from dataclasses import asdict
+from datetime import datetime
+from typing import Dict, List, NamedTuple
+
+import pulp
+from pulp import PULP_CBC_CMD, LpSolution, LpStatus, value
+
+from factorizer.aggregate import solve_aggregated
+from factorizer.graph import build_graph
+from factorizer.problem import ModelReport, build_problem
+from factorizer.solution import decode_solution
+from factorizer.solvers import SolverConfig
+from factorizer.utils import centered_tiles
+from factorizer.visualization.blueprint import convert_to_blueprint
+from factorizer.visualization.graph import build_solution_graph
+from main import c
+
+
+class Case(NamedTuple):
+    """A benchmark instance, a balancer on a grid."""
+
+    belt_n: int
+    belt_m: int
+    grid_n: int
+    grid_m: int
+    R: int
+
+    @property
+    def name(self) -> str:
+        return (
+            f"{self.belt_n}x{self.belt_m}-balancer_"
+            f"{self.grid_n}x{self.grid_m}-grid_R{self.R}"
+        )
+
+
+SUITES = {
+    # A few seconds per case, to run on every change
+    "quick": [
+        Case(1, 2, 3, 2, 2),
+        Case(1, 2, 3, 2, 4),
+        Case(2, 2, 3, 3, 3),
+        Case(2, 2, 4, 2, 2),
+        Case(1, 3, 4, 3, 3),
+        Case(1, 4, 3, 4, 3),
+    ],
+    # Up to the time limit per case, to compare formulations and solvers
+    "full": [
+        Case(1, 2, 3, 2, 4),
+        Case(2, 2, 4, 2, 4),
+        Case(1, 3, 5, 3, 3),
+        Case(1, 4, 5, 4, 3),
+        Case(1, 4, 5, 4, 4),
+        Case(2, 4, 5, 4, 3),
+        Case(2, 4, 6, 4, 4),
+        Case(4, 4, 8, 4, 4),
+        Case(4, 4, 10, 4, 4),
+        Case(3, 5, 8, 5, 4),
+        Case(4, 8, 10, 8, 4),
+        Case(8, 8, 12, 8, 4),
+    ],
+}
+
+
+def _timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+
+    return result, time.perf_counter() - start
+
+
+def run_case(
+    case: Case,
+    time_limit: float,
+    presolve: bool = True,
+    strengthen: bool = False,
+    repeat: int = 1,
+    aggregate: bool = False,
+    break_symmetry: bool = False,
+) -> Dict:
+    """Run all phases on one instance.
+
+    The build and export phases are repeated and the fastest time is kept,
+    the solve runs only once. With `aggregate`, the solve goes through
+    relaxations with the total flow of the inputs, whose sizes are recorded.
+    """
+    B = centered_tiles(case.grid_m, case.belt_n)
+    E = centered_tiles(case.grid_m, case.belt_m)
+    times: Dict[str, float] = {}
+
+    def phase(name, function, *args, **kwargs):
+        for _ in range(repeat):
+            (result, duration) = _timed(function, *args, **kwargs)
+            times[name] = min(times.get(name, duration), duration)
+
+        return result
+
+    G = phase("graph", build_graph, case.grid_n, case.grid_m, B, E, case.R)
+
+    def build():
+        report = ModelReport()
+        problem = build_problem(
+            G,
+            c,
+            presolve=presolve,
+            strengthen=strengthen,
+            report=report,
+            break_symmetry=break_symmetry,
+        )
+
+        return problem, report
+
+    ((problem, t, u, s, x, y), report) = phase("problem", build)
+
+    rounds = []
+
+    if aggregate:
+        ((status, rounds), times["solve"]) = _timed(
+            solve_aggregated,
+            problem,
+            G,
+            c,
+            (t, u, s, x, y),
+            SolverConfig(time_limit=time_limit),
+            presolve=presolve,
+            strengthen=strengthen,
+            break_symmetry=break_symmetry,
+        )
+    else:
+        (_, times["solve"]) = _timed(
+            problem.solve, PULP_CBC_CMD(msg=False, timeLimit=time_limit)
+        )
+        status = LpStatus[problem.status]
+
+    solution = LpSolution[problem.sol_status]
+    cost = None
+
+    if status == "Optimal":
+        cost = value(problem.objective)
+
+        decoded = phase("decode", decode_solution, G, t, u, s, x, y)
+        phase("solution_graph", build_solution_graph, G, decoded)
+        phase("blueprint", convert_to_blueprint, decoded)
+
+    return {
+        "case": case.name,
+        **case._asdict(),
+        "presolve": presolve,
+        "strengthen": strengthen,
+        "aggregate": aggregate,
+        "break_symmetry": break_symmetry,
+        "status": status,
+        "solution": solution,
+        "cost": cost,
+        "variables": report.variables,
+        "constraints": report.constraints,
+        "nonzeros": sum(len(row) for row in problem.constraints.values()),
+        "rounds": [asdict(solve_round) for solve_round in rounds],
+        "times": times,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(cases: List[Case], **kwargs) -> Dict:
+    results = []
+
+    for case in cases:
+        result = run_case(case, **kwargs)
+        results.append(result)
+
+        cost = f"{result['cost']:.2f}" if result["cost"] is not None else "-"
+        phases = ", ".join(
+            f"{name} {duration:.3f}s" for (name, duration) in result["times"].items()
+        )
+        print(f"{case.name}: {result['status']} (cost {cost}) {phases}")
+
+    return {
+        "commit": _git_commit(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pulp": pulp.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "settings": kwargs,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser("Factorizer benchmarks")
+
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    parser.add_argument(
+        "--case",
+        action="append",
+        default=[],
+        help="Only run the cases with this name, can be given multiple times.",
+    )
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        default=300,
+        help="The time limit of the solver per case in seconds.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="How often to repeat the build and export phases.",
+    )
+    parser.add_argument("--no-presolve", action="store_true")
+    parser.add_argument("--strengthen", action="store_true")
+    parser.add_argument("--aggregate", action="store_true")
+    parser.add_argument("--break-symmetry", action="store_true")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="The file to write the results to. "
+        "Defaults to output/benchmark_<suite>_<commit>.json.",
+    )
+
+    args = parser.parse_args()
+
+    cases = [
+        case for case in SUITES[args.suite] if not args.case or case.name in args.case
+    ]
+    results = run_suite(
+        cases,
+        time_limit=args.time_limit,
+        presolve=not args.no_presolve,
+        strengthen=args.strengthen,
+        aggregate=args.aggregate,
+        break_symmetry=args.break_symmetry,
+        repeat=args.repeat,
+    )
+
+    output = args.output or os.path.join(
+        "output", f"benchmark_{args.suite}_{results['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+
+    with open(output, "w") as file:
+        json.dump(results, file, indent=2)
+
+    print(f"Saved results to {output}")
@@ -0,0 +1,76 @@
+"""Measure the startup time of the entry points.
+
+Every command runs in a fresh interpreter. The best wall time of several runs
+is reported, together with the heavy libraries the command imported.
+
+Usage:
+    python -m benchmarks.startup
+"""
+import argparse
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+# The libraries that dominate the import time
+HEAVY_LIBRARIES = ["matplotlib", "pulp", "networkx", "numpy"]
+
+COMMANDS = {
+    "main.py --help": ["main.py", "--help"],
+    "import main": ["-c", "import main"],
+    "import batch": ["-c", "import batch"],
+    "import factorizer.cache": ["-c", "import factorizer.cache"],
+    "import factorizer.solve": ["-c", "import factorizer.solve"],
+}
+
+
+def _imported_libraries(arguments: List[str]) -> List[str]:
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", *arguments],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Lines look like "import time:  self [us] | cumulative | package.module"
+    packages = {
+        line.rsplit("|", 1)[-1].strip().split(".")[0]
+        for line in process.stderr.splitlines()
+    }
+
+    return [library for library in HEAVY_LIBRARIES if library in packages]
+
+
+def measure(arguments: List[str], repeat: int) -> Dict:
+    """Get the best wall time of the command and the heavy libraries it imports."""
+    best = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *arguments], stdout=subprocess.DEVNULL, check=True
+        )
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+
+    return {"time": best, "libraries": _imported_libraries(arguments)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser("Measure the startup time of factorizer")
+
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Run every command this many times and keep the fastest.",
+    )
+
+    args = parser.parse_args()
+
+    baseline = measure(["-c", "pass"], args.repeat)["time"]
+    print(f"{'interpreter':<26}{baseline * 1000:>7.0f} ms")
+
+    for (name, arguments) in COMMANDS.items():
+        result = measure(arguments, args.repeat)
+        libraries = ", ".join(result["libraries"]) or "-"
+        print(f"{name:<26}{result['time'] * 1000:>7.0f} ms   {libraries}")
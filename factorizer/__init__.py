@@ -2,3 +2,10 @@
 D = ["right", "left", "up", "down"]
 # Splitter fragments
 F_s = ["left", "right"]
+# Entities of a tile in a decoded solution
+EMPTY = 0
+TRANSPORT = 1
+UNDERGROUND_INPUT = 2
+UNDERGROUND_OUTPUT = 3
+SPLITTER_LEFT = 4
+SPLITTER_RIGHT = 5
@@ -0,0 +1,197 @@
+"""Solve with a flow model of fewer commodities and add inputs as needed.
+
+The flow model has one commodity per input, which dominates its size. Here the
+inputs are aggregated into one commodity of their total flow, which the belts
+and splitters carry like every input, and only some inputs keep their own
+commodity to be balanced. This is a relaxation of the full model: the total
+flow and the modelled inputs of every balancer satisfy it.
+
+Every round solves the relaxation and certifies its layout by fixing the
+entities and arcs of the full model, which then only has to find the flows.
+If the layout is a balancer, it is optimal for the full model as well.
+Otherwise, the simulator finds the input that is balanced the worst, which gets
+its own commodity in the next round. The total flow and all but one input
+determine the last input, so the rounds end with at most |B| commodities.
+"""
+import time
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from factorizer.problem import TOTAL, ModelReport, build_problem
+from factorizer.simulate import simulate
+from factorizer.solution import decode_solution
+from factorizer.solvers import SolverConfig, make_solver, solve_status
+
+if TYPE_CHECKING:
+    import networkx as nx
+    import pulp
+
+
+@dataclass
+class AggregateRound:
+    """A solved relaxation."""
+
+    # The commodities of the relaxation
+    commodities: List
+    variables: int
+    constraints: int
+    status: str
+    cost: Optional[float]
+    # Is the layout of the relaxation feasible for the full model?
+    certified: bool
+    time: float
+
+
+def _worst_input(G: "nx.DiGraph", variables: Tuple, candidates: List) -> object:
+    """Get the input among the candidates whose items the layout balances the worst."""
+    B = G.graph["B"]
+    E = G.graph["E"]
+    simulation = simulate(decode_solution(G, *variables))
+    imbalance = np.abs(simulation.shares - 1 / len(E)).max(axis=0)
+    imbalance += simulation.leaked
+
+    return max(candidates, key=lambda b: imbalance[B.index(b)])
+
+
+def _certify(
+    problem: "pulp.LpProblem",
+    variables: Tuple,
+    relaxed: Tuple,
+    solver: SolverConfig,
+) -> bool:
+    """Solve the full problem with the entities and arcs of the relaxation.
+
+    Afterwards, the variables hold the flows of the layout if it is feasible.
+    """
+    (t, u, s, _, y) = variables
+    fixed: Dict = {}
+
+    for (dicts, relaxed_dicts) in zip((t, u, s, y), relaxed[:3] + relaxed[4:]):
+        for (key, variable) in dicts.items():
+            fixed[variable] = (variable.lowBound, variable.upBound)
+            value = round(relaxed_dicts[key].value() or 0)
+            variable.lowBound = variable.upBound = value
+
+    try:
+        problem.solve(make_solver(solver))
+
+        return solve_status(problem) in ("Optimal", "Feasible")
+    finally:
+        for (variable, (low, up)) in fixed.items():
+            variable.lowBound = low
+            variable.upBound = up
+
+
+def _remaining(solver: SolverConfig, start: float) -> Optional[SolverConfig]:
+    """Get the solver with the rest of its time limit, None once it is used up."""
+    if solver.time_limit is None:
+        return solver
+
+    rest = solver.time_limit - (time.perf_counter() - start)
+
+    return replace(solver, time_limit=rest) if rest > 0 else None
+
+
+def solve_aggregated(
+    problem: "pulp.LpProblem",
+    G: "nx.DiGraph",
+    c: Dict,
+    variables: Tuple,
+    solver: Optional[SolverConfig] = None,
+    presolve: bool = True,
+    strengthen: bool = False,
+    break_symmetry: bool = False,
+    log_path: Optional[str] = None,
+    on_round: Optional[Callable[[AggregateRound], None]] = None,
+) -> Tuple[str, List[AggregateRound]]:
+    """Solve the problem through relaxations with fewer commodities.
+
+    Afterwards, the variables hold the solution.
+
+    Args:
+        problem: The full problem of G.
+        G: The graph of the instance.
+        c: The costs of the instance.
+        variables: The variable dicts t, u, s, x and y of the problem.
+        solver: The solver backend and its settings. Its time limit bounds all
+            rounds together. Defaults to CBC.
+        presolve: Build the relaxations with presolve.
+        strengthen: Build the relaxations with the strengthened formulation.
+        break_symmetry: Build the relaxations with symmetry breaking, which
+            the full problem needs to have as well.
+        log_path: Write the solver log of the relaxations here.
+        on_round: Called with every solved relaxation.
+
+    Returns:
+        The status and the solved relaxations, none for up to two inputs.
+    """
+    if solver is None:
+        solver = SolverConfig()
+
+    B = G.graph["B"]
+    rounds: List[AggregateRound] = []
+    start = time.perf_counter()
+
+    # With up to two inputs, the total flow doesn't save a commodity
+    if len(B) <= 2:
+        problem.solve(make_solver(solver, log_path=log_path))
+
+        return solve_status(problem), rounds
+
+    commodities = [TOTAL, B[0]]
+
+    while True:
+        if (round_solver := _remaining(solver, start)) is None:
+            return "Not Solved", rounds
+
+        round_start = time.perf_counter()
+        report = ModelReport()
+        (relaxation, *relaxed) = build_problem(
+            G,
+            c,
+            presolve=presolve,
+            strengthen=strengthen,
+            report=report,
+            break_symmetry=break_symmetry,
+            commodities=commodities,
+        )
+        relaxation.solve(make_solver(round_solver, log_path=log_path))
+        status = solve_status(relaxation)
+        solved = status in ("Optimal", "Feasible")
+        # The certification shares the time limit with the relaxations
+        certify_solver = _remaining(solver, start)
+        certified = (
+            solved
+            and certify_solver is not None
+            and _certify(problem, variables, relaxed, certify_solver)
+        )
+
+        solve_round = AggregateRound(
+            list(commodities),
+            report.variables,
+            report.constraints,
+            status,
+            relaxation.objective.value() if solved else None,
+            certified,
+            time.perf_counter() - round_start,
+        )
+        rounds.append(solve_round)
+
+        if on_round is not None:
+            on_round(solve_round)
+
+        if not solved or certified:
+            return status, rounds
+
+        if certify_solver is None:
+            return "Not Solved", rounds
+
+        candidates = [b for b in B if b not in commodities]
+
+        # Only numerical trouble can reject the layout of the exact relaxation
+        if not candidates:
+            return "Not Solved", rounds
+
+        commodities.append(_worst_input(G, relaxed, candidates))
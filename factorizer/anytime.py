@@ -0,0 +1,313 @@
+"""Solve in rounds and save every improved solution as soon as it is found.
+
+CBC only returns its solution once it stops, so the solve runs in rounds with
+growing time limits instead. Every round starts from the best solution so far,
+which also gives the solver its cost as cutoff. Whenever a round improves the
+solution, it is decoded and saved at once as `incumbent_<k>.txt` with the
+blueprint string, and its cost, bound and gap are appended to
+`incumbents.jsonl`. The best solution is always saved as `blueprint.txt`, also
+when the run is interrupted or terminated.
+
+Every round runs in its own process group, which is killed together with the
+solver when the run is interrupted or terminated, instead of leaving the solver
+running until the end of its round.
+"""
+import json
+import os
+import signal
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, replace
+from multiprocessing import Process, Queue
+from queue import Empty
+from typing import TYPE_CHECKING, Callable, Iterator, List, Optional, Tuple
+
+from factorizer.assignment import Assignment, extract_assignment
+from factorizer.instrument import parse_cbc_log
+from factorizer.portfolio import kill_process_group
+from factorizer.solution import decode_solution
+from factorizer.solvers import SolverConfig, make_solver, solve_status
+from factorizer.visualization.blueprint import convert_to_blueprint
+from factorizer.warmstart import apply_warm_start
+
+if TYPE_CHECKING:
+    import networkx as nx
+    import pulp
+
+# The time limit of the first round in seconds, every further round gets
+# `DEFAULT_GROWTH` times as much
+DEFAULT_FIRST_ROUND = 10.0
+DEFAULT_GROWTH = 2.0
+
+
+@dataclass
+class Incumbent:
+    """An improved solution, saved as `path`."""
+
+    index: int
+    cost: float
+    # The lower bound on the cost of the solver, if it reported one
+    bound: Optional[float]
+    # The relative gap between the cost and the bound
+    gap: Optional[float]
+    # The seconds since the start of the first round
+    time: float
+    path: str
+
+
+@contextmanager
+def _interrupt_on_terminate() -> Iterator[None]:
+    """Raise KeyboardInterrupt on SIGTERM, so that the best solution is saved."""
+
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt
+
+    try:
+        previous = signal.signal(signal.SIGTERM, interrupt)
+    except ValueError:
+        # Signal handlers can only be set in the main thread
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+
+def _run_round(
+    problem: "pulp.LpProblem",
+    variables: Tuple,
+    solver: SolverConfig,
+    warm_start: bool,
+    log_path: Optional[str],
+    queue: Queue,
+) -> None:
+    # Start a new process group, so the solver can be killed together with us
+    if hasattr(os, "setsid"):
+        os.setsid()
+
+    # Die quietly with the solver, not with the handler of the parent
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    try:
+        problem.solve(make_solver(solver, warm_start=warm_start, log_path=log_path))
+        queue.put(
+            (problem.status, problem.sol_status, extract_assignment(*variables), None)
+        )
+    except Exception as error:
+        queue.put((None, None, None, repr(error)))
+
+
+def _solve_round(
+    problem: "pulp.LpProblem",
+    variables: Tuple,
+    solver: SolverConfig,
+    warm_start: bool,
+    log_path: Optional[str],
+) -> str:
+    """Solve the problem in a child process and copy its solution back.
+
+    Returns:
+        The status of the round.
+    """
+    queue: Queue = Queue()
+    process = Process(
+        target=_run_round,
+        args=(problem, variables, solver, warm_start, log_path, queue),
+        daemon=True,
+    )
+    process.start()
+
+    try:
+        while True:
+            try:
+                (status, sol_status, assignment, error) = queue.get(timeout=0.5)
+                break
+            except Empty:
+                # The result is sent before the process exits
+                if not process.is_alive():
+                    try:
+                        (status, sol_status, assignment, error) = queue.get(timeout=1)
+                        break
+                    except Empty:
+                        raise RuntimeError("The solver process died without result.")
+    finally:
+        kill_process_group(process)
+
+    if error is not None:
+        raise RuntimeError(f"The round failed: {error}")
+
+    problem.status = status
+    problem.sol_status = sol_status
+    apply_warm_start(assignment, *variables)
+
+    return solve_status(problem)
+
+
+def _bound(log_path: Optional[str], status: str, cost: float) -> Optional[float]:
+    if status == "Optimal":
+        return cost
+
+    if log_path is None or not os.path.exists(log_path):
+        return None
+
+    with open(log_path) as file:
+        return parse_cbc_log(file.read()).get("lower_bound")
+
+
+def solve_anytime(
+    problem: "pulp.LpProblem",
+    G: "nx.DiGraph",
+    variables: Tuple,
+    output_dir: str,
+    solver: Optional[SolverConfig] = None,
+    first_round: float = DEFAULT_FIRST_ROUND,
+    growth: float = DEFAULT_GROWTH,
+    warm_start: Optional[Assignment] = None,
+    on_incumbent: Optional[Callable[[Incumbent], None]] = None,
+) -> Tuple[str, Optional[float], List[Incumbent]]:
+    """Solve the problem in rounds and save every improved solution.
+
+    Afterwards, the variables hold the best solution.
+
+    Args:
+        problem: The problem of G.
+        G: The graph of the instance.
+        variables: The variable dicts t, u, s, x and y of the problem.
+        output_dir: Save the incumbents and the best blueprint here.
+        solver: The solver backend and its settings. Its time limit bounds all
+            rounds together; without one, the rounds go on until the solution
+            is proven optimal. Defaults to CBC.
+        first_round: The time limit of the first round in seconds.
+        growth: The factor by which the time limit grows every round.
+        warm_start: An initial solution for the first round.
+        on_incumbent: Called with every improved solution once it is saved.
+
+    Returns:
+        The status, the cost of the best solution and all improved solutions.
+    """
+    if solver is None:
+        solver = SolverConfig()
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Start over from the first incumbent, without the log of an earlier run
+    for name in os.listdir(output_dir):
+        if name.startswith("incumbent_") or name in ("incumbents.jsonl", "cbc.log"):
+            os.remove(os.path.join(output_dir, name))
+
+    # The bound is read from the log, which only CBC writes
+    is_cbc = solver.backend in ("cbc", "coin")
+    log_path = os.path.join(output_dir, "cbc.log") if is_cbc else None
+    incumbents: List[Incumbent] = []
+    best = warm_start
+    best_blueprint = None
+    bound = None
+    status = "Not Solved"
+    start = time.perf_counter()
+    round_limit = first_round
+
+    def remaining() -> Optional[float]:
+        if solver.time_limit is None:
+            return None
+
+        return solver.time_limit - (time.perf_counter() - start)
+
+    def gap(cost: float) -> Optional[float]:
+        return (cost - bound) / abs(cost) if bound is not None and cost else None
+
+    try:
+        with _interrupt_on_terminate():
+            last = False
+
+            while status != "Optimal" and not last:
+                limit = round_limit
+                round_limit *= growth
+
+                # The last round takes the rest of the time, instead of leaving
+                # a round too short to find anything
+                if (rest := remaining()) is not None and rest < limit + round_limit:
+                    if rest <= 0:
+                        break
+
+                    (limit, last) = (rest, True)
+
+                use_warm_start = best is not None and apply_warm_start(best, *variables)
+                round_status = _solve_round(
+                    problem,
+                    variables,
+                    replace(solver, time_limit=limit),
+                    use_warm_start,
+                    log_path,
+                )
+
+                if round_status in ("Infeasible", "Unbounded"):
+                    status = round_status
+                    break
+
+                if round_status not in ("Optimal", "Feasible"):
+                    continue
+
+                status = round_status
+                cost = problem.objective.value()
+
+                # Every round proves its bound for the whole problem
+                if (round_bound := _bound(log_path, round_status, cost)) is not None:
+                    bound = round_bound if bound is None else max(bound, round_bound)
+
+                if incumbents and cost >= incumbents[-1].cost - 1e-9:
+                    continue
+
+                best = extract_assignment(*variables)
+                best_blueprint = convert_to_blueprint(decode_solution(G, *variables))
+                index = len(incumbents) + 1
+                path = os.path.join(output_dir, f"incumbent_{index:03d}.txt")
+
+                with open(path, "w") as file:
+                    file.write(best_blueprint)
+
+                incumbent = Incumbent(
+                    index, cost, bound, gap(cost), time.perf_counter() - start, path
+                )
+                incumbents.append(incumbent)
+
+                with open(os.path.join(output_dir, "incumbents.jsonl"), "a") as file:
+                    file.write(json.dumps(asdict(incumbent)) + "\n")
+
+                if on_incumbent is not None:
+                    on_incumbent(incumbent)
+    except KeyboardInterrupt:
+        status = "Interrupted"
+    finally:
+        # Save the best solution also on errors
+        if incumbents:
+            cost = incumbents[-1].cost
+
+            with open(os.path.join(output_dir, "blueprint.txt"), "w") as file:
+                file.write(best_blueprint)
+
+            with open(os.path.join(output_dir, "best.json"), "w") as file:
+                json.dump(
+                    {
+                        "status": status,
+                        "cost": cost,
+                        "bound": bound,
+                        "gap": gap(cost),
+                        "time": time.perf_counter() - start,
+                        "incumbents": len(incumbents),
+                    },
+                    file,
+                    indent=2,
+                )
+
+    if not incumbents:
+        return status, None, incumbents
+
+    apply_warm_start(best, *variables)
+
+    return (
+        ("Optimal" if status == "Optimal" else "Feasible"),
+        incumbents[-1].cost,
+        incumbents,
+    )
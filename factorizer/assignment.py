@@ -0,0 +1,84 @@
+"""Solved variable values, detached from the PuLP problem they come from.
+
+An assignment maps the names of the variable dicts ("t", "u", "s", "x", "y") to
+the keys of all variables with a non-zero value and their values.
+"""
+from typing import Dict, List, Tuple
+
+from factorizer.utils import opposite_dir
+
+Assignment = Dict[str, Dict[Tuple, float]]
+
+VARIABLE_NAMES = ["t", "u", "s", "x", "y"]
+
+
+def extract_assignment(t, u, s, x, y) -> Assignment:
+    """Get the non-zero values of the solved variables."""
+    assignment = {}
+
+    for (name, variables) in zip(VARIABLE_NAMES, (t, u, s, x, y)):
+        values = {}
+
+        for (key, variable) in variables.items():
+            if value := variable.value():
+                values[key] = value
+
+        assignment[name] = values
+
+    return assignment
+
+
+def mirror_assignment(assignment: Assignment, m: int) -> Assignment:
+    """Mirror the assignment of a grid with height m vertically.
+
+    Up and down are swapped, and so are the splitter fragments, because the
+    right fragment is the one with the upwards splitter arc.
+    """
+
+    def node(v):
+        return v[0], (m - 1) - v[1]
+
+    def arc(a):
+        return node(a[0]), node(a[1])
+
+    def direction(d: str) -> str:
+        return opposite_dir(d) if d in ("up", "down") else d
+
+    return {
+        "t": {node(v): value for (v, value) in assignment["t"].items()},
+        "u": {
+            (node(v), direction(d), r): value
+            for ((v, d, r), value) in assignment["u"].items()
+        },
+        "s": {
+            (node(v), opposite_dir(f)): value
+            for ((v, f), value) in assignment["s"].items()
+        },
+        "x": {
+            (arc(a), (m - 1) - b): value for ((a, b), value) in assignment["x"].items()
+        },
+        "y": {arc(a): value for (a, value) in assignment["y"].items()},
+    }
+
+
+def _to_tuple(key):
+    if isinstance(key, list):
+        return tuple(_to_tuple(part) for part in key)
+
+    return key
+
+
+def assignment_to_json(assignment: Assignment) -> Dict[str, List]:
+    """Convert the assignment to JSON compatible lists of [key, value] pairs."""
+    return {
+        name: [[key, value] for (key, value) in values.items()]
+        for (name, values) in assignment.items()
+    }
+
+
+def assignment_from_json(data: Dict[str, List]) -> Assignment:
+    """Convert the output of `assignment_to_json` back to an assignment."""
+    return {
+        name: {_to_tuple(key): value for (key, value) in values}
+        for (name, values) in data.items()
+    }
@@ -0,0 +1,220 @@
+"""A persistent on-disk cache for solved instances.
+
+Entries are keyed by a hash of the instance parameters.
+A vertically mirrored instance is served from the same entry by mirroring the
+cached solution.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from factorizer.assignment import (
+    assignment_from_json,
+    assignment_to_json,
+    mirror_assignment,
+)
+from factorizer.result import SolveResult
+from factorizer.visualization.blueprint import mirror_blueprint
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "factorizer",
+    "solutions",
+)
+
+
+def instance_key(n: int, m: int, B: List[int], E: List[int], R: int, c: Dict) -> str:
+    """Get the canonical hash of an instance."""
+    instance = {
+        "n": n,
+        "m": m,
+        "B": sorted(B),
+        "E": sorted(E),
+        "R": R,
+        "c": {name: float(cost) for (name, cost) in sorted(c.items())},
+    }
+    encoded = json.dumps(instance, sort_keys=True, separators=(",", ":"))
+
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _mirror_rows(rows: List[int], m: int) -> List[int]:
+    return sorted((m - 1) - row for row in rows)
+
+
+class SolutionCache:
+    """Cache solved instances as JSON files in a directory.
+
+    Every hit refreshes the modification time of the entry, so eviction removes
+    the least recently used entries first.
+
+    Args:
+        directory: The directory to store the entries in.
+        max_entries: The maximum number of entries to keep.
+        max_bytes: The maximum total size of the entries.
+        max_age: The maximum time in seconds since an entry was last used.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_CACHE_DIR,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        max_age: Optional[float] = None,
+    ):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _read(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+
+        try:
+            with open(path) as file:
+                entry = json.load(file)
+
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        return entry
+
+    def get(
+        self, n: int, m: int, B: List[int], E: List[int], R: int, c: Dict
+    ) -> Optional[SolveResult]:
+        """Get the cached result of the instance, if available."""
+        start = time.perf_counter()
+        mirrored = False
+        entry = self._read(instance_key(n, m, B, E, R, c))
+
+        if entry is None:
+            mirrored = True
+            mirror_key = instance_key(
+                n, m, _mirror_rows(B, m), _mirror_rows(E, m), R, c
+            )
+            entry = self._read(mirror_key)
+
+        if entry is None:
+            return None
+
+        result = SolveResult(n, m, list(B), list(E), R, entry["status"])
+        result.cost = entry["cost"]
+        result.blueprint = entry["blueprint"]
+
+        if entry["assignment"] is not None:
+            result.assignment = assignment_from_json(entry["assignment"])
+
+        if mirrored and result.feasible:
+            result.blueprint = mirror_blueprint(result.blueprint, m)
+            result.assignment = mirror_assignment(result.assignment, m)
+
+        result.times["cache"] = time.perf_counter() - start
+
+        return result
+
+    def put(self, result: SolveResult, c: Dict) -> None:
+        """Store the result of a solved instance.
+
+        Only results with a proven status (optimal or infeasible) are cached.
+        """
+        if result.status not in ("Optimal", "Infeasible"):
+            return
+
+        key = instance_key(result.n, result.m, result.B, result.E, result.R, c)
+        entry = {
+            "status": result.status,
+            "cost": result.cost,
+            "blueprint": result.blueprint,
+            "assignment": (
+                assignment_to_json(result.assignment)
+                if result.assignment is not None
+                else None
+            ),
+        }
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write atomically, other processes might read the entry at the same time
+        (fd, tmp_path) = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+
+        with os.fdopen(fd, "w") as file:
+            json.dump(entry, file)
+
+        os.replace(tmp_path, path)
+
+        self.evict()
+
+    def evict(self) -> int:
+        """Remove expired entries and the least recently used ones over the limits.
+
+        Returns:
+            The number of removed entries.
+        """
+        return evict_entries(
+            self.directory, ".json", self.max_entries, self.max_bytes, self.max_age
+        )
+
+
+def evict_entries(
+    directory: str,
+    suffix: str,
+    max_entries: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    max_age: Optional[float] = None,
+) -> int:
+    """Remove expired files and the least recently used ones over the limits.
+
+    Only the files in the directory whose names end with the suffix count.
+
+    Returns:
+        The number of removed files.
+    """
+    if max_entries is None and max_bytes is None and max_age is None:
+        return 0
+
+    entries = []
+
+    for (root, _, files) in os.walk(directory):
+        for name in files:
+            if not name.endswith(suffix):
+                continue
+
+            path = os.path.join(root, name)
+
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    # Most recently used first
+    entries.sort(reverse=True)
+
+    now = time.time()
+    total_bytes = 0
+    removed = 0
+
+    for (i, (mtime, size, path)) in enumerate(entries):
+        total_bytes += size
+
+        if (
+            (max_age is not None and now - mtime > max_age)
+            or (max_entries is not None and i >= max_entries)
+            or (max_bytes is not None and total_bytes > max_bytes)
+        ):
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+
+    return removed
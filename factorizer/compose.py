@@ -0,0 +1,483 @@
+"""Build large balancers by composing solved smaller ones.
+
+An NxM balancer is built in two stages. The first stage are p blocks of
+(N/p)xq balancers, the second stage q blocks of px(M/q) balancers. The output
+k of the block i of the first stage is connected to the input i of the block k
+of the second stage. Every output of a first stage block gets 1/q of each of
+its inputs, which the second stage block spreads evenly over its M/q outputs,
+so every output gets 1/M of every input. Blocks that are still too large are
+composed the same way, so 8x8 is built from 4x4 blocks, which are built from
+2x2 blocks.
+
+The lanes between the stages are permuted by rounds of small routing problems,
+like an odd-even transposition sort: every round swaps neighbouring lanes, each
+pair at the edge of its own window of a few rows. Only a handful of different
+windows occur, so each is routed once. The routing problems are the usual problem without
+splitters, where every start point has to reach one given end point.
+"""
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from factorizer import (
+    D,
+    EMPTY,
+    SPLITTER_LEFT,
+    SPLITTER_RIGHT,
+    TRANSPORT,
+    UNDERGROUND_INPUT,
+    UNDERGROUND_OUTPUT,
+)
+from factorizer.graph import build_graph
+from factorizer.problem import ModelReport, build_problem
+from factorizer.result import SolveResult
+from factorizer.solution import Solution, decode_solution, solution_from_blueprint
+from factorizer.solve import solve_instance
+from factorizer.solvers import SolverConfig, make_solver, solve_status
+from factorizer.utils import centered_tiles
+from factorizer.visualization.blueprint import convert_to_blueprint, parse_blueprint
+
+if TYPE_CHECKING:
+    from factorizer.cache import SolutionCache
+
+# Solve blocks with at most this many inputs and outputs directly
+DEFAULT_BLOCK_SIZE = 2
+
+# The number of rows of the routing windows
+DEFAULT_WINDOW = 4
+
+# Give up on a block or a routing window that doesn't fit into this width
+DEFAULT_MAX_WIDTH = 12
+
+
+def choose_factors(belt_n: int, belt_m: int) -> Tuple[int, int]:
+    """Choose the number of blocks p and q of the two stages.
+
+    The blocks must have at most as many inputs as outputs, like every
+    balancer of the problem. Of the valid choices, the one with the smallest
+    blocks is used.
+
+    Raises:
+        ValueError: If the balancer can't be split into smaller blocks.
+    """
+    size = max(belt_n, belt_m)
+    best = None
+
+    for p in range(1, belt_n + 1):
+        for q in range(1, belt_m + 1):
+            if belt_n % p or belt_m % q:
+                continue
+
+            first = (belt_n // p, q)
+            second = (p, belt_m // q)
+
+            if first[0] > first[1] or second[0] > second[1]:
+                continue
+
+            block = max(*first, *second)
+
+            if block >= size:
+                continue
+
+            height = max(p * max(first), q * max(second))
+            key = (block, height, p)
+
+            if best is None or key < best[0]:
+                best = (key, (p, q))
+
+    if best is None:
+        raise ValueError(f"The {belt_n}x{belt_m} balancer can't be composed of blocks.")
+
+    return best[1]
+
+
+def sort_rounds(
+    targets: List[int], window: int
+) -> List[List[Tuple[int, List[int], List[int]]]]:
+    """Sort the lanes into their target rows by swapping neighbouring lanes.
+
+    Every round swaps lanes in the wrong order, each pair in its own window of
+    neighbouring rows. The pairs are put in the first or last two rows of their
+    window where possible, because routing problems with the pair in the
+    middle of the window, with two pairs or with less rows take much longer to
+    solve.
+
+    Args:
+        targets: The target row of the lane in each row, a permutation of the rows.
+        window: The number of rows of a window, at least 3.
+
+    Returns:
+        The rounds with their windows, as the first row of the window and the
+        targets of its lanes before and after the round.
+    """
+    if window < 3:
+        raise ValueError("The windows need at least 3 rows.")
+
+    height = len(targets)
+    window = min(window, height)
+    rows = list(targets)
+    rounds = []
+
+    while rows != sorted(rows):
+        used = [False] * height
+        changes = []
+
+        for k in range(height - 1):
+            if rows[k] < rows[k + 1]:
+                continue
+
+            # Prefer the windows with the pair at their edge
+            for low in (k, k + 2 - window, *range(k - 1, k + 2 - window, -1)):
+                high = low + window
+
+                if 0 <= low and high <= height and not any(used[low:high]):
+                    before = rows[low:high]
+                    (rows[k], rows[k + 1]) = (rows[k + 1], rows[k])
+                    changes.append((low, before, rows[low:high]))
+                    used[low:high] = [True] * window
+                    break
+
+        if not changes:
+            raise ValueError("Two lanes can't swap on less than 3 rows.")
+
+        rounds.append(changes)
+
+    return rounds
+
+
+def route_lanes(
+    moves: Dict[int, int],
+    height: int,
+    R: int,
+    c: Dict,
+    solver: Optional[SolverConfig] = None,
+    max_width: int = DEFAULT_MAX_WIDTH,
+) -> Solution:
+    """Find the cheapest layout of the narrowest grid that moves every lane.
+
+    Args:
+        moves: The target row of the lane in each row of the grid that has one.
+        height: The height of the grid.
+        R: Maximum range of underground belts.
+        c: The costs of the instance.
+        solver: The solver backend and its settings. Defaults to CBC.
+        max_width: The width of the widest grid to try.
+
+    Raises:
+        ValueError: If the lanes can't be moved on a grid up to `max_width`.
+    """
+    if solver is None:
+        solver = SolverConfig()
+
+    B = sorted(moves)
+    E = sorted(moves.values())
+
+    for n in range(1, max_width + 1):
+        G = build_graph(n, height, B, E, R)
+        report = ModelReport()
+        (problem, t, u, s, x, y) = build_problem(G, c, presolve=True, report=report)
+        x_keys = {variable.name: key for (key, variable) in x.items()}
+
+        # Every lane goes to its target instead of being split over all end points
+        for (name, constraint) in problem.constraints.items():
+            if report.constraint_families[name] == "demand":
+                ((variable, _),) = constraint.items()
+                ((_, (_, e)), b) = x_keys[variable.name]
+                constraint.constant = -len(E) if moves[b] == e else 0
+
+        for variable in s.values():
+            variable.upBound = 0
+
+        problem.solve(make_solver(solver))
+
+        if solve_status(problem) in ("Optimal", "Feasible"):
+            return decode_solution(G, t, u, s, x, y)
+
+    raise ValueError(f"The lanes {moves} can't be routed within {max_width} tiles.")
+
+
+def layout_cost(solution: Solution, c: Dict) -> float:
+    """Get the cost of the entities of the solution, like the objective."""
+    counts = np.bincount(solution.entity.ravel(), minlength=6)
+
+    # The exit of an underground belt is modeled as transport belt
+    return float(
+        c["transport"] * (counts[TRANSPORT] + counts[UNDERGROUND_OUTPUT])
+        + c["underground"] * counts[UNDERGROUND_INPUT]
+        + c["splitter"] * (counts[SPLITTER_LEFT] + counts[SPLITTER_RIGHT])
+    )
+
+
+def _empty_solution(name: str, n: int, m: int, B: List[int], E: List[int]) -> Solution:
+    return Solution(
+        name,
+        n,
+        m,
+        B,
+        E,
+        np.full((n, m), EMPTY, dtype=np.int8),
+        np.full((n, m), -1, dtype=np.int8),
+        np.zeros((n, m), dtype=np.int8),
+        [],
+        [],
+        np.zeros((0, len(B))),
+    )
+
+
+def _paste(target: Solution, part: Solution, i: int, j: int) -> None:
+    """Copy the entities of the part into the target, with its tile (0, 0) at (i, j)."""
+    area = (slice(i, i + part.n), slice(j, j + part.m))
+    target.entity[area] = part.entity
+    target.direction[area] = part.direction
+    target.range[area] = part.range
+    target.underground_pairs.extend(
+        ((v[0] + i, v[1] + j), (w[0] + i, w[1] + j), d, r)
+        for (v, w, d, r) in part.underground_pairs
+    )
+
+
+def _belt(target: Solution, row: int, start: int, stop: int) -> None:
+    """Place transport belts facing right on the row, from start to stop."""
+    target.entity[start:stop, row] = TRANSPORT
+    target.direction[start:stop, row] = D.index("right")
+
+
+class _Composer:
+    """Compose balancers, solving and routing every distinct part only once."""
+
+    def __init__(
+        self,
+        R: int,
+        c: Dict,
+        cache: Optional["SolutionCache"],
+        solver: Optional[SolverConfig],
+        strengthen: bool,
+        block_size: int,
+        window: int,
+        max_width: int,
+        break_symmetry: bool = False,
+    ):
+        self.R = R
+        self.c = c
+        self.cache = cache
+        self.solver = solver
+        self.strengthen = strengthen
+        self.block_size = block_size
+        self.window = window
+        self.max_width = max_width
+        self.break_symmetry = break_symmetry
+        self.times = {"blocks": 0.0, "routing": 0.0}
+        self._balancers: Dict[Tuple[int, int], Solution] = {}
+        self._routes: Dict[Tuple, Solution] = {}
+
+    def balancer(self, belt_n: int, belt_m: int) -> Solution:
+        key = (belt_n, belt_m)
+
+        if key not in self._balancers:
+            if max(belt_n, belt_m) <= self.block_size:
+                self._balancers[key] = self._solve(belt_n, belt_m)
+            else:
+                self._balancers[key] = self._compose(belt_n, belt_m)
+
+        return self._balancers[key]
+
+    def _solve(self, belt_n: int, belt_m: int) -> Solution:
+        """Solve the balancer on the narrowest grid with the least rows."""
+        start = time.perf_counter()
+        m = max(belt_n, belt_m)
+        B = centered_tiles(m, belt_n)
+        E = centered_tiles(m, belt_m)
+
+        for n in range(1, self.max_width + 1):
+            result = solve_instance(
+                n,
+                m,
+                B,
+                E,
+                self.R,
+                self.c,
+                cache=self.cache,
+                strengthen=self.strengthen,
+                solver=self.solver,
+                break_symmetry=self.break_symmetry,
+            )
+
+            if result.feasible:
+                self.times["blocks"] += time.perf_counter() - start
+                data = parse_blueprint(result.blueprint)
+
+                return solution_from_blueprint(data, n, m, B, E, self.R)
+
+        raise ValueError(
+            f"The {belt_n}x{belt_m} balancer doesn't fit within {self.max_width} tiles."
+        )
+
+    def _route(self, moves: Dict[int, int], height: int) -> Solution:
+        key = (tuple(sorted(moves.items())), height)
+
+        if key not in self._routes:
+            start = time.perf_counter()
+            self._routes[key] = route_lanes(
+                moves, height, self.R, self.c, self.solver, self.max_width
+            )
+            self.times["routing"] += time.perf_counter() - start
+
+        return self._routes[key]
+
+    def _compose(self, belt_n: int, belt_m: int) -> Solution:
+        (p, q) = choose_factors(belt_n, belt_m)
+        first = self.balancer(belt_n // p, q)
+        second = self.balancer(p, belt_m // q)
+
+        m = max(p * first.m, q * second.m)
+        first_offset = (m - p * first.m) // 2
+        second_offset = (m - q * second.m) // 2
+
+        def first_row(i: int, row: int) -> int:
+            return first_offset + i * first.m + row
+
+        def second_row(k: int, row: int) -> int:
+            return second_offset + k * second.m + row
+
+        B = [first_row(i, b) for i in range(p) for b in first.B]
+        E = [second_row(k, e) for k in range(q) for e in second.E]
+
+        # The output k of the first block i goes to the input i of the second block k
+        lanes = {
+            first_row(i, e): second_row(k, second.B[i])
+            for i in range(p)
+            for (k, e) in enumerate(first.E)
+        }
+
+        # The rows without a lane take the remaining targets in order
+        free = iter(sorted(set(range(m)) - set(lanes.values())))
+        targets = [lanes[row] if row in lanes else next(free) for row in range(m)]
+        lane_targets = set(lanes.values())
+
+        # Route the rounds, with the lanes that don't move as straight belts
+        columns = []
+
+        for changes in sort_rounds(targets, self.window):
+            routes = []
+
+            for (low, before, after) in changes:
+                moves = {
+                    row: after.index(target)
+                    for (row, target) in enumerate(before)
+                    if target in lane_targets
+                }
+
+                # Only the order of the rows without a lane changes
+                if any(row != target for (row, target) in moves.items()):
+                    routes.append((low, moves, self._route(moves, len(before))))
+
+            if routes:
+                width = max(part.n for (_, _, part) in routes)
+                columns.append((list(targets), routes, width))
+
+            for (low, before, after) in changes:
+                targets[low : low + len(before)] = after
+
+        n = first.n + sum(width for (_, _, width) in columns) + second.n
+        solution = _empty_solution(f"{belt_n}x{belt_m}-balancer_composed", n, m, B, E)
+
+        for i in range(p):
+            _paste(solution, first, 0, first_row(i, 0))
+
+        column = first.n
+
+        for (rows, routes, width) in columns:
+            routed = set()
+
+            for (low, moves, part) in routes:
+                _paste(solution, part, column, low)
+
+                for target in moves.values():
+                    _belt(solution, low + target, column + part.n, column + width)
+
+                routed.update(range(low, low + part.m))
+
+            for row in range(m):
+                if row not in routed and rows[row] in lane_targets:
+                    _belt(solution, row, column, column + width)
+
+            column += width
+
+        for k in range(q):
+            _paste(solution, second, column, second_row(k, 0))
+
+        return solution
+
+
+def compose_balancer(
+    belt_n: int,
+    belt_m: int,
+    R: int,
+    c: Dict,
+    cache: Optional["SolutionCache"] = None,
+    solver: Optional[SolverConfig] = None,
+    strengthen: bool = False,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    window: int = DEFAULT_WINDOW,
+    max_width: int = DEFAULT_MAX_WIDTH,
+    break_symmetry: bool = False,
+) -> Tuple[SolveResult, Solution]:
+    """Build the balancer of composed blocks and convert it to a blueprint.
+
+    The layout is a valid balancer, but usually not the cheapest one on its grid,
+    so its status is "Feasible".
+
+    Args:
+        belt_n: The number of input belts.
+        belt_m: The number of output belts.
+        R: Maximum range of underground belts.
+        c: The costs of the instance.
+        cache: The cache for the solved blocks.
+        solver: The solver backend and its settings, for the blocks and the routing.
+        strengthen: Solve the blocks with the strengthened formulation.
+        block_size: Solve blocks with at most this many inputs and outputs directly.
+        window: The number of rows of the routing windows.
+        max_width: Give up on blocks and routing windows wider than this.
+        break_symmetry: Solve the blocks with symmetry breaking.
+
+    Returns:
+        The result on the grid of the composed layout, and the layout.
+
+    Raises:
+        ValueError: If the balancer can't be composed.
+    """
+    if belt_n > belt_m:
+        raise ValueError("A balancer can't have more inputs than outputs.")
+
+    composer = _Composer(
+        R, c, cache, solver, strengthen, block_size, window, max_width, break_symmetry
+    )
+    start = time.perf_counter()
+    solution = composer.balancer(belt_n, belt_m)
+    # The time to place the blocks and the routes
+    composer.times["compose"] = (
+        time.perf_counter()
+        - start
+        - composer.times["blocks"]
+        - composer.times["routing"]
+    )
+
+    start = time.perf_counter()
+    blueprint = convert_to_blueprint(solution)
+    composer.times["blueprint"] = time.perf_counter() - start
+
+    result = SolveResult(
+        solution.n,
+        solution.m,
+        solution.B,
+        solution.E,
+        R,
+        "Feasible",
+        cost=layout_cost(solution, c),
+        blueprint=blueprint,
+        times=composer.times,
+        backend=(solver or SolverConfig()).describe(),
+    )
+
+    return result, solution
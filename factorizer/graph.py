@@ -2,6 +2,8 @@ from typing import List
 
 import networkx as nx
 
+from factorizer.utils import build_edge_index
+
 
 def build_graph(n: int, m: int, B: List[int], E: List[int], R: int) -> nx.DiGraph:
     """Build the graph for the given instance.
@@ -127,4 +129,7 @@ def build_graph(n: int, m: int, B: List[int], E: List[int], R: int) -> nx.DiGrap
         end=True,
     )
 
+    # Index the arcs for constant time lookups by direction and range
+    build_edge_index(G)
+
     return G
@@ -0,0 +1,475 @@
+"""A compact, array-backed alternative to the networkx graph of an instance.
+
+Nodes and arcs are encoded as integers and their attributes are stored in NumPy
+arrays instead of one attribute dict per node and arc.
+The graph exposes the subset of the networkx API that the problem and the
+visualization use, so it can be passed to them instead of the output of
+`build_graph`.
+"""
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+
+from factorizer import D
+from factorizer.utils import build_edge_index
+
+Node = Tuple[int, int]
+Arc = Tuple[Node, Node]
+
+_D_INDEX = {d: i for (i, d) in enumerate(D)}
+
+
+class GridGraph:
+    """The graph of an instance with integer encoded nodes and arcs.
+
+    The grid tile (x, y) has the id x * m + y, followed by the start nodes in the
+    order of B and the end nodes in the order of E.
+    Arcs are numbered in the order in which `build_graph` adds them.
+    """
+
+    __slots__ = (
+        "graph",
+        "n",
+        "m",
+        "B",
+        "E",
+        "R",
+        "tail",
+        "head",
+        "d",
+        "r",
+        "split",
+        "start",
+        "end",
+        "_node_tuples",
+        "_terminal_ids",
+        "_lookup",
+        "_out_ptr",
+        "_out_arcs",
+        "_in_ptr",
+        "_in_arcs",
+    )
+
+    def __init__(
+        self,
+        n: int,
+        m: int,
+        B: List[int],
+        E: List[int],
+        R: int,
+        tail: np.ndarray,
+        head: np.ndarray,
+        d: np.ndarray,
+        r: np.ndarray,
+        split: np.ndarray,
+        start: np.ndarray,
+        end: np.ndarray,
+    ):
+        self.n = n
+        self.m = m
+        self.B = list(B)
+        self.E = list(E)
+        self.R = R
+
+        self.tail = tail.astype(np.int32)
+        self.head = head.astype(np.int32)
+        self.d = d.astype(np.int8)
+        self.r = r.astype(np.int8)
+        self.split = split.astype(bool)
+        self.start = start.astype(bool)
+        self.end = end.astype(bool)
+
+        self._node_tuples: List[Node] = (
+            [(x, y) for x in range(n) for y in range(m)]
+            + [(-1, b) for b in self.B]
+            + [(n, e) for e in self.E]
+        )
+        self._terminal_ids: Dict[Node, int] = {
+            v: i for (i, v) in enumerate(self._node_tuples) if i >= n * m
+        }
+
+        node_count = len(self._node_tuples)
+        arc_ids = np.arange(len(self.tail), dtype=np.int32)
+
+        # Dense lookup table from (node, direction, range, split) to the arc id
+        self._lookup = np.full((node_count, len(D), R + 1, 2, 2), -1, dtype=np.int32)
+        # Assign in reverse, so that the first arc wins for duplicate keys
+        key = (self.d[::-1], self.r[::-1], self.split[::-1].astype(np.int8))
+        self._lookup[(self.tail[::-1], *key, 0)] = arc_ids[::-1]
+        self._lookup[(self.head[::-1], *key, 1)] = arc_ids[::-1]
+
+        # Adjacency in CSR format, keeping the insertion order of the arcs
+        self._out_arcs = np.argsort(self.tail, kind="stable").astype(np.int32)
+        self._out_ptr = np.searchsorted(
+            self.tail[self._out_arcs], np.arange(node_count + 1)
+        ).astype(np.int32)
+        self._in_arcs = np.argsort(self.head, kind="stable").astype(np.int32)
+        self._in_ptr = np.searchsorted(
+            self.head[self._in_arcs], np.arange(node_count + 1)
+        ).astype(np.int32)
+
+        self.graph = {
+            "name": f"{len(B)}x{len(E)}-balancer_{n}x{m}-grid",
+            "n": n,
+            "m": m,
+            "R": R,
+            "R_u": range(2, R + 1),
+            "B": self.B,
+            "E": self.E,
+            "out_index": _ArcIndex(self, 0),
+            "in_index": _ArcIndex(self, 1),
+        }
+
+    # --- NODES ---
+
+    def node_id(self, v: Node) -> int:
+        """Get the id of the node v."""
+        (x, y) = v
+
+        if 0 <= x < self.n and 0 <= y < self.m:
+            return x * self.m + y
+
+        return self._terminal_ids[v]
+
+    def node_of(self, i: int) -> Node:
+        """Get the node with the id i."""
+        return self._node_tuples[i]
+
+    def number_of_nodes(self) -> int:
+        return len(self._node_tuples)
+
+    @property
+    def nodes(self) -> "_NodeView":
+        return _NodeView(self)
+
+    # --- ARCS ---
+
+    def arc_id(self, a: Arc) -> int:
+        """Get the id of the arc a."""
+        ((tx, ty), (hx, hy)) = a
+        (dx, dy) = (hx - tx, hy - ty)
+
+        if dx != 0 and dy != 0:
+            (d, r, split) = ("up" if dy > 0 else "down", 1, True)
+        elif dx != 0:
+            (d, r, split) = ("right" if dx > 0 else "left", abs(dx), False)
+        else:
+            (d, r, split) = ("up" if dy > 0 else "down", abs(dy), False)
+
+        try:
+            tail = self.node_id(a[0])
+        except KeyError:
+            raise KeyError(a)
+
+        if 0 < r <= self.R:
+            i = self._lookup[tail, _D_INDEX[d], r, int(split), 0]
+
+            if i >= 0 and self.head[i] == self.node_id(a[1]):
+                return int(i)
+
+        raise KeyError(a)
+
+    def arc_of(self, i: int) -> Arc:
+        """Get the arc with the id i."""
+        return self._node_tuples[self.tail[i]], self._node_tuples[self.head[i]]
+
+    def arc_attrs(self, i: int) -> Dict:
+        """Get the attributes of the arc with the id i, like `build_graph` sets them."""
+        attrs = {
+            "grid": not (self.start[i] or self.end[i]),
+            "split": bool(self.split[i]),
+            "d": D[self.d[i]],
+            "r": int(self.r[i]),
+        }
+
+        if not attrs["grid"]:
+            attrs["start"] = bool(self.start[i])
+            attrs["end"] = bool(self.end[i])
+
+        return attrs
+
+    def find_arc(self, v: Node, d: str, r: int, split: bool, incoming: bool = False):
+        """Find the arc leaving (or entering) v in direction d with range r."""
+        if not 0 < r <= self.R:
+            return None
+
+        try:
+            node = self.node_id(v)
+        except KeyError:
+            return None
+
+        i = self._lookup[node, _D_INDEX[d], r, int(split), int(incoming)]
+
+        return self.arc_of(i) if i >= 0 else None
+
+    def number_of_edges(self) -> int:
+        return len(self.tail)
+
+    @property
+    def edges(self) -> "_EdgeView":
+        return _EdgeView(self)
+
+    def out_edges(self, v: Node) -> List[Arc]:
+        i = self.node_id(v)
+        arcs = self._out_arcs[self._out_ptr[i] : self._out_ptr[i + 1]]
+
+        return [self.arc_of(a) for a in arcs]
+
+    def in_edges(self, v: Node) -> List[Arc]:
+        i = self.node_id(v)
+        arcs = self._in_arcs[self._in_ptr[i] : self._in_ptr[i + 1]]
+
+        return [self.arc_of(a) for a in arcs]
+
+    def start_edges(self) -> List[Arc]:
+        return [self.arc_of(i) for i in np.flatnonzero(self.start)]
+
+    def end_edges(self) -> List[Arc]:
+        return [self.arc_of(i) for i in np.flatnonzero(self.end)]
+
+    @property
+    def nbytes(self) -> int:
+        """The memory used by the arc arrays and the lookup tables."""
+        arrays = (
+            self.tail,
+            self.head,
+            self.d,
+            self.r,
+            self.split,
+            self.start,
+            self.end,
+            self._lookup,
+            self._out_ptr,
+            self._out_arcs,
+            self._in_ptr,
+            self._in_arcs,
+        )
+
+        return sum(array.nbytes for array in arrays)
+
+    # --- CONVERSION ---
+
+    @classmethod
+    def from_networkx(cls, G: nx.DiGraph) -> "GridGraph":
+        """Convert a graph created by `build_graph` to the compact representation."""
+        n: int = G.graph["n"]
+        m: int = G.graph["m"]
+        B = G.graph["B"]
+        E = G.graph["E"]
+        R: int = G.graph["R"]
+
+        start_ids = {b: n * m + i for (i, b) in enumerate(B)}
+        end_ids = {e: n * m + len(B) + i for (i, e) in enumerate(E)}
+
+        def node_id(v: Node) -> int:
+            (x, y) = v
+
+            if x == -1:
+                return start_ids[y]
+            if x == n:
+                return end_ids[y]
+
+            return x * m + y
+
+        count = G.number_of_edges()
+        tail = np.empty(count, dtype=np.int32)
+        head = np.empty(count, dtype=np.int32)
+        d = np.empty(count, dtype=np.int8)
+        r = np.empty(count, dtype=np.int8)
+        split = np.empty(count, dtype=bool)
+        start = np.empty(count, dtype=bool)
+        end = np.empty(count, dtype=bool)
+
+        for (i, (v, w, attrs)) in enumerate(G.edges(data=True)):
+            tail[i] = node_id(v)
+            head[i] = node_id(w)
+            d[i] = _D_INDEX[attrs["d"]]
+            r[i] = attrs["r"]
+            split[i] = attrs["split"]
+            start[i] = attrs.get("start", False)
+            end[i] = attrs.get("end", False)
+
+        return cls(n, m, B, E, R, tail, head, d, r, split, start, end)
+
+    def to_networkx(self) -> nx.DiGraph:
+        """Convert the graph to the networkx representation of `build_graph`."""
+        graph = {
+            key: value
+            for (key, value) in self.graph.items()
+            if key not in ("out_index", "in_index")
+        }
+        G = nx.DiGraph(**graph)
+
+        G.add_nodes_from(self.nodes.items())
+        G.add_edges_from(
+            (*self.arc_of(i), self.arc_attrs(i)) for i in range(len(self.tail))
+        )
+
+        build_edge_index(G)
+
+        return G
+
+
+def build_grid_graph(n: int, m: int, B: List[int], E: List[int], R: int) -> GridGraph:
+    """Build the compact graph for the given instance.
+
+    The result has the same nodes and arcs as the graph returned by `build_graph`.
+
+    Args:
+        n: The width of the grid.
+        m: The height of the grid.
+        B: The list of start indexes.
+        E: The list of end indexes.
+        R: Maximum range of underground belts.
+    """
+    parts = []
+
+    def add(tails, heads, d: str, r: int, split: bool = False, kind: int = 0):
+        tails = np.asarray(tails, dtype=np.int32).ravel()
+        heads = np.asarray(heads, dtype=np.int32).ravel()
+        parts.append((tails, heads, _D_INDEX[d], r, split, kind))
+
+    def grid_ids(xs, ys):
+        (xs, ys) = np.meshgrid(xs, ys, indexing="ij")
+        return ys, xs * m + ys
+
+    for r in range(1, R + 1):
+        (_, ids) = grid_ids(np.arange(n - r), np.arange(m))
+        add(ids, ids + r * m, "right", r)
+
+        (_, ids) = grid_ids(np.arange(r, n), np.arange(m))
+        add(ids, ids - r * m, "left", r)
+
+        (_, ids) = grid_ids(np.arange(n), np.arange(m - r))
+        add(ids, ids + r, "up", r)
+
+        (_, ids) = grid_ids(np.arange(n), np.arange(r, m))
+        add(ids, ids - r, "down", r)
+
+    # Splitter edges, interleaving the up and down edge of each tile
+    (ys, ids) = grid_ids(np.arange(n - 1), np.arange(m))
+    tails = np.stack([ids, ids], axis=-1).ravel()
+    heads = np.stack([ids + m + 1, ids + m - 1], axis=-1).ravel()
+    dirs = np.tile(np.array([_D_INDEX["up"], _D_INDEX["down"]]), ids.size)
+    valid = np.stack([ys < m - 1, ys > 0], axis=-1).ravel()
+    split_part = (tails[valid], heads[valid], dirs[valid])
+
+    start_ids = n * m + np.arange(len(B))
+    end_ids = n * m + len(B) + np.arange(len(E))
+
+    def tile_ids(x: int, rows: List[int]) -> np.ndarray:
+        return x * m + np.asarray(rows, dtype=np.int32)
+
+    tail = np.concatenate(
+        [p[0] for p in parts] + [split_part[0], start_ids, tile_ids(n - 1, E)]
+    )
+    head = np.concatenate(
+        [p[1] for p in parts] + [split_part[1], tile_ids(0, B), end_ids]
+    )
+    d = np.concatenate(
+        [np.full(p[0].size, p[2]) for p in parts]
+        + [split_part[2], np.full(len(B) + len(E), _D_INDEX["right"])]
+    )
+    r = np.concatenate(
+        [np.full(p[0].size, p[3]) for p in parts]
+        + [np.ones(split_part[0].size + len(B) + len(E))]
+    )
+
+    normal_count = sum(p[0].size for p in parts)
+    split_count = split_part[0].size
+    total = normal_count + split_count + len(B) + len(E)
+
+    split = np.zeros(total, dtype=bool)
+    split[normal_count : normal_count + split_count] = True
+    start = np.zeros(total, dtype=bool)
+    start[normal_count + split_count : normal_count + split_count + len(B)] = True
+    end = np.zeros(total, dtype=bool)
+    end[total - len(E) :] = True
+
+    return GridGraph(n, m, B, E, R, tail, head, d, r, split, start, end)
+
+
+class _ArcIndex:
+    """Mapping-like arc index with the keys of `build_edge_index`."""
+
+    __slots__ = ("_G", "_incoming")
+
+    def __init__(self, G: GridGraph, incoming: int):
+        self._G = G
+        self._incoming = incoming
+
+    def get(self, key: Tuple, default=None) -> Optional[Arc]:
+        (v, d, r, split) = key
+        a = self._G.find_arc(v, d, r, split, incoming=bool(self._incoming))
+
+        return default if a is None else a
+
+
+class _NodeView:
+    """Read-only view of the nodes, mimicking `nx.DiGraph.nodes`."""
+
+    __slots__ = ("_G",)
+
+    def __init__(self, G: GridGraph):
+        self._G = G
+
+    def __iter__(self) -> Iterator[Node]:
+        return iter(self._G._node_tuples)
+
+    def __len__(self) -> int:
+        return len(self._G._node_tuples)
+
+    def __contains__(self, v) -> bool:
+        try:
+            self._G.node_id(v)
+            return True
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def __getitem__(self, v: Node) -> Dict:
+        i = self._G.node_id(v)
+        grid_size = self._G.n * self._G.m
+
+        if i < grid_size:
+            return {"grid": True}
+
+        is_start = i < grid_size + len(self._G.B)
+
+        return {"grid": False, "split": False, "start": is_start, "end": not is_start}
+
+    def items(self) -> Iterator[Tuple[Node, Dict]]:
+        return ((v, self[v]) for v in self)
+
+
+class _EdgeView:
+    """Read-only view of the arcs, mimicking `nx.DiGraph.edges`.
+
+    Arcs are iterated grouped by their start node, like networkx does.
+    """
+
+    __slots__ = ("_G",)
+
+    def __init__(self, G: GridGraph):
+        self._G = G
+
+    def __iter__(self) -> Iterator[Arc]:
+        G = self._G
+        return (G.arc_of(i) for i in G._out_arcs)
+
+    def __len__(self) -> int:
+        return len(self._G.tail)
+
+    def __contains__(self, a) -> bool:
+        try:
+            self._G.arc_id(a)
+            return True
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def __getitem__(self, a: Arc) -> Dict:
+        return self._G.arc_attrs(self._G.arc_id(a))
+
+    def items(self) -> Iterator[Tuple[Arc, Dict]]:
+        G = self._G
+        return ((G.arc_of(i), G.arc_attrs(i)) for i in G._out_arcs)
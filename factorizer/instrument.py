@@ -0,0 +1,155 @@
+"""Measure where a run spends its time and memory.
+
+The phases of a run are timed with wall and CPU time, together with the peak
+memory of the process and of the solver, which runs as child process.
+Optionally, every phase is profiled with cProfile.
+"""
+import cProfile
+import json
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+
+def peak_rss(children: bool = False) -> Optional[int]:
+    """Get the peak resident set size in bytes so far.
+
+    Args:
+        children: Get the peak of the terminated child processes instead.
+    """
+    if resource is None:
+        return None
+
+    usage = resource.getrusage(
+        resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    )
+
+    # Linux reports kilobytes, macOS bytes
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+class Instrumentation:
+    """Collect the metrics of a run.
+
+    Args:
+        profile_dir: Save a cProfile of every phase as `<phase>.prof` in this
+            directory.
+    """
+
+    def __init__(self, profile_dir: Optional[str] = None):
+        self.profile_dir = profile_dir
+        self.phases: Dict[str, Dict] = {}
+        self.model: Dict = {}
+        self.solver: Dict = {}
+        self.result: Dict = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[Dict]:
+        """Measure the enclosed code as phase of the run.
+
+        Yields the metrics of the phase, which are filled on exit.
+        """
+        metrics: Dict = {}
+        profiler = cProfile.Profile() if self.profile_dir is not None else None
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        children_start = os.times()
+
+        if profiler is not None:
+            profiler.enable()
+
+        try:
+            yield metrics
+        finally:
+            if profiler is not None:
+                profiler.disable()
+
+            children_end = os.times()
+
+            metrics["wall_time"] = time.perf_counter() - wall_start
+            metrics["cpu_time"] = time.process_time() - cpu_start
+            metrics["children_cpu_time"] = (
+                children_end.children_user
+                + children_end.children_system
+                - children_start.children_user
+                - children_start.children_system
+            )
+            metrics["peak_rss"] = peak_rss()
+            metrics["children_peak_rss"] = peak_rss(children=True)
+
+            if profiler is not None:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                path = os.path.join(self.profile_dir, f"{name}.prof")
+                profiler.dump_stats(path)
+                metrics["profile"] = path
+
+            self.phases[name] = metrics
+
+    def to_dict(self) -> Dict:
+        return {
+            "phases": self.phases,
+            "model": self.model,
+            "solver": self.solver,
+            "result": self.result,
+        }
+
+    def save(self, path: str) -> None:
+        """Save the metrics as JSON file."""
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+
+# The statistics in the summary at the end of a CBC log
+_CBC_SUMMARY = {
+    "result": (re.compile(r"^Result - (.+)$", re.M), str),
+    "objective": (re.compile(r"^Objective value:\s+(\S+)", re.M), float),
+    "lower_bound": (re.compile(r"^Lower bound:\s+(\S+)", re.M), float),
+    "gap": (re.compile(r"^Gap:\s+(\S+)", re.M), float),
+    "nodes": (re.compile(r"^Enumerated nodes:\s+(\d+)", re.M), int),
+    "iterations": (re.compile(r"^Total iterations:\s+(\d+)", re.M), int),
+    "cpu_time": (re.compile(r"^Total time \(CPU seconds\):\s+(\S+)", re.M), float),
+    "wall_time": (
+        re.compile(r"^Total time .*\(Wallclock seconds\):\s+(\S+)", re.M),
+        float,
+    ),
+}
+_CBC_INCUMBENT = re.compile(
+    r"^Cbc00(?:04|12)I Integer solution of (\S+) .*\((\S+) seconds\)", re.M
+)
+_CBC_WARM_START = re.compile(r"MIPStart provided solution with cost (\S+)")
+
+
+def parse_cbc_log(log: str) -> Dict:
+    """Get the solver statistics from the output of CBC.
+
+    Statistics that are missing from the log are left out.
+    """
+    stats: Dict = {}
+
+    for (name, (pattern, convert)) in _CBC_SUMMARY.items():
+        if matches := pattern.findall(log):
+            stats[name] = convert(matches[-1])
+
+    if "gap" not in stats and stats.get("result") == "Optimal solution found":
+        stats["gap"] = 0.0
+
+    if incumbents := _CBC_INCUMBENT.findall(log):
+        (objective, seconds) = incumbents[0]
+        stats["first_incumbent"] = float(objective)
+        stats["time_to_first_incumbent"] = float(seconds)
+        stats["incumbents"] = len(incumbents)
+
+    if warm_start := _CBC_WARM_START.search(log):
+        stats["warm_start_objective"] = float(warm_start.group(1))
+
+    return stats
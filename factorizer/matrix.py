@@ -0,0 +1,530 @@
+"""Build the problem directly as sparse matrices, without PuLP expression objects.
+
+`build_matrix_problem` emits the same rows and columns as `build_problem`, but
+stores them as NumPy arrays in COO format.
+The result can be written as an MPS file and solved with the CBC binary that
+ships with PuLP.
+"""
+import os
+import subprocess
+import tempfile
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import networkx as nx
+import numpy as np
+
+from factorizer import D, F_s
+from factorizer.utils import splitter_out_edge, dir_out_edge, opposite_dir, dir_in_edge
+
+# The constraint senses, with the same values as in PuLP
+SENSE_LE = -1
+SENSE_EQ = 0
+SENSE_GE = 1
+
+IndexDict = Dict[Tuple, int]
+
+# The characters PuLP replaces in variable names
+_ILLEGAL_CHARS = str.maketrans("-+[] ->/", "________")
+
+
+class MatrixProblem:
+    """A mixed integer linear program in column-indexed sparse form.
+
+    The constraint matrix is stored in COO format: the entry `vals[k]` is the
+    coefficient of the column `cols[k]` in the row `rows[k]`.
+    """
+
+    __slots__ = (
+        "name",
+        "keys",
+        "objective",
+        "lower",
+        "upper",
+        "integer",
+        "rows",
+        "cols",
+        "vals",
+        "sense",
+        "rhs",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        keys: List[Tuple[str, Tuple]],
+        objective: np.ndarray,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        integer: np.ndarray,
+        rows: np.ndarray,
+        cols: np.ndarray,
+        vals: np.ndarray,
+        sense: np.ndarray,
+        rhs: np.ndarray,
+    ):
+        self.name = name
+        self.keys = keys
+        self.objective = objective
+        self.lower = lower
+        self.upper = upper
+        self.integer = integer
+        self.rows = rows
+        self.cols = cols
+        self.vals = vals
+        self.sense = sense
+        self.rhs = rhs
+
+    @property
+    def num_cols(self) -> int:
+        return len(self.keys)
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.rhs)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.vals)
+
+    def column_name(self, i: int) -> str:
+        """Get the name PuLP gives to the variable of the column i."""
+        (kind, key) = self.keys[i]
+
+        if kind in ("t", "y"):
+            # These are indexed by a single node or arc
+            key = (key,)
+
+        parts = "_".join(str(part) for part in key)
+
+        return f"{kind}_{parts}".translate(_ILLEGAL_CHARS)
+
+    def to_csr(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Convert the constraint matrix to CSR format (indptr, indices, data)."""
+        order = np.lexsort((self.cols, self.rows))
+        indptr = np.searchsorted(self.rows[order], np.arange(self.num_rows + 1))
+
+        return indptr, self.cols[order], self.vals[order]
+
+    def write_mps(self, path: str) -> None:
+        """Write the problem as an MPS file, in the same layout as PuLP.
+
+        Columns are named C<i> and rows R<i>, in the order of the arrays.
+        """
+        row_type = {SENSE_LE: "L", SENSE_EQ: "E", SENSE_GE: "G"}
+        order = np.lexsort((self.rows, self.cols))
+        col_ptr = np.searchsorted(self.cols[order], np.arange(self.num_cols + 1))
+        rows = self.rows[order]
+        vals = self.vals[order]
+
+        lines = ["*SENSE:Minimize", f"NAME          {self.name}", "ROWS", " N  OBJ"]
+        lines.extend(f" {row_type[s]}  R{i}" for (i, s) in enumerate(self.sense))
+
+        lines.append("COLUMNS")
+
+        for i in range(self.num_cols):
+            name = f"C{i}"
+
+            if self.integer[i]:
+                lines.append("    MARK      'MARKER'                 'INTORG'")
+
+            lines.extend(
+                "    %-8s  %-8s  % .12e" % (name, f"R{rows[k]}", vals[k])
+                for k in range(col_ptr[i], col_ptr[i + 1])
+            )
+
+            if self.objective[i] != 0:
+                lines.append(
+                    "    %-8s  %-8s  % .12e" % (name, "OBJ", self.objective[i])
+                )
+
+            if self.integer[i]:
+                lines.append("    MARK      'MARKER'                 'INTEND'")
+
+        lines.append("RHS")
+        lines.extend(
+            "    RHS       %-8s  % .12e" % (f"R{i}", value)
+            for (i, value) in enumerate(self.rhs)
+        )
+
+        lines.append("BOUNDS")
+
+        for i in range(self.num_cols):
+            name = f"C{i}"
+
+            if self.integer[i] and self.lower[i] == 0 and self.upper[i] == 1:
+                lines.append(" BV BND       %-8s" % name)
+                continue
+
+            if self.lower[i] != 0 or self.integer[i]:
+                lines.append(" LO BND       %-8s  % .12e" % (name, self.lower[i]))
+            if np.isfinite(self.upper[i]):
+                lines.append(" UP BND       %-8s  % .12e" % (name, self.upper[i]))
+
+        lines.append("ENDATA")
+
+        with open(path, "w") as file:
+            file.write("\n".join(lines) + "\n")
+
+
+class _RowBuilder:
+    """Collect rows as flat lists of column indexes and coefficients."""
+
+    def __init__(self):
+        self.rows: List[int] = []
+        self.cols: List[int] = []
+        self.vals: List[float] = []
+        self.sense: List[int] = []
+        self.rhs: List[float] = []
+
+    def add(self, cols: List[int], vals: List[float], sense: int, rhs: float):
+        row = len(self.rhs)
+
+        self.rows.extend([row] * len(cols))
+        self.cols.extend(cols)
+        self.vals.extend(vals)
+        self.sense.append(sense)
+        self.rhs.append(rhs)
+
+    def add_block(self, cols: np.ndarray, vals: np.ndarray, sense: int, rhs):
+        """Add one row for each line of the 2-dimensional arrays."""
+        (count, width) = cols.shape
+        first = len(self.rhs)
+
+        self.rows.extend(np.repeat(np.arange(first, first + count), width).tolist())
+        self.cols.extend(cols.ravel().tolist())
+        self.vals.extend(vals.ravel().tolist())
+        self.sense.extend([sense] * count)
+        self.rhs.extend(np.broadcast_to(rhs, (count,)).tolist())
+
+
+def build_matrix_problem(
+    G: nx.DiGraph, c: Dict
+) -> Tuple[MatrixProblem, IndexDict, IndexDict, IndexDict, IndexDict, IndexDict]:
+    """Build the problem from the instance as sparse matrices.
+
+    The rows and columns are the same as the ones created by `build_problem`.
+    Instead of PuLP variables, the returned dicts map to the column indexes.
+
+    Args:
+        G: The graph of the instance.
+        c: The costs of the instance.
+    """
+    V_grid = [v for v in G.nodes if G.nodes[v]["grid"]]
+    A = list(G.edges)
+
+    n: int = G.graph["n"]
+    m: int = G.graph["m"]
+    B = G.graph["B"]
+    E = G.graph["E"]
+    R_u = G.graph["R_u"]
+
+    # --- VARIABLES ---
+
+    keys: List[Tuple[str, Tuple]] = []
+
+    def columns(kind: str, items) -> IndexDict:
+        first = len(keys)
+        index = {}
+
+        for (i, key) in enumerate(items):
+            index[key] = first + i
+            keys.append((kind, key))
+
+        return index
+
+    t = columns("t", V_grid)
+    u = columns("u", ((v, d, r) for v in V_grid for d in D for r in R_u))
+    s = columns("s", ((v, f) for v in V_grid for f in F_s))
+    x = columns("x", ((a, b) for a in A for b in B))
+    y = columns("y", A)
+
+    num_cols = len(keys)
+    num_binary = len(t) + len(u) + len(s)
+
+    # The x columns are ordered by arc, then by start point
+    x_cols = np.arange(x[A[0], B[0]], x[A[0], B[0]] + len(A) * len(B)).reshape(
+        len(A), len(B)
+    )
+    y_cols = np.array([y[a] for a in A])
+    arc_index = {a: i for (i, a) in enumerate(A)}
+
+    objective = np.zeros(num_cols)
+    objective[list(t.values())] = c["transport"]
+    objective[list(u.values())] = c["underground"]
+    objective[list(s.values())] = c["splitter"]
+
+    lower = np.zeros(num_cols)
+    upper = np.full(num_cols, np.inf)
+    upper[:num_binary] = 1
+    upper[y_cols] = 1
+    integer = np.zeros(num_cols, dtype=bool)
+    integer[:num_binary] = True
+    integer[y_cols] = True
+
+    rows = _RowBuilder()
+
+    def entity_cols(v) -> List[int]:
+        return [t[v]] + [u[v, d, r] for r in R_u for d in D] + [s[v, f] for f in F_s]
+
+    # --- CONSTRAINTS ---
+
+    # Only place at most one entity on each tile
+    for v in V_grid:
+        cols = entity_cols(v)
+        rows.add(cols, [1.0] * len(cols), SENSE_LE, 1)
+
+    # Only one non-splitter arc can be activated per tile
+    for v in V_grid:
+        for arcs in (G.out_edges(v), G.in_edges(v)):
+            cols = [y[a] for a in arcs if not G.edges[a]["split"]]
+            rows.add(cols, [1.0] * len(cols), SENSE_LE, 1)
+
+    # Splitter arcs can only be activated by splitters
+    for v in V_grid:
+        for f in ["right", "left"]:
+            if splitter_edge := splitter_out_edge(G, v, f):
+                rows.add([y[splitter_edge], s[v, f]], [1.0, -1.0], SENSE_LE, 0)
+
+    # Always place splitter fragments together
+    for i in range(n):
+        for j in range(m - 1):
+            rows.add(
+                [s[(i, j), "right"], s[(i, j + 1), "left"]],
+                [1.0, -1.0],
+                SENSE_EQ,
+                0,
+            )
+
+    # Balance splitter output
+    M = 0.5 * len(E)
+
+    for v in V_grid:
+        in_arcs = [arc_index[a] for a in G.in_edges(v)]
+        normal_edge = dir_out_edge(G, v, "right")
+
+        for b_index in range(len(B)):
+            in_cols = x_cols[in_arcs, b_index].tolist()
+            in_vals = [0.5] * len(in_cols)
+
+            for f in F_s:
+                splitter_edge = splitter_out_edge(G, v, f)
+
+                if splitter_edge and normal_edge:
+                    for out_edge in (splitter_edge, normal_edge):
+                        rows.add(
+                            in_cols
+                            + [y[splitter_edge], x_cols[arc_index[out_edge], b_index]],
+                            in_vals + [-M, -1.0],
+                            SENSE_GE,
+                            -M,
+                        )
+                else:
+                    rows.add([s[v, f]], [1.0], SENSE_EQ, 0)
+
+    # A splitter can only have flow to the right
+    # A splitter can only take flow from the left
+    for find_edge in (dir_out_edge, dir_in_edge):
+        for v in V_grid:
+            for f in F_s:
+                for d in D:
+                    if d != "right":
+                        if dir_edge := find_edge(G, v, d):
+                            rows.add([y[dir_edge], s[v, f]], [1.0, 1.0], SENSE_LE, 1)
+
+    # Activated arcs must come from an entity and go to an entity
+    for v in V_grid:
+        cols = entity_cols(v)
+        vals = [1.0] * len(cols)
+
+        for arcs in (G.in_edges(v), G.out_edges(v)):
+            for a in arcs:
+                rows.add(cols + [y[a]], vals + [-1.0], SENSE_GE, 0)
+
+    # Only underground belts can have underground flow
+    for v in V_grid:
+        transport_belt_edges = [dir_out_edge(G, v, d2) for d2 in D]
+
+        for d in D:
+            for r in R_u:
+                if underground_edge := dir_out_edge(G, v, d, r):
+                    rows.add(
+                        [y[underground_edge], u[v, d, r]], [1.0, -1.0], SENSE_EQ, 0
+                    )
+                else:
+                    rows.add([u[v, d, r]], [1.0], SENSE_EQ, 0)
+
+                for transport_belt_edge in transport_belt_edges:
+                    if transport_belt_edge:
+                        rows.add(
+                            [y[transport_belt_edge], u[v, d, r]],
+                            [1.0, 1.0],
+                            SENSE_LE,
+                            1,
+                        )
+
+    # Avoid underground belt conflicts
+    for v in V_grid:
+        for d in D:
+            for r in R_u:
+                for node_range in range(r):
+                    if underground_edge := dir_out_edge(G, v, d, node_range):
+                        (_, node) = underground_edge
+
+                        for other_range in R_u:
+                            if dir_out_edge(G, node, d, node_range):
+                                rows.add(
+                                    [u[node, d, other_range], u[v, d, r]],
+                                    [1.0, 1.0],
+                                    SENSE_LE,
+                                    1,
+                                )
+                            if dir_out_edge(G, node, opposite_dir(d), node_range):
+                                rows.add(
+                                    [u[node, opposite_dir(d), other_range], u[v, d, r]],
+                                    [1.0, 1.0],
+                                    SENSE_LE,
+                                    1,
+                                )
+
+    # An underground belt must have a transport belt as "end piece"
+    for v in V_grid:
+        for d in D:
+            for r in R_u:
+                if underground_edge := dir_out_edge(G, v, d, r):
+                    (_, node) = underground_edge
+
+                    if transport_belt_edge := dir_out_edge(G, node, d):
+                        rows.add([u[v, d, r], t[node]], [1.0, -1.0], SENSE_LE, 0)
+                        rows.add(
+                            [u[v, d, r], y[transport_belt_edge]],
+                            [1.0, -1.0],
+                            SENSE_LE,
+                            0,
+                        )
+                    else:
+                        rows.add([u[v, d, r]], [1.0], SENSE_EQ, 0)
+
+    # Only allow flow over activated arcs
+    rows.add_block(
+        np.stack([x_cols.ravel(), np.repeat(y_cols, len(B))], axis=1),
+        np.tile([1.0, -float(len(E))], (x_cols.size, 1)),
+        SENSE_LE,
+        0,
+    )
+
+    # Respect belt capacity
+    rows.add_block(x_cols, np.ones(x_cols.shape), SENSE_LE, len(E))
+
+    # Flow conservation
+    for v in V_grid:
+        out_arcs = [arc_index[a] for a in G.out_edges(v)]
+        in_arcs = [arc_index[a] for a in G.in_edges(v)]
+        vals = [1.0] * len(out_arcs) + [-1.0] * len(in_arcs)
+
+        for b_index in range(len(B)):
+            cols = x_cols[out_arcs + in_arcs, b_index].tolist()
+            rows.add(cols, vals, SENSE_EQ, 0)
+
+    # Supply
+    for b1 in B:
+        for b2 in B:
+            supply = len(E) if b1 == b2 else 0
+
+            rows.add([x[((-1, b2), (0, b2)), b1]], [1.0], SENSE_EQ, supply)
+
+    # Demand
+    for b in B:
+        for e in E:
+            rows.add([x[((n - 1, e), (n, e)), b]], [1.0], SENSE_EQ, 1)
+
+    problem = MatrixProblem(
+        G.graph["name"],
+        keys,
+        objective,
+        lower,
+        upper,
+        integer,
+        np.array(rows.rows, dtype=np.int64),
+        np.array(rows.cols, dtype=np.int64),
+        np.array(rows.vals, dtype=np.float64),
+        np.array(rows.sense, dtype=np.int8),
+        np.array(rows.rhs, dtype=np.float64),
+    )
+
+    return problem, t, u, s, x, y
+
+
+def solve_matrix_problem(
+    problem: MatrixProblem,
+    path: Optional[str] = None,
+    msg: bool = False,
+    log_path: Optional[str] = None,
+    arguments: Sequence[str] = (),
+) -> Tuple[str, Optional[float], np.ndarray]:
+    """Solve the problem with the CBC binary.
+
+    Args:
+        problem: The problem to solve.
+        path: The path to the CBC binary. Defaults to the one shipped with PuLP.
+        msg: Show the output of CBC?
+        log_path: Write the output of CBC to this file instead.
+        arguments: Additional arguments for CBC, e.g. from `cbc_arguments`.
+
+    Returns:
+        The status reported by CBC, the objective value and the column values.
+    """
+    if path is None:
+        from pulp import PULP_CBC_CMD
+
+        path = PULP_CBC_CMD().path
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        mps_path = os.path.join(tmp_dir, "problem.mps")
+        sol_path = os.path.join(tmp_dir, "problem.sol")
+
+        problem.write_mps(mps_path)
+
+        args = [path, mps_path, *arguments, "branch", "printingOptions", "all"]
+        args += ["solution", sol_path]
+        if log_path is not None:
+            with open(log_path, "w") as log:
+                subprocess.run(args, stdout=log, stderr=log, check=True)
+        else:
+            output = None if msg else subprocess.DEVNULL
+            subprocess.run(args, stdout=output, stderr=output, check=True)
+
+        values = np.zeros(problem.num_cols)
+
+        with open(sol_path) as file:
+            header = file.readline()
+
+            for line in file:
+                parts = line.split()
+
+                if parts and parts[0] == "**":
+                    parts = parts[1:]
+
+                if len(parts) >= 3 and parts[1].startswith("C"):
+                    values[int(parts[1][1:])] = float(parts[2])
+
+    status = header.split(" - ")[0].strip()
+    objective = float(problem.objective @ values) if status == "Optimal" else None
+
+    return status, objective, values
+
+
+class MatrixVariable:
+    """The value of a column, with the `value()` accessor of a PuLP variable."""
+
+    __slots__ = ("varValue",)
+
+    def __init__(self, value: float):
+        self.varValue = value
+
+    def value(self) -> float:
+        return self.varValue
+
+
+def assign_values(index: Dict, values: np.ndarray) -> Dict:
+    """Map the keys of an index dict to the solved values of their columns."""
+    return {key: MatrixVariable(float(values[i])) for (key, i) in index.items()}
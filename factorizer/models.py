@@ -0,0 +1,164 @@
+"""A persistent on-disk cache for built graphs and problems.
+
+Building the problem of a large instance takes about a second, which sweeps and
+repeated solves with other solver settings pay again and again. The cache
+stores the graph, the problem, its variable dicts and its report as a pickle,
+which loads several times faster than the problem is built.
+
+Entries are keyed by a hash of the instance, the options of the formulation and
+the version of the code that builds it, so changing the model or upgrading
+PuLP or networkx never loads a stale problem. Only load entries from a
+directory you trust, like every pickle.
+"""
+import functools
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from factorizer.cache import evict_entries, instance_key
+
+DEFAULT_MODEL_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "factorizer",
+    "models",
+)
+# Large problems take several megabytes each
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# The modules that define the graph and the problem
+_MODEL_SOURCES = ["__init__.py", "graph.py", "problem.py", "utils.py"]
+
+
+class Model(NamedTuple):
+    """A built instance."""
+
+    G: object
+    problem: object
+    # The variable dicts t, u, s, x and y of the problem
+    variables: Tuple
+    # The ModelReport of the problem
+    report: object
+
+
+@functools.lru_cache(maxsize=None)
+def code_version() -> str:
+    """Get a hash of the code that builds the problems and of the libraries."""
+    import networkx
+    import pulp
+
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+
+    for name in _MODEL_SOURCES:
+        with open(os.path.join(directory, name), "rb") as file:
+            digest.update(file.read())
+
+    digest.update(
+        f"{sys.version_info[:2]}/{pulp.__version__}/{networkx.__version__}".encode()
+    )
+
+    return digest.hexdigest()
+
+
+def model_key(
+    n: int,
+    m: int,
+    B: List[int],
+    E: List[int],
+    R: int,
+    c: Dict,
+    presolve: bool = True,
+    strengthen: bool = False,
+    break_symmetry: bool = False,
+) -> str:
+    """Get the hash of the problem of an instance, built with the options."""
+    options = {
+        "instance": instance_key(n, m, B, E, R, c),
+        "presolve": presolve,
+        "strengthen": strengthen,
+        "break_symmetry": break_symmetry,
+        "code": code_version(),
+    }
+    encoded = json.dumps(options, sort_keys=True, separators=(",", ":"))
+
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ModelCache:
+    """Cache built problems as pickles in a directory.
+
+    Every hit refreshes the modification time of the entry, so eviction removes
+    the least recently used entries first.
+
+    Args:
+        directory: The directory to store the entries in.
+        max_entries: The maximum number of entries to keep.
+        max_bytes: The maximum total size of the entries.
+        max_age: The maximum time in seconds since an entry was last used.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_MODEL_CACHE_DIR,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+        max_age: Optional[float] = None,
+    ):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.pickle")
+
+    def get(self, key: str) -> Optional[Model]:
+        """Load the built problem of the key, if available."""
+        path = self._path(key)
+
+        try:
+            with open(path, "rb") as file:
+                model = pickle.load(file)
+
+            os.utime(path)
+        except OSError:
+            return None
+        except Exception:
+            # A truncated or otherwise unreadable entry is built again
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+            return None
+
+        return model
+
+    def put(self, key: str, model: Model) -> None:
+        """Store a built problem, before it is solved."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write atomically, other processes might read the entry at the same time
+        (fd, tmp_path) = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+
+        with os.fdopen(fd, "wb") as file:
+            pickle.dump(model, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(tmp_path, path)
+
+        self.evict()
+
+    def evict(self) -> int:
+        """Remove expired entries and the least recently used ones over the limits.
+
+        Returns:
+            The number of removed entries.
+        """
+        return evict_entries(
+            self.directory, ".pickle", self.max_entries, self.max_bytes, self.max_age
+        )
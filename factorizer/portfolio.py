@@ -0,0 +1,195 @@
+"""Race differently configured solves of one instance against each other.
+
+The solve times of the same instance vary a lot with the random seed and the
+formulation. Every member of the portfolio solves the instance in its own
+process, the first proven result wins and the other members are killed,
+together with their solver processes.
+
+The command line solvers can't exchange incumbents while they run, so the
+members only share the warm start they are launched with.
+"""
+import os
+import signal
+from dataclasses import dataclass, replace
+from multiprocessing import Process, Queue
+from queue import Empty
+from typing import Dict, List, Optional
+
+from factorizer.assignment import Assignment
+from factorizer.solve import SolveResult, solve_instance
+from factorizer.solvers import SolverConfig
+
+
+@dataclass
+class PortfolioMember:
+    """A configuration of the solve."""
+
+    solver: SolverConfig
+    strengthen: bool = False
+
+    def describe(self) -> str:
+        formulation = "strengthened" if self.strengthen else "plain"
+
+        return f"{self.solver.describe()}, {formulation}"
+
+
+def default_portfolio(
+    size: int, solver: Optional[SolverConfig] = None, strengthen: bool = False
+) -> List[PortfolioMember]:
+    """Vary the seed and alternate between the plain and strengthened formulation.
+
+    Args:
+        size: The number of members.
+        solver: The settings shared by all members. Every member uses one thread.
+        strengthen: Only use the strengthened formulation.
+    """
+    if solver is None:
+        solver = SolverConfig()
+
+    first_seed = solver.seed or 0
+
+    return [
+        PortfolioMember(
+            replace(solver, threads=1, seed=first_seed + i),
+            strengthen=strengthen or i % 2 == 1,
+        )
+        for i in range(size)
+    ]
+
+
+def _run_member(
+    index: int,
+    member: PortfolioMember,
+    instance: Dict,
+    warm_start: Optional[Assignment],
+    options: Dict,
+    queue: Queue,
+) -> None:
+    # Start a new process group, so the solver can be killed together with us
+    if hasattr(os, "setsid"):
+        os.setsid()
+
+    try:
+        result = solve_instance(
+            **instance,
+            warm_start=warm_start,
+            strengthen=member.strengthen,
+            solver=member.solver,
+            **options,
+        )
+        queue.put((index, result, None))
+    except Exception as error:
+        queue.put((index, None, repr(error)))
+
+
+def kill_process_group(process: Process) -> None:
+    """Kill the process together with its children, e.g. the solver.
+
+    The process must have started its own process group with `os.setsid`.
+    """
+    if process.is_alive():
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except (AttributeError, ProcessLookupError, PermissionError):
+            # No process group of its own (yet)
+            process.terminate()
+
+    process.join()
+
+
+def _better(result: SolveResult, best: Optional[SolveResult]) -> bool:
+    if best is None or (result.feasible and not best.feasible):
+        return True
+
+    return result.feasible and result.cost < best.cost
+
+
+def race(
+    n: int,
+    m: int,
+    B: List[int],
+    E: List[int],
+    R: int,
+    c: Dict,
+    members: List[PortfolioMember],
+    warm_start: Optional[Assignment] = None,
+    presolve: bool = True,
+    break_symmetry: bool = False,
+    aggregate: bool = False,
+) -> SolveResult:
+    """Solve the instance with all members in parallel.
+
+    Args:
+        n: The width of the grid.
+        m: The height of the grid.
+        B: The list of start indexes.
+        E: The list of end indexes.
+        R: Maximum range of underground belts.
+        c: The costs of the instance.
+        members: The configurations to race.
+        warm_start: An initial solution for all members.
+        presolve: Build the problems with presolve.
+        break_symmetry: Break the mirror symmetry of the instance.
+        aggregate: Solve through relaxations with the total flow of the inputs.
+
+    Returns:
+        The first optimal or infeasible result. If no member proves its result,
+        e.g. because of time limits, the best solution of all members.
+        The `backend` of the result describes the winning member.
+    """
+    instance = {"n": n, "m": m, "B": B, "E": E, "R": R, "c": c}
+    options = {
+        "presolve": presolve,
+        "break_symmetry": break_symmetry,
+        "aggregate": aggregate,
+    }
+    queue: Queue = Queue()
+    processes = [
+        Process(
+            target=_run_member,
+            args=(index, member, instance, warm_start, options, queue),
+            daemon=True,
+        )
+        for (index, member) in enumerate(members)
+    ]
+    best: Optional[SolveResult] = None
+    errors = []
+
+    for process in processes:
+        process.start()
+
+    try:
+        for _ in processes:
+            while True:
+                try:
+                    (index, result, error) = queue.get(timeout=0.5)
+                    break
+                except Empty:
+                    # Results are sent before the process exits
+                    if not any(process.is_alive() for process in processes):
+                        (index, result, error) = queue.get(timeout=1)
+                        break
+
+            if result is None:
+                errors.append(f"{members[index].describe()}: {error}")
+                continue
+
+            result.backend = members[index].describe()
+
+            if result.status in ("Optimal", "Infeasible"):
+                best = result
+                break
+
+            if _better(result, best):
+                best = result
+    except Empty:
+        # A member died without result
+        pass
+    finally:
+        for process in processes:
+            kill_process_group(process)
+
+    if best is None:
+        raise RuntimeError(f"No member of the portfolio finished: {errors}")
+
+    return best
@@ -0,0 +1,129 @@
+"""Check an instance for infeasibility and bound its cost before solving it.
+
+The checks only look at the graph, so they take milliseconds, while the solver
+can take a long time to prove that an instance is infeasible.
+
+- Capacity: every output carries at most one full belt, so there can't be more
+  inputs than outputs.
+- Splitters: only splitters branch or merge belts, each by one belt, so at
+  least max(|B|, |E|) - 1 of them are needed. A splitter takes two rows and
+  can't be in the last column, whose tiles lead to the end points.
+- Max flow: all inputs have to reach the end points at the same time, over
+  arcs that carry one belt each and tiles that carry at most two belts (the
+  fragment of a splitter, one belt each over its two outgoing arcs).
+
+The lower bound on the cost combines the splitters with the belts that cross
+the grid. All inputs together are |B| belts that cross every one of the n cuts
+between neighbouring columns (and the last column and the end points). A
+transport belt carries one belt over one cut, an underground belt one belt
+over up to R cuts and a splitter fragment up to two belts over one cut.
+"""
+import math
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import networkx as nx
+
+
+@dataclass
+class Precheck:
+    """The outcome of the checks of an instance."""
+
+    # False if the instance is proven to be infeasible
+    feasible: bool
+    # A lower bound on the cost of every solution
+    lower_bound: float
+    # The lower bounds of the individual parts of the cost
+    bounds: Dict[str, float] = field(default_factory=dict)
+    # Why the instance is infeasible
+    reason: Optional[str] = None
+
+    def can_beat(self, cost: Optional[float]) -> bool:
+        """Can a solution of the instance cost less than the given cost?"""
+        return self.feasible and (cost is None or self.lower_bound < cost)
+
+
+def min_splitters(belt_n: int, belt_m: int) -> int:
+    """Get the minimum number of splitters of a balancer."""
+    return max(belt_n, belt_m) - 1
+
+
+def _max_flow(G: nx.DiGraph) -> float:
+    """Get the maximum number of belts from the start points to the end points."""
+    # Every tile is split into an entry and an exit node to limit its flow
+    H = nx.DiGraph()
+
+    for (v, attrs) in G.nodes.items():
+        if attrs["grid"]:
+            H.add_edge(("in", v), ("out", v), capacity=2)
+
+    for (v, w) in G.edges:
+        tail = ("out", v) if G.nodes[v]["grid"] else v
+        head = ("in", w) if G.nodes[w]["grid"] else w
+        H.add_edge(tail, head, capacity=1)
+
+    for b in G.graph["B"]:
+        H.add_edge("source", (-1, b), capacity=1)
+
+    for e in G.graph["E"]:
+        H.add_edge((G.graph["n"], e), "sink", capacity=1)
+
+    return nx.maximum_flow_value(H, "source", "sink")
+
+
+def check_instance(G: nx.DiGraph, c: Dict) -> Precheck:
+    """Check the instance of G for infeasibility and bound its cost.
+
+    Args:
+        G: The graph of the instance.
+        c: The costs of the instance.
+    """
+    n = G.graph["n"]
+    m = G.graph["m"]
+    R = G.graph["R"]
+    B = G.graph["B"]
+    E = G.graph["E"]
+
+    splitters = min_splitters(len(B), len(E))
+    # The cheapest way to carry one belt over one cut without splitters
+    belt_rate = min(c["transport"], c["underground"] / max(R, 1))
+
+    def cost(fragments: int) -> float:
+        return c["splitter"] * fragments + belt_rate * max(
+            0, n * len(B) - 2 * fragments
+        )
+
+    # The cost is convex in the number of splitter fragments, with the minimum
+    # at the fewest fragments or at the fragments that carry all belts
+    crossings = n * len(B) / 2
+    fragments = min(
+        (
+            max(2 * splitters, candidate)
+            for candidate in (0, math.floor(crossings), math.ceil(crossings))
+        ),
+        key=cost,
+    )
+    bounds = {
+        "splitters": c["splitter"] * fragments,
+        "belts": cost(fragments) - c["splitter"] * fragments,
+    }
+    lower_bound = sum(bounds.values())
+
+    def infeasible(reason: str) -> Precheck:
+        return Precheck(False, lower_bound, bounds, reason)
+
+    if len(B) > len(E):
+        return infeasible(f"The {len(B)} inputs don't fit onto the {len(E)} outputs.")
+
+    if splitters > (n - 1) * (m // 2):
+        return infeasible(
+            f"The balancer needs {splitters} splitters, but only "
+            f"{(n - 1) * (m // 2)} fit outside of the last column."
+        )
+
+    if (flow := _max_flow(G)) < len(B):
+        return infeasible(
+            f"Only {flow:g} of the {len(B)} input belts reach the outputs."
+        )
+
+    return Precheck(True, lower_bound, bounds)
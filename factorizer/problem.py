@@ -1,22 +1,147 @@
-from typing import Dict, Tuple
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
 
-from pulp import *
 import networkx as nx
+from pulp import (
+    LpAffineExpression,
+    LpBinary,
+    LpContinuous,
+    LpMinimize,
+    LpProblem,
+    LpVariable,
+    lpSum,
+)
 
 from factorizer import D, F_s
 from factorizer.utils import splitter_out_edge, dir_out_edge, opposite_dir, dir_in_edge
 
 VarDict = Dict[Tuple, LpVariable]
 
+# The commodity of the total flow of all inputs
+TOTAL = "total"
+
+# The number of entities that the symmetry breaking compares, whose weights
+# grow as powers of 2
+MAX_SYMMETRY_ENTITIES = 16
+
+
+@dataclass
+class ModelReport:
+    """Statistics about a built problem."""
+
+    variables: int = 0
+    constraints: int = 0
+    # Variables that presolve never created, because they can only be 0
+    pruned_variables: int = 0
+    # Constraints that presolve dropped, because all their variables were pruned
+    trivial_constraints: int = 0
+    # Constraints that presolve dropped, because they were already added
+    duplicate_constraints: int = 0
+    nonzeros: int = 0
+    # The number of variables per variable dict
+    variable_kinds: Dict[str, int] = field(default_factory=dict)
+    # The number of rows and nonzeros per constraint family
+    families: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    # The family of each constraint, by constraint name
+    constraint_families: Dict[str, str] = field(default_factory=dict, repr=False)
+
+    def to_dict(self) -> Dict:
+        """Convert the report to a JSON compatible dict, without the constraint names."""
+        data = asdict(self)
+        del data["constraint_families"]
+
+        return data
+
+    def summary(self) -> str:
+        return (
+            f"{self.variables} variables, {self.constraints} constraints "
+            f"(pruned {self.pruned_variables} variables, "
+            f"{self.trivial_constraints} trivial and "
+            f"{self.duplicate_constraints} duplicate constraints)"
+        )
+
+
+class _PrunedVarDict(dict):
+    """A variable dict, in which the pruned variables are the constant 0."""
+
+    def __missing__(self, key):
+        return LpAffineExpression()
+
+
+def _prune(G: nx.DiGraph, V_grid, R_u):
+    """Find the underground belts, splitter fragments and arcs that can be used.
+
+    Underground belts need an arc and a transport belt arc as end piece.
+    Splitter fragments need both outgoing arcs and the other fragment.
+    Underground and splitter arcs are only usable with their entity.
+    """
+    U_keys = []
+
+    for v in V_grid:
+        for d in D:
+            for r in R_u:
+                if underground_edge := dir_out_edge(G, v, d, r):
+                    if dir_out_edge(G, underground_edge[1], d):
+                        U_keys.append((v, d, r))
+
+    S_keys = {
+        (v, f)
+        for v in V_grid
+        for f in F_s
+        if splitter_out_edge(G, v, f) and dir_out_edge(G, v, "right")
+    }
+    # The right fragment at (i, j) belongs to the left fragment at (i, j + 1)
+    S_keys = [
+        (v, f)
+        for v in V_grid
+        for f in F_s
+        if (v, f) in S_keys
+        and ((v[0], v[1] + (1 if f == "right" else -1)), opposite_dir(f)) in S_keys
+    ]
+
+    U_set = set(U_keys)
+    S_set = set(S_keys)
+    A = []
+
+    for (a, attrs) in G.edges.items():
+        if attrs["split"]:
+            if (a[0], "right" if attrs["d"] == "up" else "left") not in S_set:
+                continue
+        elif attrs["r"] > 1 and (a[0], attrs["d"], attrs["r"]) not in U_set:
+            continue
+
+        A.append(a)
+
+    return U_keys, S_keys, A
+
 
 def build_problem(
-    G: nx.DiGraph, c: Dict
+    G: nx.DiGraph,
+    c: Dict,
+    presolve: bool = False,
+    strengthen: bool = False,
+    report: Optional[ModelReport] = None,
+    commodities: Optional[List] = None,
+    break_symmetry: bool = False,
 ) -> Tuple[LpProblem, VarDict, VarDict, VarDict, VarDict, VarDict]:
     """Build the problem from the instance.
 
     Args:
         G: The graph of the instance.
         c: The costs of the instance.
+        presolve: Don't create variables that can only be 0, and drop the
+            constraints that become trivial or duplicate because of it.
+            The variable dicts then return the constant 0 for the missing keys.
+        strengthen: Add valid inequalities that tighten the LP relaxation.
+            They don't change the optimum, but prune the search tree.
+        report: Fill this with statistics about the problem.
+        commodities: The commodities of the flow, the inputs of B and TOTAL for
+            the total flow of all inputs. Defaults to all inputs. With TOTAL,
+            the belt capacity limits the total flow and the other inputs are
+            only balanced if they are among the commodities.
+        break_symmetry: If the instance is its own vertical mirror image,
+            only allow the one of each pair of mirrored layouts that is the
+            larger one in the lexicographic order (see `is_mirror_symmetric`).
     """
     V_all = G.nodes
     V_grid = [v for v in V_all if G.nodes[v]["grid"]]
@@ -28,35 +153,66 @@ def build_problem(
     B = G.graph["B"]
     E = G.graph["E"]
     R_u = G.graph["R_u"]
+    K = B if commodities is None else commodities
 
     problem = LpProblem(G.graph["name"], LpMinimize)
 
+    if report is None:
+        report = ModelReport()
+
     # --- VARIABLES ---
 
+    if presolve:
+        all_variables = len(V_grid) * (1 + len(D) * len(R_u) + len(F_s))
+        all_variables += len(A) * (len(K) + 1)
+
+        U_keys, S_keys, A = _prune(G, V_grid, R_u)
+        var_dict = _PrunedVarDict
+    else:
+        U_keys = [(v, d, r) for v in V_grid for d in D for r in R_u]
+        S_keys = [(v, f) for v in V_grid for f in F_s]
+        var_dict = dict
+
     # Build a transport belt at node v?
     t = {v: LpVariable(f"t_{v}", cat=LpBinary) for v in V_grid}
 
     # Build underground belt with range r at node v in direction d?
-    u = {
-        (v, d, r): LpVariable(f"u_{v}_{d}_{r}", cat=LpBinary)
-        for v in V_grid
-        for d in D
-        for r in R_u
-    }
+    u = var_dict(
+        ((v, d, r), LpVariable(f"u_{v}_{d}_{r}", cat=LpBinary)) for (v, d, r) in U_keys
+    )
 
     # Build splitter fragment f at node v?
     # For now, we assume splitters always point rightwards
-    s = {(v, f): LpVariable(f"s_{v}_{f}", cat=LpBinary) for v in V_grid for f in F_s}
+    s = var_dict(((v, f), LpVariable(f"s_{v}_{f}", cat=LpBinary)) for (v, f) in S_keys)
 
     # Send how much from start point b over arc a?
-    x = {
-        (a, b): LpVariable(f"x_{a}_{b}", cat=LpContinuous, lowBound=0.0)
+    x = var_dict(
+        ((a, b), LpVariable(f"x_{a}_{b}", cat=LpContinuous, lowBound=0.0))
         for a in A
-        for b in B
-    }
+        for b in K
+    )
 
     # Activate arc a?
-    y = {a: LpVariable(f"y_{a}", cat=LpBinary) for a in A}
+    y = var_dict((a, LpVariable(f"y_{a}", cat=LpBinary)) for a in A)
+
+    report.variable_kinds = {
+        "t": len(t),
+        "u": len(u),
+        "s": len(s),
+        "x": len(x),
+        "y": len(y),
+    }
+    report.variables = sum(report.variable_kinds.values())
+
+    def load(a):
+        """The total flow over arc a."""
+        if TOTAL in K:
+            return x[a, TOTAL]
+
+        return lpSum(x[a, b] for b in K)
+
+    if presolve:
+        report.pruned_variables = all_variables - report.variables
 
     # --- OBJECTIVE ---
 
@@ -71,16 +227,25 @@ def build_problem(
 
     # --- CONSTRAINTS ---
 
+    # The constraint families and the index of their first row
+    families: List[Tuple[str, int]] = []
+
+    def family(name: str) -> None:
+        families.append((name, len(problem.constraints)))
+
     # Only place at most one entity on each tile
+    family("entity")
     for v in V_grid:
         problem += (
             t[v]
             + lpSum(u[v, d, r] for r in R_u for d in D)
             + lpSum(s[v, f] for f in F_s)
-        ) <= 1
+            <= 1
+        )
 
     # Only one non-splitter arc can be activated per tile
-    for v in V_grid:
+    family("arc_limit")
+    for v in V_grid if not strengthen else []:
         # Outgoing
         problem += lpSum(y[a] for a in G.out_edges(v) if not G.edges[a]["split"]) <= 1
 
@@ -88,22 +253,22 @@ def build_problem(
         problem += lpSum(y[a] for a in G.in_edges(v) if not G.edges[a]["split"]) <= 1
 
     # Splitter arcs can only be activated by splitters
+    family("splitter_arcs")
     for v in V_grid:
-        for a in G.out_edges(v):
-            if G.edges[a]["split"]:
-                if G.edges[a]["d"] == "up":
-                    problem += y[a] <= s[v, "right"]
-                elif G.edges[a]["d"] == "down":
-                    problem += y[a] <= s[v, "left"]
+        for f in ["right", "left"]:
+            if splitter_edge := splitter_out_edge(G, v, f):
+                problem += y[splitter_edge] <= s[v, f]
 
     # Always place splitter fragments together
+    family("splitter_pairs")
     for i in range(n):
         for j in range(m - 1):
             problem += s[(i, j), "right"] == s[(i, j + 1), "left"]
 
     # Balance splitter output
+    family("splitter_balance")
     for v in V_grid:
-        for b in B:
+        for b in K:
             for f in F_s:
                 splitter_edge = splitter_out_edge(G, v, f)
                 normal_edge = dir_out_edge(G, v, "right")
@@ -112,13 +277,19 @@ def build_problem(
                     balanced_flow = 0.5 * lpSum(x[a, b] for a in G.in_edges(v))
                     M = (1 - y[splitter_edge]) * 0.5 * len(E)
 
-                    problem += balanced_flow + M >= x[splitter_edge, b]
+                    # Without activated splitter arc, there is no flow to balance
+                    if strengthen:
+                        problem += balanced_flow >= x[splitter_edge, b]
+                    else:
+                        problem += balanced_flow + M >= x[splitter_edge, b]
+
                     problem += balanced_flow + M >= x[normal_edge, b]
                 else:
                     problem += s[v, f] == 0
 
     # A splitter can only have flow to the right
-    for v in V_grid:
+    family("splitter_out")
+    for v in V_grid if not strengthen else []:
         for f in F_s:
             for d in D:
                 if d != "right":
@@ -126,7 +297,8 @@ def build_problem(
                         problem += y[dir_edge] <= 1 - s[v, f]
 
     # A splitter can only take flow from the left
-    for v in V_grid:
+    family("splitter_in")
+    for v in V_grid if not strengthen else []:
         for f in F_s:
             for d in D:
                 if d != "right":
@@ -134,6 +306,7 @@ def build_problem(
                         problem += y[dir_edge] <= 1 - s[v, f]
 
     # Activated arcs must come from an entity and go to an entity
+    family("arc_entity")
     for v in V_grid:
         entity = (
             t[v]
@@ -142,12 +315,15 @@ def build_problem(
         )
 
         for a in G.in_edges(v):
-            problem += entity >= y[a]
+            if not strengthen or G.edges[a]["split"]:
+                problem += entity >= y[a]
 
         for a in G.out_edges(v):
-            problem += entity >= y[a]
+            if not strengthen or G.edges[a]["split"]:
+                problem += entity >= y[a]
 
     # Only underground belts can have underground flow
+    family("underground_arcs")
     for v in V_grid:
         for d in D:
             for r in R_u:
@@ -156,12 +332,13 @@ def build_problem(
                 else:
                     problem += u[v, d, r] == 0
 
-                for d2 in D:
+                for d2 in D if not strengthen else []:
                     if transport_belt_edge := dir_out_edge(G, v, d2):
                         # Underground belts cannot have transport belt flow
                         problem += y[transport_belt_edge] <= 1 - u[v, d, r]
 
     # Avoid underground belt conflicts
+    family("underground_conflicts")
     for v in V_grid:
         for d in D:
             for r in R_u:
@@ -181,6 +358,7 @@ def build_problem(
                                 )
 
     # An underground belt must have a transport belt as "end piece"
+    family("underground_end")
     for v in V_grid:
         for d in D:
             for r in R_u:
@@ -194,17 +372,25 @@ def build_problem(
                         problem += u[v, d, r] == 0
 
     # Only allow flow over activated arcs
-    for a in A:
-        for b in B:
+    family("arc_flow")
+    for a in A if not strengthen else []:
+        for b in K:
             problem += x[a, b] <= len(E) * y[a]
 
     # Respect belt capacity
-    for a in A:
-        problem += lpSum(x[a, b] for b in B) <= len(E)
+    family("capacity")
+    for a in A if not strengthen else []:
+        problem += load(a) <= len(E)
+
+    # The inputs are part of the total flow
+    family("total")
+    for a in A if TOTAL in K else []:
+        problem += lpSum(x[a, b] for b in K if b != TOTAL) <= x[a, TOTAL]
 
     # Flow conservation
+    family("conservation")
     for v in V_grid:
-        for b in B:
+        for b in K:
             problem += (
                 lpSum(x[a, b] for a in G.out_edges(v))
                 - lpSum(x[a, b] for a in G.in_edges(v))
@@ -212,15 +398,189 @@ def build_problem(
             )
 
     # Supply
-    for b1 in B:
+    family("supply")
+    for b1 in K:
         for b2 in B:
-            supply = len(E) if b1 == b2 else 0
+            supply = len(E) if b1 in (b2, TOTAL) else 0
 
             problem += x[((-1, b2), (0, b2)), b1] == supply
 
     # Demand
-    for b in B:
+    family("demand")
+    for b in K:
         for e in E:
-            problem += x[((n - 1, e), (n, e)), b] == 1
+            problem += x[((n - 1, e), (n, e)), b] == (len(B) if b == TOTAL else 1)
+
+    if strengthen:
+        _add_valid_inequalities(problem, G, V_grid, A, t, u, s, load, y, family)
+
+    if break_symmetry and is_mirror_symmetric(G):
+        family("symmetry")
+        problem += _lex_leader(G, V_grid, t, u, s) >= 0
+
+    constraint_families = _assign_families(problem, families)
+
+    if presolve:
+        _drop_constraints(problem, report)
+
+    report.constraints = len(problem.constraints)
+
+    for (name, constraint) in problem.constraints.items():
+        family_name = constraint_families[name]
+        report.constraint_families[name] = family_name
+
+        counts = report.families.setdefault(family_name, {"rows": 0, "nonzeros": 0})
+        counts["rows"] += 1
+        counts["nonzeros"] += len(constraint)
+        report.nonzeros += len(constraint)
 
     return problem, t, u, s, x, y
+
+
+def _add_valid_inequalities(
+    problem: LpProblem, G: nx.DiGraph, V_grid, A, t, u, s, load, y, family
+) -> None:
+    """Add the inequalities of the strengthened formulation.
+
+    The cliques and the aggregated capacity replace the weaker rows of the
+    base model that they dominate. The flow covers are implied by the integer
+    model, but cut off fractional solutions.
+    """
+    B = G.graph["B"]
+    E = G.graph["E"]
+    R_u = G.graph["R_u"]
+
+    def non_split(arcs):
+        return [a for a in arcs if not G.edges[a]["split"]]
+
+    def underground(v):
+        return lpSum(u[v, d, r] for r in R_u for d in D)
+
+    def splitter(v):
+        return lpSum(s[v, f] for f in F_s)
+
+    # Merge the rows for single non-splitter arcs, which also limits them to one
+    family("arc_entity_clique")
+    for v in V_grid:
+        entity = t[v] + underground(v) + splitter(v)
+
+        problem += entity >= lpSum(y[a] for a in non_split(G.out_edges(v)))
+        problem += entity >= lpSum(y[a] for a in non_split(G.in_edges(v)))
+
+    # Underground belts and transport belt arcs exclude each other
+    family("underground_clique")
+    for v in V_grid:
+        transport_belt_edges = [
+            transport_belt_edge
+            for d in D
+            if (transport_belt_edge := dir_out_edge(G, v, d))
+        ]
+        problem += lpSum(y[a] for a in transport_belt_edges) + underground(v) <= 1
+
+    # Splitters and arcs that don't go right exclude each other
+    family("splitter_clique")
+    for v in V_grid:
+        for dir_edge in [dir_out_edge, dir_in_edge]:
+            edges = [a for d in D if d != "right" if (a := dir_edge(G, v, d))]
+            problem += lpSum(y[a] for a in edges) + splitter(v) <= 1
+
+    # Flow cover, a splitter takes flow over its own and its partner's arc
+    family("flow_cover")
+    for v in V_grid:
+        for arcs in [G.in_edges(v), G.out_edges(v)]:
+            problem += lpSum(load(a) for a in arcs) <= len(E) * (
+                t[v] + underground(v)
+            ) + 2 * len(E) * splitter(v)
+
+    # Only splitters branch or merge belts, each one by one belt at most
+    family("splitter_count")
+    problem += lpSum(s[v, "right"] for v in V_grid) >= max(len(B), len(E)) - 1
+
+    # Only allow flow over activated arcs and respect belt capacity
+    family("aggregated_capacity")
+    for a in A:
+        problem += load(a) <= len(E) * y[a]
+
+
+def is_mirror_symmetric(G: nx.DiGraph) -> bool:
+    """Is the instance of G its own vertical mirror image?
+
+    The mirror image of a layout is then a layout with the same cost, with
+    the entities of the tile (i, j) on the tile (i, m - 1 - j).
+    """
+    m = G.graph["m"]
+
+    return all(
+        sorted((m - 1) - j for j in G.graph[key]) == sorted(G.graph[key])
+        for key in ("B", "E")
+    )
+
+
+def _lex_leader(G: nx.DiGraph, V_grid, t, u, s) -> LpAffineExpression:
+    """Compare the entities of the lower half of the grid to their mirror images.
+
+    The splitters, underground belts and transport belts of the tiles below the
+    middle row are compared to those of the mirrored tiles above it, in this
+    order and column by column. The weights are powers of 2, so the sign of the
+    expression is that of the first difference: it is at least 0 either for a
+    layout or for its mirror image.
+    """
+    m = G.graph["m"]
+    R_u = G.graph["R_u"]
+
+    def mirror(v):
+        return v[0], (m - 1) - v[1]
+
+    lower = sorted(v for v in V_grid if v[1] < mirror(v)[1])
+    entities = [
+        lambda v: lpSum(s[v, f] for f in F_s),
+        lambda v: lpSum(u[v, d, r] for r in R_u for d in D),
+        lambda v: t[v],
+    ]
+    differences = [entity(v) - entity(mirror(v)) for entity in entities for v in lower][
+        :MAX_SYMMETRY_ENTITIES
+    ]
+
+    return lpSum(
+        2 ** (len(differences) - 1 - k) * difference
+        for (k, difference) in enumerate(differences)
+    )
+
+
+def _assign_families(
+    problem: LpProblem, families: List[Tuple[str, int]]
+) -> Dict[str, str]:
+    """Get the family of each constraint by the index of the first row of the families."""
+    names = list(problem.constraints)
+    constraint_families = {}
+
+    for (i, (family, start)) in enumerate(families):
+        end = families[i + 1][1] if i + 1 < len(families) else len(names)
+
+        for name in names[start:end]:
+            constraint_families[name] = family
+
+    return constraint_families
+
+
+def _drop_constraints(problem: LpProblem, report: ModelReport) -> None:
+    """Drop the trivial and duplicate constraints of the problem."""
+    seen = set()
+
+    for (name, constraint) in list(problem.constraints.items()):
+        if len(constraint) == 0 and constraint.valid():
+            report.trivial_constraints += 1
+            del problem.constraints[name]
+            continue
+
+        key = (
+            tuple(sorted((v.name, a) for (v, a) in constraint.items())),
+            constraint.sense,
+            constraint.constant,
+        )
+
+        if key in seen:
+            report.duplicate_constraints += 1
+            del problem.constraints[name]
+        else:
+            seen.add(key)
@@ -0,0 +1,46 @@
+"""The result of solving an instance.
+
+It only depends on the standard library, so the solution cache can return
+results without importing the solver and graph libraries.
+"""
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from factorizer.assignment import Assignment
+
+
+@dataclass
+class SolveResult:
+    """The outcome of solving a single instance."""
+
+    n: int
+    m: int
+    B: List[int]
+    E: List[int]
+    R: int
+    status: str
+    cost: Optional[float] = None
+    blueprint: Optional[str] = None
+    # The non-zero variable values of the solution
+    assignment: Optional[Assignment] = None
+    # Wall time of the individual phases, in seconds
+    times: Dict[str, float] = field(default_factory=dict)
+    # The solver backend that produced the result
+    backend: Optional[str] = None
+    # A lower bound on the cost from the pre-check
+    lower_bound: Optional[float] = None
+
+    @property
+    def feasible(self) -> bool:
+        return self.cost is not None
+
+    @property
+    def wall_time(self) -> float:
+        return sum(self.times.values())
+
+    def to_dict(self) -> Dict:
+        """Convert the result to a JSON compatible dict, without the assignment."""
+        data = asdict(self)
+        del data["assignment"]
+
+        return data
@@ -0,0 +1,223 @@
+"""Verify that a layout balances its inputs, without solving the problem again.
+
+The items of all inputs are propagated through the belts, underground belts and
+splitters of the layout at once. Every input carries one full belt of its own
+items. A splitter fragment sends half of its items straight on and half
+diagonally to the other fragment's lane, like in the problem.
+
+Every tile moves its items along at most two arcs, so the items are pushed
+along the arcs in topological order, which takes time linear in the size of the
+layout. Small layouts and layouts with loops solve a dense linear system
+instead.
+
+The flows are linear in the inputs and belts have no capacity limit here, so a
+layout that sends an equal share of every single input to every output also
+balances every combination of inputs. Back-pressure of full belts isn't
+modelled, but the load of every tile is checked against one full belt.
+"""
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+
+from factorizer import (
+    D,
+    SPLITTER_LEFT,
+    SPLITTER_RIGHT,
+    TRANSPORT,
+    UNDERGROUND_INPUT,
+    UNDERGROUND_OUTPUT,
+)
+from factorizer.solution import Solution, solution_from_blueprint
+from factorizer.visualization.blueprint import parse_blueprint
+
+# The offsets to the next tile, in the order of D
+_DX = np.array([1 if d == "right" else -1 if d == "left" else 0 for d in D])
+_DY = np.array([1 if d == "up" else -1 if d == "down" else 0 for d in D])
+
+# Solve layouts with up to this many nodes as a dense linear system, which is
+# faster than pushing the items along the arcs for them
+MAX_DENSE_NODES = 128
+
+
+@dataclass
+class Simulation:
+    """The flows of all inputs through a layout, every input a full belt."""
+
+    B: List[int]
+    E: List[int]
+    # The share of the input B[k] that arrives at the output E[l], shape (|E|, |B|)
+    shares: np.ndarray
+    # The share of each input that leaves the layout elsewhere or gets stuck
+    leaked: np.ndarray
+    # The highest number of full belts on a single tile
+    max_load: float
+    errors: List[str] = field(default_factory=list)
+
+    def problems(self, tolerance: float = 1e-6) -> List[str]:
+        """Describe why the layout isn't a balancer, empty if it is one."""
+        problems = list(self.errors)
+        expected = 1 / len(self.E)
+
+        for (b, leaked) in zip(self.B, self.leaked):
+            if leaked > tolerance:
+                problems.append(f"{leaked:.3f} of input {b} doesn't reach an output.")
+
+        for (l, k) in zip(*np.nonzero(np.abs(self.shares - expected) > tolerance)):
+            problems.append(
+                f"Output {self.E[l]} gets {self.shares[l, k]:.3f} of input "
+                f"{self.B[k]} instead of {expected:.3f}."
+            )
+
+        if self.max_load > 1 + tolerance:
+            problems.append(f"A tile carries {self.max_load:.3f} full belts.")
+
+        return problems
+
+    @property
+    def balanced(self) -> bool:
+        return not self.problems()
+
+
+def _propagate(
+    tails: np.ndarray, heads: np.ndarray, shares: np.ndarray, sources: np.ndarray
+) -> Optional[np.ndarray]:
+    """Push the items of the sources along the arcs in topological order.
+
+    Returns:
+        The items that pass every node, or None if the arcs have a loop.
+    """
+    size = len(sources)
+    flows = sources.copy()
+    # The number of arcs into every node whose items haven't arrived yet
+    pending = np.bincount(heads, minlength=size)
+    done = np.zeros(size, dtype=bool)
+    ready = pending == 0
+
+    while ready.any():
+        done |= ready
+        active = ready[tails]
+        np.add.at(flows, heads[active], flows[tails[active]] * shares[active, None])
+        pending -= np.bincount(heads[active], minlength=size)
+        ready = (pending == 0) & ~done
+
+    return flows if done.all() else None
+
+
+def simulate(solution: Solution) -> Simulation:
+    """Propagate the items of all inputs through the layout of the solution."""
+    (n, m) = (solution.n, solution.m)
+    (B, E) = (solution.B, solution.E)
+    tiles = n * m
+    errors = []
+
+    # The nodes are the tiles (i * m + j), the outputs and a sink for the items
+    # that leave the layout or get stuck
+    sink = tiles + len(E)
+    size = sink + 1
+    end_rows = np.full(m, sink)
+    end_rows[E] = tiles + np.arange(len(E))
+
+    def targets(i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        """Get the nodes of the tiles (i, j), the output or the sink."""
+        result = np.full(len(i), sink)
+        inside = (0 <= i) & (i < n) & (0 <= j) & (j < m)
+        result[inside] = i[inside] * m + j[inside]
+        end = (i == n) & (0 <= j) & (j < m)
+        result[end] = end_rows[j[end]]
+
+        return result
+
+    entity = solution.entity.ravel()
+    direction = solution.direction.ravel()
+    (i, j) = np.divmod(np.arange(tiles), m)
+
+    # The arcs from tails to heads, along which a share of the items moves on
+    arcs = []
+    # Every tile without a valid entity loses its items
+    routed = np.zeros(tiles, dtype=bool)
+
+    def move(tails: np.ndarray, heads: np.ndarray, share: float) -> None:
+        arcs.append((tails, heads, np.full(len(tails), share)))
+
+    belts = np.flatnonzero(
+        ((entity == TRANSPORT) | (entity == UNDERGROUND_OUTPUT)) & (direction >= 0)
+    )
+    move(
+        belts,
+        targets(i[belts] + _DX[direction[belts]], j[belts] + _DY[direction[belts]]),
+        1,
+    )
+    routed[belts] = True
+
+    tunnels = np.array(
+        [
+            (vi * m + vj, wi * m + wj)
+            for ((vi, vj), (wi, wj), _, _) in solution.underground_pairs
+            if entity[vi * m + vj] == UNDERGROUND_INPUT
+        ],
+        dtype=int,
+    ).reshape(-1, 2)
+    move(tunnels[:, 0], tunnels[:, 1], 1)
+    routed[tunnels[:, 0]] = True
+
+    # The right fragment is below the left fragment of its splitter
+    left = np.flatnonzero(entity == SPLITTER_LEFT)
+    paired = left[(j[left] > 0) & (entity[np.maximum(left - 1, 0)] == SPLITTER_RIGHT)]
+    paired = paired[direction[paired] == D.index("right")]
+    right = paired - 1
+
+    for fragments in (paired, right):
+        for lane in (paired, right):
+            move(fragments, targets(i[lane] + 1, j[lane]), 0.5)
+
+    routed[paired] = True
+    routed[right] = True
+
+    if unpaired := int((entity == SPLITTER_LEFT).sum() - len(paired)):
+        errors.append(f"{unpaired} splitter(s) without a right fragment facing right.")
+
+    lost = np.flatnonzero(~routed)
+    move(lost, np.full(len(lost), sink), 1)
+    (tails, heads, shares) = (np.concatenate(parts) for parts in zip(*arcs))
+
+    # Every input puts one full belt onto the first tile of its row
+    sources = np.zeros((size, len(B)))
+    sources[np.asarray(B), np.arange(len(B))] = 1
+
+    flows = None
+
+    if size > MAX_DENSE_NODES:
+        flows = _propagate(tails, heads, shares, sources)
+
+    if flows is None:
+        # Items that go around a loop and leave it eventually still add up
+        moves = np.zeros((size, size))
+        np.add.at(moves, (heads, tails), shares)
+
+        try:
+            flows = np.linalg.solve(np.eye(size) - moves, sources)
+        except np.linalg.LinAlgError:
+            errors.append("Items circle in a loop forever.")
+            flows = np.zeros((size, len(B)))
+
+    return Simulation(
+        B,
+        E,
+        flows[tiles:sink],
+        flows[sink],
+        float(flows[:tiles].sum(axis=1).max(initial=0)),
+        errors,
+    )
+
+
+def verify_blueprint(
+    blueprint: str, n: int, m: int, B: List[int], E: List[int], R: int
+) -> Simulation:
+    """Simulate the layout of a blueprint string on the n x m grid.
+
+    The arguments are the same as for `solution_from_blueprint`.
+    """
+    data = parse_blueprint(blueprint)
+
+    return simulate(solution_from_blueprint(data, n, m, B, E, R))
@@ -0,0 +1,282 @@
+"""Decode the solved variables once into a compact solution.
+
+The exporters read the entities and flows of the solution from arrays instead
+of querying the PuLP variables tile by tile.
+Binary variables count as set within a tolerance, so solutions of solvers that
+return values like 0.9999999 decode the same.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+
+from factorizer import (
+    D,
+    EMPTY,
+    SPLITTER_LEFT,
+    SPLITTER_RIGHT,
+    TRANSPORT,
+    UNDERGROUND_INPUT,
+    UNDERGROUND_OUTPUT,
+)
+from factorizer.utils import dir_out_edge
+
+# The offset to the next tile in each direction
+_OFFSETS = {"right": (1, 0), "left": (-1, 0), "up": (0, 1), "down": (0, -1)}
+
+# The maximum distance of a binary value from 1 to count as set, and of a flow
+# from the nearest integer to be rounded to it
+DEFAULT_TOLERANCE = 1e-4
+
+
+class Solution:
+    """The entities and flows of a solved instance.
+
+    The entity of the tile (i, j) is `entity[i, j]`, facing `D[direction[i, j]]`
+    (-1 if it has no direction). Underground belts have their `range[i, j]`.
+    The flow of the commodity `B[k]` on the arc `arcs[l]` is `flows[l, k]`.
+    """
+
+    __slots__ = (
+        "name",
+        "n",
+        "m",
+        "B",
+        "E",
+        "entity",
+        "direction",
+        "range",
+        "underground_pairs",
+        "arcs",
+        "flows",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        n: int,
+        m: int,
+        B: List[int],
+        E: List[int],
+        entity: np.ndarray,
+        direction: np.ndarray,
+        range: np.ndarray,
+        underground_pairs: List[Tuple[Tuple, Tuple, str, int]],
+        arcs: List[Tuple],
+        flows: np.ndarray,
+    ):
+        self.name = name
+        self.n = n
+        self.m = m
+        self.B = B
+        self.E = E
+        self.entity = entity
+        self.direction = direction
+        self.range = range
+        # The input and output tile, direction and range of every underground belt
+        self.underground_pairs = underground_pairs
+        self.arcs = arcs
+        self.flows = flows
+
+    def tile_direction(self, v: Tuple[int, int]) -> Optional[str]:
+        """Get the direction the entity on the tile faces, if any."""
+        index = self.direction[v]
+
+        return D[index] if index >= 0 else None
+
+    def used_arcs(self) -> List[Tuple[Tuple, np.ndarray]]:
+        """Get the arcs with flow and their flow per commodity."""
+        used = np.flatnonzero(self.flows.sum(axis=1) > 0)
+
+        return [(self.arcs[index], self.flows[index]) for index in used]
+
+    def flow_labels(self) -> Dict[Tuple, str]:
+        """Get the flows per commodity of the used arcs as labels like "2/0"."""
+        return {
+            a: "/".join([str(int(f)) for f in flows]) for (a, flows) in self.used_arcs()
+        }
+
+
+def _read_values(variables: Dict) -> Tuple[List, np.ndarray]:
+    """Read the values of all variables into one array, unsolved ones as 0."""
+    keys = list(variables)
+    values = np.fromiter(
+        (variables[key].value() or 0 for key in keys), dtype=float, count=len(keys)
+    )
+
+    return keys, values
+
+
+def _set_keys(variables: Dict, tolerance: float) -> List:
+    """Get the keys of the binary variables that are set."""
+    (keys, values) = _read_values(variables)
+
+    return [keys[index] for index in np.flatnonzero(values >= 1 - tolerance)]
+
+
+def decode_solution(
+    G: nx.DiGraph, t, u, s, x, y, tolerance: float = DEFAULT_TOLERANCE
+) -> Solution:
+    """Decode the solved variables of the problem of G.
+
+    Args:
+        G: The graph of the instance.
+        t, u, s, x, y: The solved variable dicts of the problem.
+        tolerance: The tolerance for binary values and integral flows.
+    """
+    n = G.graph["n"]
+    m = G.graph["m"]
+    B = G.graph["B"]
+
+    entity = np.full((n, m), EMPTY, dtype=np.int8)
+    direction = np.full((n, m), -1, dtype=np.int8)
+    ranges = np.zeros((n, m), dtype=np.int8)
+
+    # The entities are decoded in reverse priority, so transport belts replace
+    # anything else on their tile and underground belts replace splitters
+    for (v, f) in _set_keys(s, tolerance):
+        entity[v] = SPLITTER_LEFT if f == "left" else SPLITTER_RIGHT
+        direction[v] = D.index("right")
+
+    underground_pairs = []
+
+    for (v, d, r) in _set_keys(u, tolerance):
+        entity[v] = UNDERGROUND_INPUT
+        direction[v] = D.index(d)
+        ranges[v] = r
+
+        if a := dir_out_edge(G, v, d, r):
+            underground_pairs.append((v, a[1], d, r))
+
+    # The direction of a transport belt is the first of its used straight arcs
+    belt_direction: Dict[Tuple, int] = {}
+
+    for a in _set_keys(y, tolerance):
+        attrs = G.edges[a]
+
+        if attrs["r"] == 1 and not attrs["split"]:
+            index = D.index(attrs["d"])
+            belt_direction[a[0]] = min(belt_direction.get(a[0], index), index)
+
+    for v in _set_keys(t, tolerance):
+        entity[v] = TRANSPORT
+        direction[v] = belt_direction.get(v, -1)
+        ranges[v] = 0
+
+    for (_, w, d, r) in underground_pairs:
+        # The output is a transport belt that continues in the same direction
+        if entity[w] == TRANSPORT and direction[w] == D.index(d):
+            entity[w] = UNDERGROUND_OUTPUT
+            ranges[w] = r
+
+    arcs = list(G.edges)
+    arc_index = {a: index for (index, a) in enumerate(arcs)}
+    commodity_index = {b: index for (index, b) in enumerate(B)}
+    flows = np.zeros((len(arcs), len(B)))
+
+    (keys, values) = _read_values(x)
+
+    for ((a, b), value) in zip(keys, values):
+        if a in arc_index and b in commodity_index:
+            flows[arc_index[a], commodity_index[b]] = value
+
+    # Snap the flows that are integral within the tolerance
+    rounded = np.round(flows)
+    flows = np.where(np.abs(flows - rounded) <= tolerance, rounded, flows)
+
+    return Solution(
+        G.graph["name"],
+        n,
+        m,
+        B,
+        G.graph["E"],
+        entity,
+        direction,
+        ranges,
+        underground_pairs,
+        arcs,
+        flows,
+    )
+
+
+# Inverse of `direction_to_index` of the blueprint
+_INDEX_TO_DIRECTION = {0: "up", 2: "right", 4: "down", 6: "left"}
+
+
+def solution_from_blueprint(
+    data: Dict, n: int, m: int, B: List[int], E: List[int], R: int
+) -> Solution:
+    """Get the entities of a parsed blueprint on the n x m grid.
+
+    The flows are not part of a blueprint, they are left empty. Every
+    underground entrance is paired with the closest exit in its direction.
+
+    Args:
+        data: The parsed blueprint, see `parse_blueprint`.
+        n: The width of the grid.
+        m: The height of the grid.
+        B: The list of start indexes.
+        E: The list of end indexes.
+        R: Maximum range of underground belts.
+    """
+    entity = np.full((n, m), EMPTY, dtype=np.int8)
+    direction = np.full((n, m), -1, dtype=np.int8)
+    ranges = np.zeros((n, m), dtype=np.int8)
+
+    def place(v: Tuple[int, int], kind: int, d: str) -> None:
+        if not (0 <= v[0] < n and 0 <= v[1] < m):
+            raise ValueError(f"The entity at {v} is outside of the {n}x{m} grid.")
+
+        entity[v] = kind
+        direction[v] = D.index(d)
+
+    for item in data["blueprint"]["entities"]:
+        position = item["position"]
+        x_coord = int(round(position["x"]))
+        d = _INDEX_TO_DIRECTION[item.get("direction", 0)]
+
+        if item["name"] == "splitter":
+            # The position is the center between the two fragments
+            left = (x_coord, int(round(position["y"] + 0.5)))
+            place(left, SPLITTER_LEFT, d)
+            place((x_coord, left[1] - 1), SPLITTER_RIGHT, d)
+        elif item["name"] == "underground-belt":
+            kind = (
+                UNDERGROUND_INPUT if item.get("type") == "input" else UNDERGROUND_OUTPUT
+            )
+            place((x_coord, int(round(position["y"]))), kind, d)
+        else:
+            place((x_coord, int(round(position["y"]))), TRANSPORT, d)
+
+    underground_pairs = []
+
+    for (i, j) in zip(*np.nonzero(entity == UNDERGROUND_INPUT)):
+        d = D[direction[i, j]]
+        (dx, dy) = _OFFSETS[d]
+
+        for r in range(2, R + 1):
+            w = (int(i) + dx * r, int(j) + dy * r)
+
+            if (
+                0 <= w[0] < n
+                and 0 <= w[1] < m
+                and entity[w] == UNDERGROUND_OUTPUT
+                and direction[w] == direction[i, j]
+            ):
+                ranges[i, j] = ranges[w] = r
+                underground_pairs.append(((int(i), int(j)), w, d, r))
+                break
+
+    return Solution(
+        data["blueprint"].get("label", ""),
+        n,
+        m,
+        B,
+        E,
+        entity,
+        direction,
+        ranges,
+        underground_pairs,
+        [],
+        np.zeros((0, len(B))),
+    )
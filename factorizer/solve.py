@@ -0,0 +1,217 @@
+"""Solve complete instances, from building the graph to the blueprint string."""
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Hashable, List, Optional
+
+from pulp import value
+
+from factorizer.aggregate import solve_aggregated
+from factorizer.assignment import Assignment, extract_assignment
+from factorizer.graph import build_graph
+from factorizer.models import Model, ModelCache, model_key
+from factorizer.precheck import check_instance
+from factorizer.problem import ModelReport, build_problem
+from factorizer.result import SolveResult
+from factorizer.solution import decode_solution
+from factorizer.solvers import SolverConfig, make_solver, solve_status
+from factorizer.visualization.blueprint import convert_to_blueprint
+from factorizer.warmstart import apply_warm_start, find_warm_start
+
+if TYPE_CHECKING:
+    from factorizer.cache import SolutionCache
+
+# The number of built problems that a model store keeps by default
+DEFAULT_MAX_MODELS = 16
+
+
+class ModelStore:
+    """Keep the models of the most recently built instances in memory.
+
+    Solving an instance again, for example with another time limit or seed,
+    then reuses its problem instead of building it from scratch.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_MODELS):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Model]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Model]:
+        """Get the model of the key, if it is still kept."""
+        if key not in self._entries:
+            return None
+
+        self._entries.move_to_end(key)
+
+        return self._entries[key]
+
+    def put(self, key: Hashable, model: Model) -> None:
+        """Keep the model of the key, evicting the least recently used."""
+        self._entries[key] = model
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def solve_instance(
+    n: int,
+    m: int,
+    B: List[int],
+    E: List[int],
+    R: int,
+    c: Dict,
+    cache: Optional["SolutionCache"] = None,
+    warm_start: Optional[Assignment] = None,
+    presolve: bool = True,
+    strengthen: bool = False,
+    solver: Optional[SolverConfig] = None,
+    precheck: bool = True,
+    cutoff: Optional[float] = None,
+    aggregate: bool = False,
+    models: Optional[ModelStore] = None,
+    break_symmetry: bool = False,
+    model_cache: Optional[ModelCache] = None,
+) -> SolveResult:
+    """Build and solve the instance and convert the solution to a blueprint.
+
+    Args:
+        n: The width of the grid.
+        m: The height of the grid.
+        B: The list of start indexes.
+        E: The list of end indexes.
+        R: Maximum range of underground belts.
+        c: The costs of the instance.
+        cache: Look up the result in this cache first and store it there.
+        warm_start: An initial solution for the solver.
+            Defaults to a cached solution of a neighbouring smaller grid.
+        presolve: Build the problem without the variables that can only be 0.
+        strengthen: Build the strengthened formulation.
+        solver: The solver backend and its settings. Defaults to CBC.
+            Results of solves with a gap tolerance are not cached.
+        precheck: Check the instance for infeasibility before building the problem.
+        cutoff: With the pre-check, skip the instance if it can't cost less.
+        aggregate: Solve relaxations with the total flow of the inputs instead,
+            without warm start (see `factorizer.aggregate`).
+        models: Reuse the graph and problem of the instance from this store
+            and keep them there.
+        break_symmetry: Only allow one of each pair of mirrored layouts.
+        model_cache: Load the built problem from this cache and store it there.
+    """
+    if cache is not None:
+        if (cached := cache.get(n, m, B, E, R, c)) is not None:
+            return cached
+
+    if solver is None:
+        solver = SolverConfig()
+
+    times = {}
+
+    key = model_key(n, m, B, E, R, c, presolve, strengthen, break_symmetry)
+    model = models.get(key) if models is not None else None
+
+    if model is None and model_cache is not None:
+        start = time.perf_counter()
+        model = model_cache.get(key)
+        times["model_cache"] = time.perf_counter() - start
+
+        if model is not None and models is not None:
+            models.put(key, model)
+
+    if model is None:
+        start = time.perf_counter()
+        G = build_graph(n, m, B, E, R)
+        times["graph"] = time.perf_counter() - start
+    else:
+        G = model.G
+
+    lower_bound = None
+
+    if precheck:
+        start = time.perf_counter()
+        check = check_instance(G, c)
+        times["precheck"] = time.perf_counter() - start
+        lower_bound = check.lower_bound
+
+        if not check.can_beat(cutoff):
+            result = SolveResult(
+                n,
+                m,
+                B,
+                E,
+                R,
+                "Infeasible" if not check.feasible else "Skipped",
+                times=times,
+                lower_bound=lower_bound,
+            )
+
+            if cache is not None:
+                cache.put(result, c)
+
+            return result
+
+    if model is None:
+        start = time.perf_counter()
+        report = ModelReport()
+        (problem, *variables) = build_problem(
+            G,
+            c,
+            presolve=presolve,
+            strengthen=strengthen,
+            report=report,
+            break_symmetry=break_symmetry,
+        )
+        model = Model(G, problem, tuple(variables), report)
+        times["problem"] = time.perf_counter() - start
+
+        if models is not None:
+            models.put(key, model)
+
+        if model_cache is not None:
+            model_cache.put(key, model)
+
+    problem = model.problem
+    (t, u, s, x, y) = model.variables
+
+    if aggregate:
+        start = time.perf_counter()
+        (status, _) = solve_aggregated(
+            problem,
+            G,
+            c,
+            (t, u, s, x, y),
+            solver,
+            presolve=presolve,
+            strengthen=strengthen,
+            break_symmetry=break_symmetry,
+        )
+        times["solve"] = time.perf_counter() - start
+    else:
+        if warm_start is None and cache is not None:
+            warm_start = find_warm_start(cache, n, m, B, E, R, c)
+
+        use_warm_start = warm_start is not None and apply_warm_start(
+            warm_start, t, u, s, x, y
+        )
+
+        start = time.perf_counter()
+        problem.solve(make_solver(solver, warm_start=use_warm_start))
+        times["solve"] = time.perf_counter() - start
+        status = solve_status(problem)
+
+    result = SolveResult(n, m, B, E, R, status, times=times, lower_bound=lower_bound)
+    result.backend = solver.describe()
+
+    if result.status in ("Optimal", "Feasible"):
+        start = time.perf_counter()
+        result.cost = value(problem.objective)
+        result.blueprint = convert_to_blueprint(decode_solution(G, t, u, s, x, y))
+        result.assignment = extract_assignment(t, u, s, x, y)
+        times["blueprint"] = time.perf_counter() - start
+
+    if cache is not None and solver.gap_rel is None and solver.gap_abs is None:
+        cache.put(result, c)
+
+    return result
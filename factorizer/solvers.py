@@ -0,0 +1,178 @@
+"""Select and configure the MIP solver.
+
+Every backend is a solver supported by PuLP. Options that a backend doesn't
+support raise an error instead of being silently ignored.
+PuLP is only imported once a solver is created, so that the configuration is
+cheap to import.
+"""
+import inspect
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import pulp
+
+# The PuLP solver class of each backend
+BACKENDS = {
+    "cbc": "PULP_CBC_CMD",
+    "coin": "COIN_CMD",
+    "highs": "HiGHS_CMD",
+    "gurobi": "GUROBI_CMD",
+    "cplex": "CPLEX_CMD",
+    "scip": "SCIP_CMD",
+    "glpk": "GLPK_CMD",
+}
+
+# The options to set the random seed of each backend
+_SEED_OPTIONS = {
+    "cbc": lambda seed: [f"randomSeed {seed}", f"randomCbcSeed {seed}"],
+    "coin": lambda seed: [f"randomSeed {seed}", f"randomCbcSeed {seed}"],
+    "highs": lambda seed: [f"random_seed={seed}"],
+    "gurobi": lambda seed: [f"Seed={seed}"],
+    "cplex": lambda seed: [f"set randomseed {seed}"],
+}
+
+
+@dataclass
+class SolverConfig:
+    """The solver backend and its settings.
+
+    Args:
+        backend: The name of the backend, see `BACKENDS`.
+        threads: The number of threads of the solver.
+            CBC is only deterministic with a single thread.
+        time_limit: Stop after this many seconds and keep the best solution.
+        gap_rel: Stop once the relative gap to the bound is below this value.
+        gap_abs: Stop once the absolute gap to the bound is below this value.
+        seed: The random seed of the solver.
+        msg: Show the output of the solver?
+    """
+
+    backend: str = "cbc"
+    threads: Optional[int] = None
+    time_limit: Optional[float] = None
+    gap_rel: Optional[float] = None
+    gap_abs: Optional[float] = None
+    seed: Optional[int] = None
+    msg: bool = False
+
+    def describe(self) -> str:
+        """Get the backend with its non-default settings, e.g. `cbc (threads=4)`."""
+        settings = [
+            f"{name}={setting}"
+            for (name, setting) in [
+                ("threads", self.threads),
+                ("time_limit", self.time_limit),
+                ("gap_rel", self.gap_rel),
+                ("gap_abs", self.gap_abs),
+                ("seed", self.seed),
+            ]
+            if setting is not None
+        ]
+
+        return f"{self.backend} ({', '.join(settings)})" if settings else self.backend
+
+
+def _solver_class(backend: str):
+    import pulp
+
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown solver backend '{backend}', choose one of {', '.join(BACKENDS)}."
+        )
+
+    return getattr(pulp, BACKENDS[backend], None)
+
+
+def available_backends() -> List[str]:
+    """Get the backends that are installed locally."""
+    backends = []
+
+    for backend in BACKENDS:
+        solver_class = _solver_class(backend)
+
+        if solver_class is not None and solver_class(msg=False).available():
+            backends.append(backend)
+
+    return backends
+
+
+def make_solver(
+    config: SolverConfig, warm_start: bool = False, log_path: Optional[str] = None
+) -> "pulp.LpSolver":
+    """Create the PuLP solver of the config.
+
+    Args:
+        config: The backend and its settings.
+        warm_start: Pass the initial values of the variables to the solver.
+        log_path: Write the output of the solver to this file.
+    """
+    solver_class = _solver_class(config.backend)
+
+    if solver_class is None or not solver_class(msg=False).available():
+        raise ValueError(f"Solver backend '{config.backend}' is not available.")
+
+    supported = inspect.signature(solver_class.__init__).parameters
+    options: Dict = {
+        "msg": config.msg,
+        "threads": config.threads,
+        "timeLimit": config.time_limit,
+        "gapRel": config.gap_rel,
+        "gapAbs": config.gap_abs,
+        "warmStart": warm_start or None,
+        "logPath": log_path,
+    }
+    options = {name: option for (name, option) in options.items() if option is not None}
+
+    if unsupported := [name for name in options if name not in supported]:
+        raise ValueError(
+            f"Solver backend '{config.backend}' doesn't support "
+            f"{', '.join(unsupported)}."
+        )
+
+    if config.seed is not None:
+        if config.backend not in _SEED_OPTIONS:
+            raise ValueError(
+                f"Solver backend '{config.backend}' doesn't support seeds."
+            )
+
+        options["options"] = _SEED_OPTIONS[config.backend](config.seed)
+
+    return solver_class(**options)
+
+
+def cbc_arguments(config: SolverConfig) -> List[str]:
+    """Get the command line arguments of the CBC binary for the config."""
+    if config.backend not in ("cbc", "coin"):
+        raise ValueError(f"Solver backend '{config.backend}' is not CBC.")
+
+    arguments = []
+
+    for (name, setting) in [
+        ("threads", config.threads),
+        ("sec", config.time_limit),
+        ("ratioGap", config.gap_rel),
+        ("allowableGap", config.gap_abs),
+    ]:
+        if setting is not None:
+            arguments += [name, str(setting)]
+
+    if config.seed is not None:
+        for option in _SEED_OPTIONS[config.backend](config.seed):
+            arguments += option.split()
+
+    return arguments
+
+
+def solve_status(problem: "pulp.LpProblem") -> str:
+    """Get the status of a solved problem.
+
+    A solver that stopped early with a solution, e.g. on the time limit,
+    reports "Feasible" instead of "Optimal".
+    """
+    from pulp import LpSolutionIntegerFeasible, LpStatus
+
+    if problem.sol_status == LpSolutionIntegerFeasible:
+        return "Feasible"
+
+    return LpStatus[problem.status]
@@ -0,0 +1,152 @@
+"""Search for the smallest grid that fits a balancer, solving grid sizes in parallel."""
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from factorizer.cache import SolutionCache
+from factorizer.models import ModelCache
+from factorizer.solve import SolveResult, solve_instance
+from factorizer.solvers import SolverConfig
+from factorizer.template import solve_with_template
+from factorizer.utils import centered_tiles
+
+
+def dominates(a: Tuple[int, int], b: Tuple[int, int]) -> bool:
+    """Does the grid size a fit into the grid size b?"""
+    return a[0] <= b[0] and a[1] <= b[1]
+
+
+def sweep(
+    belt_n: int,
+    belt_m: int,
+    widths: range,
+    heights: range,
+    R: int,
+    c: Dict,
+    workers: Optional[int] = None,
+    cache: Optional[SolutionCache] = None,
+    on_result: Optional[Callable[[SolveResult], None]] = None,
+    solver: Optional[SolverConfig] = None,
+    template: bool = False,
+    model_cache: Optional[ModelCache] = None,
+    presolve: bool = True,
+    strengthen: bool = False,
+    aggregate: bool = False,
+    break_symmetry: bool = False,
+) -> List[SolveResult]:
+    """Solve the balancer on all grid sizes in the given ranges.
+
+    The sizes are solved in a process pool, smallest area first.
+    Once a size is feasible, all pending sizes that it fits into are cancelled,
+    because they cannot be more compact.
+
+    Args:
+        belt_n: The number of input belts.
+        belt_m: The number of output belts.
+        widths: The grid widths to try.
+        heights: The grid heights to try.
+        R: Maximum range of underground belts.
+        c: The costs of the instance.
+        workers: The number of processes. Defaults to the number of CPUs.
+        cache: The cache for solved instances.
+        on_result: Called with every result as soon as it is available.
+        solver: The solver backend and its settings.
+        template: Specialise a model template of the largest grid in every
+            process instead of building the problem of every size.
+        model_cache: Load the built problems from this cache and store them
+            there, unless specialising a template.
+        presolve: Build the problems with presolve. Templates always are.
+        strengthen: Build the strengthened formulation.
+        aggregate: Solve through relaxations with the total flow of the inputs,
+            unless specialising a template.
+        break_symmetry: Break the mirror symmetry of the instances, unless
+            specialising a template.
+    """
+    sizes = sorted(
+        ((n, m) for n in widths for m in heights),
+        key=lambda size: (size[0] * size[1], size),
+    )
+    results: Dict[Tuple[int, int], SolveResult] = {}
+
+    def report(result: SolveResult) -> None:
+        results[result.n, result.m] = result
+
+        if on_result is not None:
+            on_result(result)
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        pending: Dict[Future, Tuple[int, int]] = {}
+
+        for (n, m) in sizes:
+            if m < max(belt_n, belt_m):
+                # The belts don't fit next to each other
+                report(SolveResult(n, m, [], [], R, "Skipped"))
+                continue
+
+            B = centered_tiles(m, belt_n)
+            E = centered_tiles(m, belt_m)
+            if template:
+                future = executor.submit(
+                    solve_with_template,
+                    max(widths),
+                    max(heights),
+                    n,
+                    m,
+                    B,
+                    E,
+                    R,
+                    c,
+                    cache,
+                    solver=solver,
+                    strengthen=strengthen,
+                )
+            else:
+                future = executor.submit(
+                    solve_instance,
+                    n,
+                    m,
+                    B,
+                    E,
+                    R,
+                    c,
+                    cache,
+                    solver=solver,
+                    model_cache=model_cache,
+                    presolve=presolve,
+                    strengthen=strengthen,
+                    aggregate=aggregate,
+                    break_symmetry=break_symmetry,
+                )
+            pending[future] = (n, m)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                size = pending.pop(future)
+                result = future.result()
+                report(result)
+
+                if not result.feasible:
+                    continue
+
+                # Larger grids can't give a more compact layout
+                for (other, other_size) in list(pending.items()):
+                    if dominates(size, other_size) and other.cancel():
+                        del pending[other]
+                        (n, m) = other_size
+                        B = centered_tiles(m, belt_n)
+                        E = centered_tiles(m, belt_m)
+                        report(SolveResult(n, m, B, E, R, "Cancelled"))
+
+    return [results[size] for size in sizes]
+
+
+def smallest_feasible(results: List[SolveResult]) -> Optional[SolveResult]:
+    """Get the feasible result with the smallest grid area, preferring lower cost."""
+    feasible = [result for result in results if result.feasible]
+
+    if not feasible:
+        return None
+
+    return min(feasible, key=lambda result: (result.n * result.m, result.cost))
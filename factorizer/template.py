@@ -0,0 +1,298 @@
+"""A problem that is built once and specialised to many instances.
+
+The Python build of the problem is often slower than solving small instances.
+A template is built for the largest grid of a search and every smaller grid
+and placement of the start and end points is selected by changing bounds,
+coefficients and right-hand sides of the same problem.
+"""
+import json
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from pulp import value
+
+from factorizer.assignment import extract_assignment
+from factorizer.graph import build_graph
+from factorizer.problem import ModelReport, build_problem
+from factorizer.solve import SolveResult
+from factorizer.solution import decode_solution
+from factorizer.solvers import SolverConfig, make_solver, solve_status
+from factorizer.visualization.blueprint import convert_to_blueprint
+
+if TYPE_CHECKING:
+    from factorizer.cache import SolutionCache
+
+# The constraint families whose entity and arc coefficients and constants are
+# multiples of the number of end points
+_SCALED_FAMILIES = [
+    "splitter_balance",
+    "arc_flow",
+    "capacity",
+    "flow_cover",
+    "aggregated_capacity",
+]
+
+
+class ModelTemplate:
+    """The problem of the largest grid, with start and end points on all rows.
+
+    To specialise it to a smaller grid and placement:
+
+    - The tiles outside of the grid stay empty, except for the rows of the
+      end points. They are extended to the right edge of the template with
+      transport belts, whose cost is subtracted from the objective.
+    - The supply and demand of the unused start and end points are 0.
+    - The coefficients that depend on the number of end points are scaled.
+
+    Args:
+        n_max: The width of the largest grid.
+        m_max: The height of the largest grid.
+        R: Maximum range of underground belts.
+        c: The costs of the instances.
+        strengthen: Build the strengthened formulation.
+    """
+
+    def __init__(
+        self, n_max: int, m_max: int, R: int, c: Dict, strengthen: bool = False
+    ):
+        self.n_max = n_max
+        self.m_max = m_max
+        self.R = R
+        self.c = c
+
+        rows = list(range(m_max))
+        self.G = build_graph(n_max, m_max, rows, rows, R)
+        self.report = ModelReport()
+        (self.problem, self.t, self.u, self.s, self.x, self.y) = build_problem(
+            self.G, c, presolve=True, strengthen=strengthen, report=self.report
+        )
+
+        # The cost of the transport belts that extend the end points
+        self.offset = 0.0
+
+        x_keys = {variable.name: key for (key, variable) in self.x.items()}
+        # The rows to scale, with their coefficients for all rows as end points
+        self._scaled = []
+        self._supply = []
+        self._demand = []
+        self._splitter_count = []
+
+        for (name, constraint) in self.problem.constraints.items():
+            family = self.report.constraint_families[name]
+
+            if family in _SCALED_FAMILIES:
+                coefficients = [
+                    (variable, coefficient)
+                    for (variable, coefficient) in constraint.items()
+                    if variable.name not in x_keys
+                ]
+                self._scaled.append((constraint, coefficients, constraint.constant))
+            elif family in ("supply", "demand"):
+                ((variable, _),) = constraint.items()
+                (a, b) = x_keys[variable.name]
+                getattr(self, f"_{family}").append((constraint, a, b))
+            elif family == "splitter_count":
+                self._splitter_count.append(constraint)
+
+    def _allowed_arcs(self, n: int, m: int, B: List[int], E: List[int]):
+        def inside(v) -> bool:
+            (i, j) = v
+
+            if i == -1:
+                return j in B
+
+            return 0 <= i < n and 0 <= j < m
+
+        def extension(v) -> bool:
+            # Right of the grid, in the row of an end point
+            return v[0] >= n and v[1] in E
+
+        for a in self.y:
+            (v, w) = a
+
+            if inside(v) and inside(w):
+                yield a
+            elif (
+                extension(w)
+                and (inside(v) or extension(v))
+                and (w[0] - v[0], w[1] - v[1]) == (1, 0)
+            ):
+                # The transport belts that extend the end points
+                yield a
+
+    def specialize(self, n: int, m: int, B: List[int], E: List[int]) -> None:
+        """Select the grid size and the start and end points.
+
+        Args:
+            n: The width of the grid, at most `n_max`.
+            m: The height of the grid, at most `m_max`.
+            B: The list of start indexes.
+            E: The list of end indexes.
+        """
+        if n > self.n_max or m > self.m_max:
+            raise ValueError(
+                f"The {n}x{m} grid doesn't fit into the {self.n_max}x{self.m_max} template."
+            )
+
+        arcs = set(self._allowed_arcs(n, m, B, E))
+        B_set = set(B)
+        extension = {(i, e) for i in range(n, self.n_max) for e in E}
+
+        for variables in (self.t, self.u, self.s, self.y):
+            for variable in variables.values():
+                (variable.lowBound, variable.upBound) = (0, 1)
+
+        for ((a, b), variable) in self.x.items():
+            variable.upBound = None if a in arcs and b in B_set else 0
+
+        for (a, variable) in self.y.items():
+            if a not in arcs:
+                variable.upBound = 0
+
+        for (v, variable) in self.t.items():
+            if v in extension:
+                variable.lowBound = 1
+            elif v[0] >= n or v[1] >= m:
+                variable.upBound = 0
+
+        for ((v, d, r), variable) in self.u.items():
+            if self.G.graph["out_index"].get((v, d, r, False)) not in arcs:
+                variable.upBound = 0
+
+        for ((v, f), variable) in self.s.items():
+            # A splitter needs its arc going right and its splitter arc
+            normal_edge = self.G.graph["out_index"].get((v, "right", 1, False))
+            splitter_edge = self.G.graph["out_index"].get(
+                (v, "up" if f == "right" else "down", 1, True)
+            )
+
+            if normal_edge not in arcs or splitter_edge not in arcs:
+                variable.upBound = 0
+
+        scale = len(E) / self.m_max
+
+        for (constraint, coefficients, constant) in self._scaled:
+            for (variable, coefficient) in coefficients:
+                constraint[variable] = coefficient * scale
+
+            constraint.constant = constant * scale
+
+        for (constraint, a, b) in self._supply:
+            # x[start(b2), b1] == |E| if b1 == b2
+            constraint.constant = -len(E) if a[0][1] == b and b in B_set else 0
+
+        for (constraint, a, b) in self._demand:
+            constraint.constant = -1 if a[0][1] in E and b in B_set else 0
+
+        for constraint in self._splitter_count:
+            constraint.constant = -(max(len(B), len(E)) - 1)
+
+        self.offset = len(extension) * self.c["transport"]
+
+    def _restrict(self, G):
+        """Get the variables of the grid of G."""
+        V_grid = {v for v in G.nodes if G.nodes[v]["grid"]}
+        B = set(G.graph["B"])
+
+        t = {v: variable for (v, variable) in self.t.items() if v in V_grid}
+        u = type(self.u)(
+            (key, variable) for (key, variable) in self.u.items() if key[0] in V_grid
+        )
+        s = type(self.s)(
+            (key, variable) for (key, variable) in self.s.items() if key[0] in V_grid
+        )
+        x = type(self.x)(
+            ((a, b), variable)
+            for ((a, b), variable) in self.x.items()
+            if a in G.edges and b in B
+        )
+        y = type(self.y)(
+            (a, variable) for (a, variable) in self.y.items() if a in G.edges
+        )
+
+        return t, u, s, x, y
+
+    def solve(
+        self,
+        n: int,
+        m: int,
+        B: List[int],
+        E: List[int],
+        solver: Optional[SolverConfig] = None,
+    ) -> SolveResult:
+        """Specialise the template to the instance and solve it."""
+        if solver is None:
+            solver = SolverConfig()
+
+        times = {}
+
+        start = time.perf_counter()
+        self.specialize(n, m, B, E)
+        times["problem"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.problem.solve(make_solver(solver))
+        times["solve"] = time.perf_counter() - start
+
+        result = SolveResult(
+            n, m, B, E, self.R, solve_status(self.problem), times=times
+        )
+        result.backend = solver.describe()
+
+        if result.status in ("Optimal", "Feasible"):
+            start = time.perf_counter()
+            G = build_graph(n, m, B, E, self.R)
+            (t, u, s, x, y) = self._restrict(G)
+
+            result.cost = value(self.problem.objective) - self.offset
+            result.blueprint = convert_to_blueprint(decode_solution(G, t, u, s, x, y))
+            result.assignment = extract_assignment(t, u, s, x, y)
+            times["blueprint"] = time.perf_counter() - start
+
+        return result
+
+
+# The templates of this process, by size and costs
+_templates: Dict[Tuple, ModelTemplate] = {}
+
+
+def solve_with_template(
+    n_max: int,
+    m_max: int,
+    n: int,
+    m: int,
+    B: List[int],
+    E: List[int],
+    R: int,
+    c: Dict,
+    cache: Optional["SolutionCache"] = None,
+    solver: Optional[SolverConfig] = None,
+    strengthen: bool = False,
+) -> SolveResult:
+    """Solve the instance with the template of this process, building it once.
+
+    Args:
+        n_max: The width of the template.
+        m_max: The height of the template.
+        cache: Look up the result in this cache first and store it there.
+
+        The other arguments are the same as for `solve_instance`.
+    """
+    if cache is not None:
+        if (cached := cache.get(n, m, B, E, R, c)) is not None:
+            return cached
+
+    key = (n_max, m_max, R, json.dumps(c, sort_keys=True), strengthen)
+
+    if key not in _templates:
+        _templates[key] = ModelTemplate(n_max, m_max, R, c, strengthen=strengthen)
+
+    result = _templates[key].solve(n, m, B, E, solver)
+
+    if solver is None:
+        solver = SolverConfig()
+
+    if cache is not None and solver.gap_rel is None and solver.gap_abs is None:
+        cache.put(result, c)
+
+    return result
@@ -1,4 +1,8 @@
-import networkx as nx
+import math
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    import networkx as nx
 
 
 def opposite_dir(d: str) -> str:
@@ -14,30 +18,56 @@ def opposite_dir(d: str) -> str:
     raise Exception(f"Invalid direction {d}")
 
 
-def dir_out_edge(G: nx.DiGraph, v, d: str, r: int = 1):
-    edges = [
-        a
-        for a in G.out_edges(v)
-        if G.edges[a]["d"] == d and G.edges[a]["r"] == r and not G.edges[a]["split"]
-    ]
+def centered_tiles(grid_height: int, belt_height: int) -> List[int]:
+    """Get the rows of belt_height belts, centered vertically on the grid."""
+    edge_room = math.floor((grid_height - belt_height) / 2.0)
+
+    return [i for i in range(edge_room, edge_room + belt_height)]
+
+
+def build_edge_index(G: "nx.DiGraph") -> None:
+    """Index the arcs of the graph by (node, direction, range, split).
+
+    The out-arcs are stored under their start node in `G.graph["out_index"]`,
+    the in-arcs under their end node in `G.graph["in_index"]`.
+    """
+    out_index = {}
+    in_index = {}
+
+    for (a, attrs) in G.edges.items():
+        (start, end) = a
+        key = (attrs["d"], attrs["r"], attrs["split"])
+
+        out_index.setdefault((start, *key), a)
+        in_index.setdefault((end, *key), a)
+
+    G.graph["out_index"] = out_index
+    G.graph["in_index"] = in_index
+
+
+def _out_index(G: "nx.DiGraph"):
+    if "out_index" not in G.graph:
+        build_edge_index(G)
+
+    return G.graph["out_index"]
+
+
+def _in_index(G: "nx.DiGraph"):
+    if "in_index" not in G.graph:
+        build_edge_index(G)
+
+    return G.graph["in_index"]
 
-    return edges[0] if len(edges) > 0 else None
 
+def dir_out_edge(G: "nx.DiGraph", v, d: str, r: int = 1):
+    return _out_index(G).get((v, d, r, False))
 
-def dir_in_edge(G: nx.DiGraph, v, d: str, r: int = 1):
-    edges = [
-        a
-        for a in G.in_edges(v)
-        if G.edges[a]["d"] == d and G.edges[a]["r"] == r and not G.edges[a]["split"]
-    ]
 
-    return edges[0] if len(edges) > 0 else None
+def dir_in_edge(G: "nx.DiGraph", v, d: str, r: int = 1):
+    return _in_index(G).get((v, d, r, False))
 
 
-def splitter_out_edge(G: nx.DiGraph, v, f: str):
+def splitter_out_edge(G: "nx.DiGraph", v, f: str):
     edge_d = "up" if f == "right" else "down"
-    edges = [
-        a for a in G.out_edges(v) if G.edges[a]["d"] == edge_d and G.edges[a]["split"]
-    ]
 
-    return edges[0] if len(edges) > 0 else None
+    return _out_index(G).get((v, edge_d, 1, True))
@@ -2,12 +2,12 @@
 import base64
 import json
 import zlib
-from typing import Dict, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 
-import networkx as nx
+from factorizer import SPLITTER_LEFT, TRANSPORT, UNDERGROUND_INPUT, UNDERGROUND_OUTPUT
 
-from factorizer import D
-from factorizer.utils import dir_out_edge, dir_in_edge
+if TYPE_CHECKING:
+    from factorizer.solution import Solution
 
 
 def parse_blueprint(blueprint: str) -> Dict:
@@ -22,14 +22,14 @@ def parse_blueprint(blueprint: str) -> Dict:
     return json.loads(decompressed)
 
 
-def construct_blueprint_data(G: nx.DiGraph, t, u, s, x, y) -> Dict:
+def construct_blueprint_data(solution: "Solution") -> Dict:
     """Construct the blueprint data from a given solution."""
     entities = []
     entity_number = 1
 
-    for v in G.nodes:
-        if G.nodes[v]["grid"]:
-            if entity := get_entity_at_node(v, G, t, u, s, x, y):
+    for i in range(solution.n):
+        for j in range(solution.m):
+            if entity := get_entity_at_node((i, j), solution):
                 entities.append(
                     {
                         "entity_number": entity_number,
@@ -40,17 +40,23 @@ def construct_blueprint_data(G: nx.DiGraph, t, u, s, x, y) -> Dict:
 
     return {
         "blueprint": {
-            "label": G.graph["name"],
+            "label": solution.name,
             "entities": entities,
             "version": 64424706048,
         }
     }
 
 
-def convert_to_blueprint(G: nx.DiGraph, t, u, s, x, y) -> str:
+def convert_to_blueprint(solution: "Solution") -> str:
     """Convert the given solution to a blueprint string."""
     # Convert the solution to blueprint data
-    data = construct_blueprint_data(G, t, u, s, x, y)
+    data = construct_blueprint_data(solution)
+
+    return encode_blueprint(data)
+
+
+def encode_blueprint(data: Dict) -> str:
+    """Encode blueprint data as a blueprint string."""
     # Convert the blueprint data to JSON
     json_str = json.dumps(data).encode("utf-8")
     # Compress the JSON string with zlib
@@ -61,67 +67,67 @@ def convert_to_blueprint(G: nx.DiGraph, t, u, s, x, y) -> str:
     return "0" + encoded
 
 
-def get_entity_at_node(v: Tuple, G: nx.DiGraph, t, u, s, x, y) -> Optional[Dict]:
+def mirror_blueprint(blueprint: str, m: int) -> str:
+    """Mirror a blueprint string of a grid with height m vertically."""
+    data = parse_blueprint(blueprint)
+
+    for entity in data["blueprint"]["entities"]:
+        position = entity["position"]
+        position["y"] = (m - 1) - position["y"]
+
+        if entity["direction"] == direction_to_index("up"):
+            entity["direction"] = direction_to_index("down")
+        elif entity["direction"] == direction_to_index("down"):
+            entity["direction"] = direction_to_index("up")
+
+    return encode_blueprint(data)
+
+
+def get_entity_at_node(v: Tuple[int, int], solution: "Solution") -> Optional[Dict]:
     """Get the Factorio entity at the given node."""
-    R_u = G.graph["R_u"]
     (x_coord, y_coord) = v
+    entity = solution.entity[v]
+    d = solution.tile_direction(v)
+
+    if d is None:
+        return None
 
     # Transport belt
-    if t[v].value() == 1:
-        for d in D:
-            if out_edge := dir_out_edge(G, v, d):
-                if y[out_edge] == 1:
-                    # Check if this is the output of an underground belt
-                    for r in R_u:
-                        if in_edge := dir_in_edge(G, v, d, r):
-                            (u_pos, _) = in_edge
-
-                            if u[u_pos, d, r].value() == 1:
-                                return {
-                                    "name": "underground-belt",
-                                    "type": "output",
-                                    "position": {
-                                        "x": x_coord,
-                                        "y": y_coord,
-                                    },
-                                    "direction": direction_to_index(d),
-                                }
-
-                    # It's a normal transport belt
-                    return {
-                        "name": "transport-belt",
-                        "position": {
-                            "x": x_coord,
-                            "y": y_coord,
-                        },
-                        "direction": direction_to_index(d),
-                    }
+    if entity == TRANSPORT:
+        return {
+            "name": "transport-belt",
+            "position": {
+                "x": x_coord,
+                "y": y_coord,
+            },
+            "direction": direction_to_index(d),
+        }
 
-    # Underground belt (input)
-    for d in D:
-        for r in R_u:
-            if u[v, d, r].value() == 1:
-                return {
-                    "name": "underground-belt",
-                    "type": "input",
-                    "position": {
-                        "x": x_coord,
-                        "y": y_coord,
-                    },
-                    "direction": direction_to_index(d),
-                }
-
-    # Splitter
-    if s[v, "left"].value() == 1:
+    # Underground belt
+    if entity in (UNDERGROUND_INPUT, UNDERGROUND_OUTPUT):
+        return {
+            "name": "underground-belt",
+            "type": "input" if entity == UNDERGROUND_INPUT else "output",
+            "position": {
+                "x": x_coord,
+                "y": y_coord,
+            },
+            "direction": direction_to_index(d),
+        }
+
+    # Splitter, placed by its left fragment
+    if entity == SPLITTER_LEFT:
         return {
             "name": "splitter",
             "position": {
                 "x": x_coord,
                 "y": y_coord - 0.5,
             },
-            "direction": direction_to_index("right"),
+            "direction": direction_to_index(d),
         }
 
+    return None
+
 
 def direction_to_index(d: str) -> int:
     """Convert a direction to the corresponding index in Factorio."""
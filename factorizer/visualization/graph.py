@@ -2,19 +2,26 @@ import os.path
 from typing import Tuple
 
 import networkx as nx
-import matplotlib.pyplot as plt
 
-from factorizer import D, F_s
-from factorizer.utils import dir_out_edge
+from factorizer import (
+    SPLITTER_LEFT,
+    SPLITTER_RIGHT,
+    TRANSPORT,
+    UNDERGROUND_INPUT,
+    UNDERGROUND_OUTPUT,
+)
+from factorizer.solution import Solution
 
+# The keys of the graph attributes that describe the instance, not its arcs
+INSTANCE_KEYS = ("name", "n", "m", "B", "E", "R")
 
-def build_solution_graph(G: nx.DiGraph, t, u, s, x, y) -> nx.DiGraph:
+
+def build_solution_graph(G: nx.DiGraph, solution: Solution) -> nx.DiGraph:
     """Build a graph from the solution of the problem."""
-    n = G.graph["n"]
-    m = G.graph["m"]
-    R_u = G.graph["R_u"]
+    n = solution.n
+    m = solution.m
 
-    H = nx.DiGraph(**G.graph)
+    H = nx.DiGraph(**{key: G.graph[key] for key in INSTANCE_KEYS if key in G.graph})
 
     # --- NODES ---
 
@@ -24,19 +31,19 @@ def build_solution_graph(G: nx.DiGraph, t, u, s, x, y) -> nx.DiGraph:
     for i in range(n):
         for j in range(m):
             v = (i, j)
-            node_labels[v] = _get_node_label(G, v, R_u, t, u, s, y)
+            node_labels[v] = _get_node_label(solution, v)
 
             H.add_node(v)
 
     # Start nodes
-    for b in G.graph["B"]:
+    for b in solution.B:
         v = (-1, b)
         node_labels[v] = "B"
 
         H.add_node(v)
 
     # End nodes
-    for e in G.graph["E"]:
+    for e in solution.E:
         v = (n, e)
         node_labels[v] = "E"
 
@@ -49,57 +56,41 @@ def build_solution_graph(G: nx.DiGraph, t, u, s, x, y) -> nx.DiGraph:
 
     # --- EDGES ---
 
-    edge_labels = {}
-
-    for a in G.edges:
-        flows = {}
-
-        for b in G.graph["B"]:
-            flows[b] = x[a, b].value()
+    edge_labels = solution.flow_labels()
 
-        if sum(flows.values()) > 0:
-            label = "/".join([str(int(f)) for f in flows.values()])
-            edge_labels[a] = label
-
-            H.add_edge(
-                *a, d=G.edges[a]["d"], r=G.edges[a]["r"], split=G.edges[a]["split"]
-            )
+    for a in edge_labels:
+        H.add_edge(*a, d=G.edges[a]["d"], r=G.edges[a]["r"], split=G.edges[a]["split"])
 
     nx.set_edge_attributes(H, edge_labels, "edge_labels")
 
     return H
 
 
-def _get_node_label(G: nx.DiGraph, v: Tuple[int, int], R_u: range, t, u, s, y) -> str:
+def _get_node_label(solution: Solution, v: Tuple[int, int]) -> str:
     """Get the label for the given node v."""
-    if t[v].value() == 1:
-        t_dir = None
+    entity = solution.entity[v]
+    d = solution.tile_direction(v)
 
-        for d in D:
-            if a := dir_out_edge(G, v, d, 1):
-                if y[a].value() == 1:
-                    t_dir = d
-                    break
+    if entity in (TRANSPORT, UNDERGROUND_OUTPUT):
+        return "t" if d is None else f"t{d[0]}"
 
-        if t_dir is None:
-            return "t"
-        else:
-            return f"t{t_dir[0]}"
+    if entity == UNDERGROUND_INPUT:
+        return f"u{d[0]}{solution.range[v]}"
 
-    for d in D:
-        for r in R_u:
-            if u[v, d, r].value() == 1:
-                return f"u{d[0]}{r}"
+    if entity == SPLITTER_LEFT:
+        return "sl"
 
-    for f in F_s:
-        if s[v, f].value() == 1:
-            return f"s{f[0]}"
+    if entity == SPLITTER_RIGHT:
+        return "sr"
 
     return ""
 
 
 def save_solution_graph(H: nx.DiGraph, output_dir: str) -> None:
     """Save the solution graph to an image."""
+    # Matplotlib is slow to import, so only load it to save an image
+    import matplotlib.pyplot as plt
+
     pos = nx.get_node_attributes(H, "pos")
     node_labels = nx.get_node_attributes(H, "node_labels")
     edge_labels = nx.get_edge_attributes(H, "edge_labels")
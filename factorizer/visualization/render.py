@@ -0,0 +1,216 @@
+"""Render solutions as SVG images or plain text, without matplotlib.
+
+Both renderers build strings directly from a decoded `Solution`, so they take
+milliseconds per layout. The grid is drawn with the row 0 at the bottom, like
+the solution graph.
+
+The text rendering uses two characters per tile:
+
+    " >"  transport belt facing right (also "<", "^" and "v")
+    "u>"  underground belt entrance
+    "U>"  underground belt exit
+    "s>"  splitter fragment
+    " ."  empty tile
+
+The start points are marked with "B" left of the grid, the end points with "E"
+right of it.
+"""
+import os.path
+from typing import List, Tuple
+
+from factorizer import (
+    SPLITTER_LEFT,
+    SPLITTER_RIGHT,
+    TRANSPORT,
+    UNDERGROUND_INPUT,
+    UNDERGROUND_OUTPUT,
+)
+from factorizer.solution import Solution
+
+ARROWS = {"right": ">", "left": "<", "up": "^", "down": "v", None: "?"}
+
+_PREFIXES = {
+    TRANSPORT: " ",
+    UNDERGROUND_INPUT: "u",
+    UNDERGROUND_OUTPUT: "U",
+    SPLITTER_LEFT: "s",
+    SPLITTER_RIGHT: "s",
+}
+
+# The size of a tile in the SVG image, in pixels
+CELL_SIZE = 40
+
+_COLORS = {
+    TRANSPORT: "#e0b020",
+    UNDERGROUND_INPUT: "#c05020",
+    UNDERGROUND_OUTPUT: "#c05020",
+    SPLITTER_LEFT: "#4070c0",
+}
+
+# The unit vectors of the directions on screen, where y points down
+_SCREEN_DIRECTIONS = {"right": (1, 0), "left": (-1, 0), "up": (0, -1), "down": (0, 1)}
+
+
+def render_ascii(solution: Solution, flows: bool = False) -> str:
+    """Render the solution as text.
+
+    Args:
+        solution: The decoded solution.
+        flows: Append the flows of every used arc, per start point.
+    """
+    lines = []
+
+    for j in reversed(range(solution.m)):
+        cells = []
+
+        for i in range(solution.n):
+            entity = solution.entity[i, j]
+
+            if entity in _PREFIXES:
+                cells.append(
+                    _PREFIXES[entity] + ARROWS[solution.tile_direction((i, j))]
+                )
+            else:
+                cells.append(" .")
+
+        start = "B" if j in solution.B else " "
+        end = " E" if j in solution.E else ""
+        lines.append(f"{start}{''.join(cells)}{end}".rstrip())
+
+    if flows:
+        lines.append("")
+        lines.append(f"Flows of {'/'.join(str(b) for b in solution.B)}:")
+
+        for ((v, w), label) in solution.flow_labels().items():
+            lines.append(f"  {v} -> {w}: {label}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _center(solution: Solution, v: Tuple[int, int]) -> Tuple[float, float]:
+    """Get the center of the tile on screen, with a column for the start points."""
+    (i, j) = v
+
+    return (i + 1.5) * CELL_SIZE, (solution.m - j - 0.5) * CELL_SIZE
+
+
+def _arrow(center: Tuple[float, float], d: str, color: str) -> str:
+    (cx, cy) = center
+    (dx, dy) = _SCREEN_DIRECTIONS[d]
+    size = CELL_SIZE * 0.3
+    points = [
+        (cx + dx * size, cy + dy * size),
+        (
+            cx - dx * size * 0.6 - dy * size * 0.7,
+            cy - dy * size * 0.6 + dx * size * 0.7,
+        ),
+        (
+            cx - dx * size * 0.6 + dy * size * 0.7,
+            cy - dy * size * 0.6 - dx * size * 0.7,
+        ),
+    ]
+    encoded = " ".join(f"{x:.1f},{y:.1f}" for (x, y) in points)
+
+    return f'<polygon points="{encoded}" fill="{color}"/>'
+
+
+def render_svg(solution: Solution) -> str:
+    """Render the solution as SVG image, with the flow labels of the used arcs."""
+    n = solution.n
+    m = solution.m
+    width = (n + 2) * CELL_SIZE
+    height = m * CELL_SIZE
+    inset = CELL_SIZE * 0.1
+    parts: List[str] = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="monospace" '
+        f'font-size="{CELL_SIZE // 4}">',
+        f'<rect x="{CELL_SIZE}" y="0" width="{n * CELL_SIZE}" height="{height}" '
+        'fill="#f4f4f4" stroke="#999"/>',
+    ]
+
+    # The tiles
+    for i in range(n):
+        for j in range(m):
+            (cx, cy) = _center(solution, (i, j))
+            parts.append(
+                f'<rect x="{cx - CELL_SIZE / 2}" y="{cy - CELL_SIZE / 2}" '
+                f'width="{CELL_SIZE}" height="{CELL_SIZE}" fill="none" stroke="#ddd"/>'
+            )
+
+    # The entities
+    for i in range(n):
+        for j in range(m):
+            v = (i, j)
+            entity = solution.entity[v]
+            d = solution.tile_direction(v)
+            (cx, cy) = _center(solution, v)
+
+            if entity == SPLITTER_LEFT:
+                # Both fragments, the right one is below the left one
+                parts.append(
+                    f'<rect x="{cx - CELL_SIZE / 2 + inset}" '
+                    f'y="{cy - CELL_SIZE / 2 + inset}" '
+                    f'width="{CELL_SIZE - 2 * inset}" '
+                    f'height="{2 * CELL_SIZE - 2 * inset}" '
+                    f'fill="{_COLORS[entity]}" rx="{inset}"/>'
+                )
+                parts.append(_arrow((cx, cy + CELL_SIZE / 2), "right", "#fff"))
+            elif entity in (UNDERGROUND_INPUT, UNDERGROUND_OUTPUT) and d is not None:
+                parts.append(
+                    f'<rect x="{cx - CELL_SIZE / 2 + inset}" '
+                    f'y="{cy - CELL_SIZE / 2 + inset}" '
+                    f'width="{CELL_SIZE - 2 * inset}" '
+                    f'height="{CELL_SIZE - 2 * inset}" '
+                    f'fill="{_COLORS[entity]}" rx="{inset}"/>'
+                )
+                parts.append(_arrow((cx, cy), d, "#fff"))
+            elif entity == TRANSPORT and d is not None:
+                parts.append(_arrow((cx, cy), d, _COLORS[entity]))
+
+    # The used arcs with their flows
+    for ((v, w), label) in solution.flow_labels().items():
+        (x1, y1) = _center(solution, v)
+        (x2, y2) = _center(solution, w)
+        underground = max(abs(w[0] - v[0]), abs(w[1] - v[1])) > 1
+        dash = ' stroke-dasharray="4 3"' if underground else ""
+        parts.append(
+            f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" stroke="#666"{dash}/>'
+        )
+        parts.append(
+            f'<text x="{(x1 + x2) / 2}" y="{(y1 + y2) / 2 - 2}" '
+            f'text-anchor="middle">{label}</text>'
+        )
+
+    # The start and end points
+    for (label, column, rows) in [("B", -1, solution.B), ("E", n, solution.E)]:
+        for row in rows:
+            (cx, cy) = _center(solution, (column, row))
+            parts.append(
+                f'<text x="{cx}" y="{cy + CELL_SIZE / 8}" text-anchor="middle" '
+                f'font-size="{CELL_SIZE // 2}">{label}</text>'
+            )
+
+    parts.append("</svg>")
+
+    return "\n".join(parts) + "\n"
+
+
+def save_svg(solution: Solution, output_dir: str) -> str:
+    """Save the SVG image of the solution as `solution.svg` and get its path."""
+    path = os.path.join(output_dir, "solution.svg")
+
+    with open(path, "w") as file:
+        file.write(render_svg(solution))
+
+    return path
+
+
+def save_ascii(solution: Solution, output_dir: str) -> str:
+    """Save the text rendering of the solution with its flows as `solution.txt`."""
+    path = os.path.join(output_dir, "solution.txt")
+
+    with open(path, "w") as file:
+        file.write(render_ascii(solution, flows=True))
+
+    return path
@@ -0,0 +1,197 @@
+"""Initial solutions for the MIP solver, from cached solutions or blueprints."""
+from typing import Dict, List, Optional, Tuple
+
+import networkx as nx
+
+from factorizer.assignment import Assignment
+from factorizer.utils import dir_out_edge, splitter_out_edge
+
+# Inverse of `direction_to_index`
+_INDEX_TO_DIRECTION = {0: "up", 2: "right", 4: "down", 6: "left"}
+
+
+def embed_assignment(
+    assignment: Assignment,
+    old: Tuple[int, int, List[int], List[int]],
+    new: Tuple[int, int, List[int], List[int]],
+) -> Optional[Assignment]:
+    """Embed the solution of a smaller grid into a larger one.
+
+    The layout is shifted vertically to line up with the new start and end
+    points and the outputs are extended to the right with transport belts.
+
+    Args:
+        assignment: The solution of the smaller instance.
+        old: The (n, m, B, E) of the smaller instance.
+        new: The (n, m, B, E) of the larger instance.
+
+    Returns:
+        The embedded assignment, or None if the layout doesn't fit.
+    """
+    (n, m, B, E) = old
+    (new_n, new_m, new_B, new_E) = new
+
+    if new_n < n or new_m < m or len(B) != len(new_B) or len(E) != len(new_E):
+        return None
+
+    dy = new_B[0] - B[0]
+
+    # The start and end points must be shifted by the same offset
+    if [b + dy for b in B] != list(new_B) or [e + dy for e in E] != list(new_E):
+        return None
+
+    if dy < 0 or m + dy > new_m:
+        return None
+
+    def node(v):
+        (x, y) = v
+
+        # Move the end nodes to the new right edge of the grid
+        return (new_n if x == n else x), y + dy
+
+    def arc(a):
+        (start, end) = a
+
+        if start[0] == n - 1 and end[0] == n:
+            # The old end arc now leads to the extension belts
+            return (start[0], start[1] + dy), (n, end[1] + dy)
+
+        return node(start), node(end)
+
+    embedded = {
+        "t": {node(v): value for (v, value) in assignment["t"].items()},
+        "u": {(node(v), d, r): value for ((v, d, r), value) in assignment["u"].items()},
+        "s": {(node(v), f): value for ((v, f), value) in assignment["s"].items()},
+        "x": {(arc(a), b + dy): value for ((a, b), value) in assignment["x"].items()},
+        "y": {arc(a): value for (a, value) in assignment["y"].items()},
+    }
+
+    # Extend the outputs with transport belts going right
+    for e in new_E:
+        for x_coord in range(n, new_n):
+            a = ((x_coord, e), (x_coord + 1, e))
+            embedded["t"][x_coord, e] = 1
+            embedded["y"][a] = 1
+
+            for b in new_B:
+                flow = assignment["x"].get((((n - 1, e - dy), (n, e - dy)), b - dy))
+
+                if flow:
+                    embedded["x"][a, b] = flow
+
+    return embedded
+
+
+def assignment_from_blueprint(data: Dict, G: nx.DiGraph) -> Assignment:
+    """Get the entities and activated arcs of a parsed blueprint on the grid of G.
+
+    The flows are not part of a blueprint, the solver completes them.
+    """
+    R_u = G.graph["R_u"]
+    assignment: Assignment = {"t": {}, "u": {}, "s": {}, "x": {}, "y": {}}
+    underground_outputs = set()
+    underground_inputs = []
+
+    for entity in data["blueprint"]["entities"]:
+        position = entity["position"]
+        x_coord = int(round(position["x"]))
+        d = _INDEX_TO_DIRECTION[entity.get("direction", 0)]
+
+        if entity["name"] == "splitter":
+            # The position is the center between the two fragments
+            left = (x_coord, int(round(position["y"] + 0.5)))
+            right = (x_coord, left[1] - 1)
+
+            for (v, f) in [(left, "left"), (right, "right")]:
+                assignment["s"][v, f] = 1
+
+                for a in [dir_out_edge(G, v, "right"), splitter_out_edge(G, v, f)]:
+                    if a:
+                        assignment["y"][a] = 1
+
+            continue
+
+        v = (x_coord, int(round(position["y"])))
+
+        if entity["name"] == "underground-belt" and entity.get("type") == "input":
+            underground_inputs.append((v, d))
+            continue
+
+        if entity["name"] == "underground-belt":
+            underground_outputs.add((v, d))
+
+        assignment["t"][v] = 1
+
+        if a := dir_out_edge(G, v, d):
+            assignment["y"][a] = 1
+
+    # Connect each underground input to the closest output in its direction
+    for (v, d) in underground_inputs:
+        for r in R_u:
+            a = dir_out_edge(G, v, d, r)
+
+            if a and (a[1], d) in underground_outputs:
+                assignment["u"][v, d, r] = 1
+                assignment["y"][a] = 1
+                break
+
+    return assignment
+
+
+def apply_warm_start(assignment: Assignment, t, u, s, x, y) -> bool:
+    """Set the assignment as initial values of the problem variables.
+
+    Variables missing from the assignment start at 0.
+    If the assignment has no flows at all, the flows are left to the solver.
+
+    Returns:
+        Whether the assignment fits onto the variables of the problem.
+    """
+    variable_dicts = {"t": t, "u": u, "s": s, "x": x, "y": y}
+
+    for (name, values) in assignment.items():
+        if any(key not in variable_dicts[name] for key in values):
+            return False
+
+    has_flows = bool(assignment.get("x"))
+
+    for (name, variables) in variable_dicts.items():
+        values = assignment.get(name, {})
+
+        if name == "x" and not has_flows:
+            continue
+
+        for (key, variable) in variables.items():
+            variable.setInitialValue(values.get(key, 0))
+
+    return True
+
+
+def find_warm_start(
+    cache, n: int, m: int, B: List[int], E: List[int], R: int, c: Dict
+) -> Optional[Assignment]:
+    """Look for a cached solution on a neighbouring smaller grid and embed it."""
+    for (old_n, old_m) in [(n - 1, m), (n, m - 1), (n - 1, m - 1)]:
+        if old_n < 1 or old_m < max(len(B), len(E)):
+            continue
+
+        for dy in range(m - old_m + 1):
+            old_B = [b - dy for b in B]
+            old_E = [e - dy for e in E]
+
+            if min(old_B + old_E) < 0 or max(old_B + old_E) >= old_m:
+                continue
+
+            cached = cache.get(old_n, old_m, old_B, old_E, R, c)
+
+            if cached is None or cached.assignment is None:
+                continue
+
+            embedded = embed_assignment(
+                cached.assignment, (old_n, old_m, old_B, old_E), (n, m, B, E)
+            )
+
+            if embedded is not None:
+                return embedded
+
+    return None
@@ -1,18 +1,28 @@
 import argparse
-import math
+import json
 import os.path
-from datetime import datetime
-from typing import List
+from dataclasses import asdict
+from typing import TYPE_CHECKING, List, Optional, Set
 
-import networkx as nx
+from factorizer.assignment import Assignment, extract_assignment
+from factorizer.cache import DEFAULT_CACHE_DIR, SolutionCache
+from factorizer.instrument import Instrumentation, parse_cbc_log
+from factorizer.models import DEFAULT_MODEL_CACHE_DIR, ModelCache
+from factorizer.result import SolveResult
+from factorizer.solvers import BACKENDS, SolverConfig
+from factorizer.utils import centered_tiles
 
-from factorizer.graph import build_graph
-from factorizer.problem import build_problem
+if TYPE_CHECKING:
+    import networkx as nx
 
-# Maximum range of underground belts
-from factorizer.visualization.blueprint import convert_to_blueprint
-from factorizer.visualization.graph import build_solution_graph, save_solution_graph
+    from factorizer.aggregate import AggregateRound
+    from factorizer.anytime import Incumbent
+
+# The solver, graph and plotting libraries take a while to import.
+# They are imported on the code paths that need them, so that cache hits and
+# `--help` return quickly.
 
+# Maximum range of underground belts
 R = 4
 
 # Material costs for basic belts
@@ -25,10 +35,252 @@ c = {
 }
 
 
-def _centered_tiles(grid_height: int, belt_height: int) -> List[int]:
-    edge_room = math.floor((grid_height - belt_height) / 2.0)
+def _parse_range(value: str) -> range:
+    """Parse a single size like "4" or an inclusive range like "4-10"."""
+    (low, _, high) = value.partition("-")
+
+    return range(int(low), int(high or low) + 1)
+
+
+def _print_result(result: SolveResult) -> None:
+    cost = f"{result.cost:.2f}" if result.feasible else "-"
+    print(
+        f"{result.n}x{result.m}: {result.status} "
+        f"(cost {cost}, {result.wall_time:.2f}s)"
+    )
+
+
+def _print_incumbent(incumbent: "Incumbent") -> None:
+    gap = f"{incumbent.gap:.1%}" if incumbent.gap is not None else "?"
+    print(
+        f"Incumbent {incumbent.index}: cost {incumbent.cost:.2f}, gap {gap} "
+        f"({incumbent.time:.2f}s)."
+    )
+
+
+def _print_round(solve_round: "AggregateRound") -> None:
+    outcome = solve_round.status
+
+    if solve_round.cost is not None:
+        layout = "a balancer" if solve_round.certified else "not a balancer"
+        outcome += f", cost {solve_round.cost:.2f}, {layout}"
+
+    print(
+        f"Relaxation with {len(solve_round.commodities)} commodities "
+        f"({solve_round.variables} variables): {outcome} ({solve_round.time:.2f}s)."
+    )
+
+
+def _verify(result: SolveResult) -> None:
+    """Simulate the blueprint of the result and print whether it balances."""
+    from factorizer.simulate import verify_blueprint
+
+    simulation = verify_blueprint(
+        result.blueprint, result.n, result.m, result.B, result.E, result.R
+    )
+
+    if problems := simulation.problems():
+        print("The blueprint is not a balancer:")
+
+        for problem in problems:
+            print(f"  {problem}")
+    else:
+        print("Verified that the blueprint balances all inputs.")
+
+
+def _precheck(
+    G: "nx.DiGraph",
+    instrumentation: Instrumentation,
+    cache: Optional[SolutionCache],
+    cutoff: Optional[float],
+    output_dir: str,
+) -> Optional[float]:
+    """Check the instance before solving it and exit if it can't be solved.
+
+    Returns:
+        The lower bound on the cost.
+    """
+    from factorizer.precheck import check_instance
+
+    with instrumentation.phase("precheck"):
+        check = check_instance(G, c)
+
+    parts = ", ".join(f"{key} {bound:.2f}" for (key, bound) in check.bounds.items())
+    print(
+        f"Pre-check: cost at least {check.lower_bound:.2f} ({parts}, "
+        f"{instrumentation.phases['precheck']['wall_time'] * 1000:.1f}ms)."
+    )
+
+    if check.can_beat(cutoff):
+        return check.lower_bound
+
+    if check.feasible:
+        print(f"Skipped: no solution costs less than {cutoff}.")
+        status = "Skipped"
+    else:
+        print(f"Infeasible: {check.reason}")
+        status = "Infeasible"
+
+    graph = G.graph
+    result = SolveResult(
+        graph["n"],
+        graph["m"],
+        graph["B"],
+        graph["E"],
+        graph["R"],
+        status,
+        lower_bound=check.lower_bound,
+    )
+    instrumentation.result = result.to_dict()
+    instrumentation.save(os.path.join(output_dir, "metrics.json"))
+
+    if cache is not None:
+        cache.put(result, c)
+
+    exit(0)
+
+
+def _load_warm_start(
+    path: Optional[str],
+    G: "nx.DiGraph",
+    cache: Optional[SolutionCache],
+    B: List[int],
+    E: List[int],
+) -> Optional[Assignment]:
+    """Read the warm start from a blueprint file or find it in the cache."""
+    from factorizer.visualization.blueprint import parse_blueprint
+    from factorizer.warmstart import assignment_from_blueprint, find_warm_start
+
+    if path:
+        with open(path) as file:
+            data = parse_blueprint(file.read().strip())
+
+        return assignment_from_blueprint(data, G)
+
+    if cache is not None:
+        return find_warm_start(cache, G.graph["n"], G.graph["m"], B, E, R, c)
+
+    return None
+
+
+def _run_sweep(
+    belt_n: int,
+    belt_m: int,
+    widths: range,
+    heights: range,
+    workers: Optional[int],
+    cache: Optional[SolutionCache],
+    model_cache: Optional[ModelCache],
+    solver: SolverConfig,
+    template: bool,
+    presolve: bool,
+    strengthen: bool,
+    aggregate: bool,
+    break_symmetry: bool,
+):
+    from factorizer.sweep import smallest_feasible, sweep
+
+    results = sweep(
+        belt_n,
+        belt_m,
+        widths,
+        heights,
+        R,
+        c,
+        workers=workers,
+        cache=cache,
+        model_cache=model_cache,
+        on_result=_print_result,
+        solver=solver,
+        template=template,
+        presolve=presolve,
+        strengthen=strengthen,
+        aggregate=aggregate,
+        break_symmetry=break_symmetry,
+    )
+
+    output_dir = "output"
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    path = os.path.join(output_dir, f"{belt_n}x{belt_m}-balancer_sweep.json")
+
+    with open(path, "w") as file:
+        json.dump([result.to_dict() for result in results], file, indent=2)
+
+    if best := smallest_feasible(results):
+        print(f"Smallest feasible grid: {best.n}x{best.m} (cost {best.cost:.2f})")
+    else:
+        print("No feasible grid found.")
+
 
-    return [i for i in range(edge_room, edge_room + belt_height)]
+def _run_compose(
+    belt_n: int,
+    belt_m: int,
+    cache: Optional[SolutionCache],
+    solver: SolverConfig,
+    strengthen: bool,
+    block_size: Optional[int],
+    outputs: Set[str],
+    verify: bool,
+    break_symmetry: bool,
+):
+    from factorizer.compose import DEFAULT_BLOCK_SIZE, compose_balancer
+
+    output_dir = os.path.join("output", f"{belt_n}x{belt_m}-balancer_composed")
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    instrumentation = Instrumentation()
+
+    print("Composing balancer...")
+
+    try:
+        with instrumentation.phase("compose"):
+            result, solution = compose_balancer(
+                belt_n,
+                belt_m,
+                R,
+                c,
+                cache=cache,
+                solver=solver,
+                strengthen=strengthen,
+                block_size=block_size or DEFAULT_BLOCK_SIZE,
+                break_symmetry=break_symmetry,
+            )
+    except ValueError as error:
+        print(f"Can't compose the balancer: {error}")
+        return
+
+    print(
+        f"Composed balancer on a {result.n}x{result.m} grid "
+        f"(cost {result.cost:.2f}, {result.wall_time:.2f}s)."
+    )
+
+    if outputs & {"svg", "ascii"}:
+        from factorizer.visualization.render import render_ascii, save_ascii, save_svg
+
+        with instrumentation.phase("render"):
+            if "svg" in outputs:
+                save_svg(solution, output_dir)
+
+            if "ascii" in outputs:
+                save_ascii(solution, output_dir)
+
+        if "ascii" in outputs:
+            print(render_ascii(solution), end="")
+
+    if verify:
+        _verify(result)
+
+    if "blueprint" in outputs:
+        with open(os.path.join(output_dir, "blueprint.txt"), "w") as file:
+            file.write(result.blueprint)
+
+    instrumentation.result = result.to_dict()
+    instrumentation.save(os.path.join(output_dir, "metrics.json"))
 
 
 if __name__ == "__main__":
@@ -44,51 +296,606 @@ if __name__ == "__main__":
         "-g",
         "--grid",
         default="10x4",
-        help="The size of the grid. nxm means a grid n tiles wide and m tiles high.",
+        help="The size of the grid. nxm means a grid n tiles wide and m tiles high. "
+        "Use ranges like 4-10x2-6 to search for the smallest feasible grid.",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="The number of processes for grid searches. Defaults to the number of CPUs.",
+    )
+    parser.add_argument(
+        "--template",
+        action="store_true",
+        help="Build the problem of the largest grid once per process and specialise it "
+        "to every grid size of the search.",
+    )
+    parser.add_argument(
+        "--compose",
+        action="store_true",
+        help="Build the balancer of solved smaller balancers and route the lanes between "
+        "them, instead of solving it as a whole. The grid size follows from the blocks.",
+    )
+    parser.add_argument(
+        "--block-size",
+        type=int,
+        default=None,
+        help="Solve the blocks with at most this many inputs and outputs directly "
+        "when composing. Defaults to 2.",
+    )
+    parser.add_argument(
+        "--matrix",
+        action="store_true",
+        help="Build the problem as sparse matrices and solve it without PuLP.",
+    )
+    parser.add_argument(
+        "--aggregate",
+        action="store_true",
+        help="Solve relaxations with the total flow of all inputs and only some "
+        "inputs as commodities, adding inputs until the layout is a balancer.",
+    )
+    parser.add_argument(
+        "--no-presolve",
+        action="store_true",
+        help="Keep the variables that can only be 0 and the redundant constraints.",
+    )
+    parser.add_argument(
+        "--strengthen",
+        action="store_true",
+        help="Use the strengthened formulation with a tighter LP relaxation.",
+    )
+    parser.add_argument(
+        "--break-symmetry",
+        action="store_true",
+        help="Only allow one of each pair of vertically mirrored layouts, "
+        "if the instance is its own mirror image.",
+    )
+    parser.add_argument(
+        "--solver",
+        choices=list(BACKENDS),
+        default="cbc",
+        help="The solver backend, it must be installed locally.",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="The number of threads of the solver.",
+    )
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        default=None,
+        help="Stop the solver after this many seconds and keep the best solution.",
+    )
+    parser.add_argument(
+        "--gap-rel",
+        type=float,
+        default=None,
+        help="Stop the solver once the relative gap to the bound is below this value.",
+    )
+    parser.add_argument(
+        "--gap-abs",
+        type=float,
+        default=None,
+        help="Stop the solver once the absolute gap to the bound is below this value.",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="The random seed of the solver.",
+    )
+    parser.add_argument(
+        "--anytime",
+        type=float,
+        nargs="?",
+        const=10.0,
+        default=None,
+        metavar="FIRST_ROUND",
+        help="Solve in rounds with growing time limits, starting with FIRST_ROUND "
+        "seconds (10 by default), and save every improved solution at once. "
+        "--time-limit bounds all rounds together.",
+    )
+    parser.add_argument(
+        "--portfolio",
+        type=int,
+        default=None,
+        help="Race this many solves with different seeds and formulations in parallel. "
+        "With --strengthen, all of them use the strengthened formulation.",
+    )
+    parser.add_argument(
+        "--warm-start",
+        default=None,
+        help="A file with a blueprint string on the same grid to use as initial solution. "
+        "Defaults to a cached solution of a neighbouring smaller grid.",
+    )
+    parser.add_argument(
+        "--outputs",
+        nargs="+",
+        choices=["blueprint", "graph", "svg", "ascii"],
+        default=["blueprint", "graph"],
+        help="The files to save next to metrics.json: blueprint.txt with the blueprint "
+        "string, solution_graph.png with the flows (drawn with matplotlib), "
+        "solution.svg with the layout and the flows, and solution.txt with the "
+        "layout as text, which is also printed.",
+    )
+    parser.add_argument(
+        "--no-render",
+        action="store_true",
+        help="Don't render solution_graph.png or solution.svg.",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Simulate the blueprint, also of cached solutions, and check that it "
+        "balances every input.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile every phase with cProfile and save the profiles in the output folder.",
+    )
+    parser.add_argument(
+        "--no-precheck",
+        action="store_true",
+        help="Don't check the instance for infeasibility before solving it.",
+    )
+    parser.add_argument(
+        "--cutoff",
+        type=float,
+        default=None,
+        metavar="COST",
+        help="Skip the solve if the pre-check proves that no solution costs less.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help="The directory of the solution cache.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't look up or store solutions in the cache.",
+    )
+    parser.add_argument(
+        "--model-cache-dir",
+        default=DEFAULT_MODEL_CACHE_DIR,
+        help="The directory of the cache of built problems.",
+    )
+    parser.add_argument(
+        "--no-model-cache",
+        action="store_true",
+        help="Don't load or store built problems in the model cache.",
+    )
+    parser.add_argument(
+        "--cache-max-entries",
+        type=int,
+        default=None,
+        help="Evict the least recently used solutions beyond this number.",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=None,
+        help="Evict the least recently used solutions beyond this total size.",
+    )
+    parser.add_argument(
+        "--cache-max-days",
+        type=float,
+        default=None,
+        help="Evict solutions that haven't been used for this many days.",
     )
 
     args = parser.parse_args()
 
+    if args.anytime is not None and args.matrix:
+        parser.error("--anytime can't be combined with --matrix.")
+
+    if args.aggregate and (args.matrix or args.anytime is not None):
+        parser.error("--aggregate can't be combined with --matrix or --anytime.")
+
+    modes = {
+        "--portfolio": args.portfolio is not None,
+        "--compose": args.compose,
+        "A grid range": "-" in args.grid,
+    }
+
+    for (mode, used) in modes.items():
+        if used and (args.matrix or args.anytime is not None):
+            parser.error(f"{mode} can't be combined with --matrix or --anytime.")
+
+    if args.compose and (args.aggregate or args.no_presolve):
+        parser.error("--compose can't be combined with --aggregate or --no-presolve.")
+
+    if args.template and (args.aggregate or args.break_symmetry or args.no_presolve):
+        parser.error(
+            "--template can't be combined with --aggregate, --break-symmetry or "
+            "--no-presolve."
+        )
+
     belt_size = args.balancer.split("x")
     belt_n = int(belt_size[0])
     belt_m = int(belt_size[1])
 
     grid_size = args.grid.split("x")
+
+    outputs = set(args.outputs)
+
+    if args.no_render:
+        outputs -= {"graph", "svg"}
+
+    if args.no_cache:
+        cache = None
+    else:
+        cache = SolutionCache(
+            args.cache_dir,
+            max_entries=args.cache_max_entries,
+            max_bytes=(
+                int(args.cache_max_mb * 1e6) if args.cache_max_mb is not None else None
+            ),
+            max_age=(
+                args.cache_max_days * 24 * 60 * 60
+                if args.cache_max_days is not None
+                else None
+            ),
+        )
+
+    if args.no_model_cache:
+        model_cache = None
+    else:
+        model_cache = ModelCache(args.model_cache_dir)
+
+    solver = SolverConfig(
+        args.solver,
+        threads=args.threads,
+        time_limit=args.time_limit,
+        gap_rel=args.gap_rel,
+        gap_abs=args.gap_abs,
+        seed=args.seed,
+    )
+
+    if args.compose:
+        _run_compose(
+            belt_n,
+            belt_m,
+            cache,
+            solver,
+            args.strengthen,
+            args.block_size,
+            outputs,
+            args.verify,
+            args.break_symmetry,
+        )
+        exit(0)
+
+    if "-" in args.grid:
+        widths = _parse_range(grid_size[0])
+        heights = _parse_range(grid_size[1])
+
+        _run_sweep(
+            belt_n,
+            belt_m,
+            widths,
+            heights,
+            args.workers,
+            cache,
+            model_cache,
+            solver,
+            args.template,
+            not args.no_presolve,
+            args.strengthen,
+            args.aggregate,
+            args.break_symmetry,
+        )
+        exit(0)
+
     grid_n = int(grid_size[0])
     grid_m = int(grid_size[1])
 
-    edge_room_left = (grid_m - belt_m) / 2.0
+    B = centered_tiles(grid_m, belt_n)
+    E = centered_tiles(grid_m, belt_m)
 
-    B = _centered_tiles(grid_m, belt_n)
-    E = _centered_tiles(grid_m, belt_m)
+    name = f"{belt_n}x{belt_m}-balancer_{grid_n}x{grid_m}-grid"
+    output_dir = os.path.join("output", name)
 
-    print("Building graph...")
-    start = datetime.now()
+    if cache is not None:
+        if (cached := cache.get(grid_n, grid_m, B, E, R, c)) is not None:
+            print(f"Found cached solution ({cached.status}).")
 
-    G = build_graph(grid_n, grid_m, B, E, R)
+            if cached.feasible and args.verify:
+                _verify(cached)
 
-    end_graph = datetime.now()
-    dur_graph = (end_graph - start).total_seconds()
-    print(f"Built graph ({dur_graph:.2f}s).")
+            if cached.feasible and "blueprint" in outputs:
+                if not os.path.exists(output_dir):
+                    os.makedirs(output_dir)
 
-    name = G.graph["name"]
-    output_dir = os.path.join("output", name)
+                with open(os.path.join(output_dir, "blueprint.txt"), "w") as file:
+                    file.write(cached.blueprint)
+
+            exit(0)
 
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    print("Building problem...")
+    instrumentation = Instrumentation(
+        os.path.join(output_dir, "profile") if args.profile else None
+    )
+    phases = instrumentation.phases
+
+    from factorizer.graph import build_graph
+
+    if args.portfolio:
+        from factorizer.portfolio import default_portfolio, race
+
+        G = build_graph(grid_n, grid_m, B, E, R)
+
+        if not args.no_precheck:
+            _precheck(G, instrumentation, cache, args.cutoff, output_dir)
+
+        warm_start = _load_warm_start(args.warm_start, G, cache, B, E)
+        members = default_portfolio(args.portfolio, solver, args.strengthen)
+
+        print(f"Racing {len(members)} solves...")
+
+        with instrumentation.phase("race"):
+            result = race(
+                grid_n,
+                grid_m,
+                B,
+                E,
+                R,
+                c,
+                members,
+                warm_start,
+                presolve=not args.no_presolve,
+                break_symmetry=args.break_symmetry,
+                aggregate=args.aggregate,
+            )
+
+        print(
+            f"Finished with {result.backend} "
+            f"({result.status}, {phases['race']['wall_time']:.2f}s)."
+        )
+
+        if result.blueprint is not None and args.verify:
+            _verify(result)
+
+        if result.blueprint is not None and "blueprint" in outputs:
+            with open(os.path.join(output_dir, "blueprint.txt"), "w") as file:
+                file.write(result.blueprint)
+
+        instrumentation.result = result.to_dict()
+        instrumentation.save(os.path.join(output_dir, "metrics.json"))
+
+        if cache is not None and solver.gap_rel is None and solver.gap_abs is None:
+            cache.put(result, c)
+
+        exit(0)
+
+    from pulp import value
+
+    from factorizer.matrix import (
+        assign_values,
+        build_matrix_problem,
+        solve_matrix_problem,
+    )
+    from factorizer.problem import ModelReport, build_problem
+    from factorizer.solution import decode_solution
+    from factorizer.solvers import cbc_arguments, make_solver, solve_status
+    from factorizer.visualization.blueprint import convert_to_blueprint
+    from factorizer.warmstart import apply_warm_start
+
+    model = None
+
+    if model_cache is not None and not args.matrix:
+        from factorizer.models import Model, model_key
+
+        key = model_key(
+            grid_n,
+            grid_m,
+            B,
+            E,
+            R,
+            c,
+            presolve=not args.no_presolve,
+            strengthen=args.strengthen,
+            break_symmetry=args.break_symmetry,
+        )
+
+        with instrumentation.phase("model_cache"):
+            model = model_cache.get(key)
+
+    if model is None:
+        print("Building graph...")
+
+        with instrumentation.phase("graph"):
+            G = build_graph(grid_n, grid_m, B, E, R)
+
+        print(f"Built graph ({phases['graph']['wall_time']:.2f}s).")
+    else:
+        G = model.G
+        print(
+            "Loaded problem from the model cache "
+            f"({phases['model_cache']['wall_time']:.2f}s)."
+        )
+
+    lower_bound = None
+
+    if not args.no_precheck:
+        lower_bound = _precheck(G, instrumentation, cache, args.cutoff, output_dir)
+
+    if model is None:
+        print("Building problem...")
+
+        with instrumentation.phase("problem"):
+            if args.matrix:
+                problem, t, u, s, x, y = build_matrix_problem(G, c)
+            else:
+                report = ModelReport()
+                problem, t, u, s, x, y = build_problem(
+                    G,
+                    c,
+                    presolve=not args.no_presolve,
+                    strengthen=args.strengthen,
+                    report=report,
+                    break_symmetry=args.break_symmetry,
+                )
+
+        print(f"Built problem ({phases['problem']['wall_time']:.2f}s).")
+
+        if model_cache is not None and not args.matrix:
+            model_cache.put(key, Model(G, problem, (t, u, s, x, y), report))
+    else:
+        problem = model.problem
+        (t, u, s, x, y) = model.variables
+        report = model.report
+
+    if args.matrix:
+        instrumentation.model = {
+            "variables": problem.num_cols,
+            "constraints": problem.num_rows,
+            "nonzeros": problem.nnz,
+        }
+    else:
+        instrumentation.model = report.to_dict()
+        print(f"Problem size: {report.summary()}")
+
+    is_cbc = solver.backend in ("cbc", "coin")
+    # The output of other solvers is shown directly
+    log_path = os.path.join(output_dir, "cbc.log") if is_cbc else None
+    solver.msg = not is_cbc
+
+    print(f"Solving problem with {solver.describe()}...")
+
+    if args.matrix:
+        with instrumentation.phase("solve"):
+            status, objective, values = solve_matrix_problem(
+                problem, log_path=log_path, arguments=cbc_arguments(solver)
+            )
+
+        t, u, s, x, y = (assign_values(index, values) for index in (t, u, s, x, y))
+    elif args.aggregate:
+        from factorizer.aggregate import solve_aggregated
+
+        with instrumentation.phase("solve"):
+            (status, rounds) = solve_aggregated(
+                problem,
+                G,
+                c,
+                (t, u, s, x, y),
+                solver,
+                presolve=not args.no_presolve,
+                strengthen=args.strengthen,
+                break_symmetry=args.break_symmetry,
+                log_path=log_path,
+                on_round=_print_round,
+            )
+
+        instrumentation.model["rounds"] = [
+            asdict(solve_round) for solve_round in rounds
+        ]
+        objective = value(problem.objective)
+    else:
+        warm_start = _load_warm_start(args.warm_start, G, cache, B, E)
+        use_warm_start = warm_start is not None and apply_warm_start(
+            warm_start, t, u, s, x, y
+        )
+
+        if use_warm_start:
+            print("Using warm start.")
+
+        if args.anytime is not None:
+            from factorizer.anytime import solve_anytime
+
+            print(f"Saving every improved solution to {output_dir}.")
+
+            with instrumentation.phase("solve"):
+                (status, objective, _) = solve_anytime(
+                    problem,
+                    G,
+                    (t, u, s, x, y),
+                    output_dir,
+                    solver,
+                    first_round=args.anytime,
+                    warm_start=warm_start if use_warm_start else None,
+                    on_incumbent=_print_incumbent,
+                )
+        else:
+            with instrumentation.phase("solve"):
+                problem.solve(
+                    make_solver(solver, warm_start=use_warm_start, log_path=log_path)
+                )
+
+            status = solve_status(problem)
+            objective = value(problem.objective)
+
+    instrumentation.solver = {"backend": solver.describe()}
+
+    # No round of --anytime might have run
+    if log_path is not None and os.path.exists(log_path):
+        with open(log_path) as file:
+            instrumentation.solver.update(parse_cbc_log(file.read()))
+
+    print(
+        f"Solved problem ({phases['solve']['wall_time']:.2f}s, "
+        f"{instrumentation.solver.get('nodes', '?')} nodes)."
+    )
+
+    result = SolveResult(grid_n, grid_m, B, E, R, status, lower_bound=lower_bound)
+    result.backend = solver.describe()
+
+    if status in ("Optimal", "Feasible"):
+        result.cost = objective
+
+        with instrumentation.phase("decode"):
+            solution = decode_solution(G, t, u, s, x, y)
+
+        with instrumentation.phase("blueprint"):
+            result.blueprint = convert_to_blueprint(solution)
+
+        result.assignment = extract_assignment(t, u, s, x, y)
+
+        if "graph" in outputs:
+            from factorizer.visualization.graph import (
+                build_solution_graph,
+                save_solution_graph,
+            )
+
+            with instrumentation.phase("solution_graph"):
+                H = build_solution_graph(G, solution)
+                save_solution_graph(H, output_dir)
+
+        if outputs & {"svg", "ascii"}:
+            from factorizer.visualization.render import (
+                render_ascii,
+                save_ascii,
+                save_svg,
+            )
+
+            with instrumentation.phase("render"):
+                if "svg" in outputs:
+                    save_svg(solution, output_dir)
+
+                if "ascii" in outputs:
+                    save_ascii(solution, output_dir)
 
-    problem, t, u, s, x, y = build_problem(G, c)
+            if "ascii" in outputs:
+                print(render_ascii(solution), end="")
 
-    end_problem = datetime.now()
-    dur_problem = (end_problem - end_graph).total_seconds()
-    print(f"Built problem ({dur_problem:.2f}s).")
+        if args.verify:
+            _verify(result)
 
-    problem.solve()
+        if "blueprint" in outputs:
+            with open(os.path.join(output_dir, "blueprint.txt"), "w") as file:
+                file.write(result.blueprint)
+    else:
+        print(f"No solution found ({status}).")
 
-    H = build_solution_graph(G, t, u, s, x, y)
-    save_solution_graph(H, output_dir)
+    instrumentation.result = result.to_dict()
+    instrumentation.save(os.path.join(output_dir, "metrics.json"))
 
-    with open(os.path.join(output_dir, "blueprint.txt"), "w") as file:
-        file.write(convert_to_blueprint(G, t, u, s, x, y))
+    if cache is not None and solver.gap_rel is None and solver.gap_abs is None:
+        cache.put(result, c)
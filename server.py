@@ -0,0 +1,517 @@
+"""Keep the solver warm in a local service and solve instances on request.
+
+Starting `main.py` imports PuLP, networkx and numpy and builds the problem from
+scratch every time. The service imports them once, and its worker processes
+keep the solution cache and the problems of the last instances they built, so
+that solving an instance again, for example with another time limit, doesn't
+build it again.
+
+The service speaks HTTP on localhost or on a Unix socket:
+
+- `POST /solve` with a spec like the lines of `batch.py`, for example
+  `{"balancer": "2x2", "grid": "4x2", "time_limit": 60}`, answers with the
+  status, cost, times and blueprint string of the solution.
+- `GET /health` answers whether the service is up, with its workers.
+- `GET /metrics` answers with the number of requests, jobs and statuses and
+  the solve times.
+
+At most `--workers` jobs run at the same time and at most `--max-queue` jobs
+wait for a worker, further requests are rejected with 503.
+
+Usage:
+    python server.py --port 8765 --workers 4
+    curl -s localhost:8765/solve -d '{"balancer": "2x2", "grid": "4x2"}'
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from queue import Empty
+from http import HTTPStatus
+from typing import Dict, Optional, Set, Tuple
+
+from batch import job_id, parse_size, solve_spec
+from factorizer.cache import DEFAULT_CACHE_DIR, SolutionCache
+from factorizer.models import DEFAULT_MODEL_CACHE_DIR, ModelCache
+from factorizer.solve import DEFAULT_MAX_MODELS, ModelStore
+from factorizer.solvers import BACKENDS
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# The number of jobs that can wait for a worker
+DEFAULT_MAX_QUEUE = 64
+# The longest request body in bytes
+MAX_BODY = 1 << 20
+# The modules that the workers import before their first job
+PRELOAD = ["batch", "factorizer.solve", "factorizer.aggregate"]
+# The types of the optional keys of a spec
+SPEC_TYPES = {
+    "R": int,
+    "costs": dict,
+    "strengthen": bool,
+    "aggregate": bool,
+    "break_symmetry": bool,
+    "cutoff": (int, float),
+    "solver": str,
+    "threads": int,
+    "time_limit": (int, float),
+    "gap_rel": (int, float),
+    "gap_abs": (int, float),
+    "seed": int,
+}
+COSTS = ["transport", "underground", "splitter"]
+
+# The solution cache and built problems of a worker process
+_cache: Optional[SolutionCache] = None
+_models: Optional[ModelStore] = None
+_model_cache: Optional[ModelCache] = None
+
+
+def _init_worker(
+    cache_dir: Optional[str],
+    max_models: int,
+    model_cache_dir: Optional[str],
+    started: multiprocessing.Queue,
+) -> None:
+    global _cache, _models, _model_cache
+
+    # Stop with the service, not on the Ctrl+C meant for it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Start a new process group, so the solver can be killed together with us
+    if hasattr(os, "setsid"):
+        os.setsid()
+
+    started.put(os.getpid())
+
+    _cache = SolutionCache(cache_dir) if cache_dir is not None else None
+    _models = ModelStore(max_models)
+    _model_cache = ModelCache(model_cache_dir) if model_cache_dir is not None else None
+
+
+def _ping() -> None:
+    pass
+
+
+def _solve(spec: Dict) -> Dict:
+    return solve_spec(spec, _cache, _models, _model_cache).to_dict()
+
+
+class BadRequest(Exception):
+    """The request can't be answered, with the HTTP status to answer it with."""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+    """Read the method, path and body of an HTTP request."""
+    try:
+        request_line = (await reader.readline()).decode("latin-1")
+        (method, path, _) = request_line.split(" ", 2)
+        headers = {}
+
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            (name, _, value) = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise BadRequest(HTTPStatus.BAD_REQUEST, "Malformed request.")
+
+    if length < 0:
+        raise BadRequest(HTTPStatus.BAD_REQUEST, "Malformed request.")
+
+    if length > MAX_BODY:
+        raise BadRequest(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request too large.")
+
+    return method, path.split("?", 1)[0], await reader.readexactly(length)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check_spec(spec) -> None:
+    """Reject specs that the workers can't solve before submitting them."""
+
+    def bad(message: str) -> BadRequest:
+        return BadRequest(HTTPStatus.BAD_REQUEST, message)
+
+    if not isinstance(spec, dict) or not {"balancer", "grid"} <= set(spec):
+        raise bad("The spec needs a balancer and a grid.")
+
+    for key in ("balancer", "grid"):
+        try:
+            size = parse_size(spec[key])
+        except (AttributeError, ValueError):
+            raise bad(f"The {key} isn't a size like 2x4.")
+
+        if min(size) < 1:
+            raise bad(f"The {key} needs a positive size.")
+
+    for (key, types) in SPEC_TYPES.items():
+        value = spec.get(key)
+
+        # Booleans are ints as well, but not the other way round
+        if value is not None and (
+            not isinstance(value, types)
+            or (isinstance(value, bool) and types is not bool)
+        ):
+            raise bad(f"The {key} of the spec has the wrong type.")
+
+    if spec.get("solver", "cbc") not in BACKENDS:
+        raise bad(f"The solver isn't one of {', '.join(BACKENDS)}.")
+
+    costs = spec.get("costs")
+
+    if costs is not None and (
+        set(costs) != set(COSTS) or not all(map(_is_number, costs.values()))
+    ):
+        raise bad(f"The costs need exactly the numbers {', '.join(COSTS)}.")
+
+
+def _response(status: HTTPStatus, payload: Dict) -> bytes:
+    body = json.dumps(payload).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+
+    return head.encode("latin-1") + body
+
+
+class SolverService:
+    """Solve the specs of requests on a pool of worker processes.
+
+    Args:
+        workers: The number of jobs to run at the same time.
+        max_queue: The number of jobs that can wait for a worker.
+        cache_dir: The directory of the solution cache, or None to not use it.
+        max_models: The number of problems that every worker keeps.
+        time_limit: The time limit of the jobs whose spec has none.
+        model_cache_dir: The directory of the cache of built problems, or None
+            to not use it.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        cache_dir: Optional[str] = None,
+        max_models: int = DEFAULT_MAX_MODELS,
+        time_limit: Optional[float] = None,
+        model_cache_dir: Optional[str] = None,
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.cache_dir = cache_dir
+        self.max_models = max_models
+        self.time_limit = time_limit
+        self.model_cache_dir = model_cache_dir
+        self.started = time.time()
+        self.requests = 0
+        self.rejected = 0
+        self.errors = 0
+        # The jobs that were submitted and haven't finished yet
+        self.pending = 0
+        self.statuses: Counter = Counter()
+        self.solve_time = 0.0
+        self.max_solve_time = 0.0
+        # The futures of the submitted jobs
+        self._jobs: Set[asyncio.Future] = set()
+        self._stopping = False
+        # The workers are forked from a server process that has imported the
+        # solver once, instead of from this process with its event loop threads
+        self._context = multiprocessing.get_context("forkserver")
+        self._context.set_forkserver_preload(PRELOAD)
+        # The workers send their pids once they have started
+        self._started = self._context.Queue()
+        self._worker_pids: Set[int] = set()
+        self.executor = self._start_pool()
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            self.workers,
+            mp_context=self._context,
+            initializer=_init_worker,
+            initargs=(
+                self.cache_dir,
+                self.max_models,
+                self.model_cache_dir,
+                self._started,
+            ),
+        )
+
+    def _worker_groups(self) -> Set[int]:
+        """Get the process groups of the workers that have started so far."""
+        while True:
+            try:
+                self._worker_pids.add(self._started.get_nowait())
+            except Empty:
+                return set(self._worker_pids)
+
+    def _kill_workers(self) -> None:
+        """Kill the workers of the pool together with their solvers."""
+        for pid in self._worker_groups():
+            try:
+                os.killpg(pid, signal.SIGTERM)
+            except (AttributeError, ProcessLookupError, PermissionError):
+                # Without process groups, the pool terminates its workers
+                pass
+
+        self._worker_pids.clear()
+        self.executor.shutdown(wait=False)
+
+    def health(self) -> Dict:
+        return {
+            "status": "ok",
+            "workers": self.workers,
+            "uptime": time.time() - self.started,
+        }
+
+    def metrics(self) -> Dict:
+        finished = sum(self.statuses.values())
+
+        return {
+            "uptime": time.time() - self.started,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "running": min(self.pending, self.workers),
+            "queued": max(0, self.pending - self.workers),
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "jobs": finished,
+            "statuses": dict(self.statuses),
+            "solve_time": {
+                "total": self.solve_time,
+                "mean": self.solve_time / finished if finished else None,
+                "max": self.max_solve_time,
+            },
+        }
+
+    async def solve(self, spec: Dict) -> Dict:
+        """Solve the instance of the spec on a worker."""
+        _check_spec(spec)
+
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise BadRequest(HTTPStatus.SERVICE_UNAVAILABLE, "The queue is full.")
+
+        if self.time_limit is not None and "time_limit" not in spec:
+            spec = {**spec, "time_limit": self.time_limit}
+
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        start = time.perf_counter()
+        self.pending += 1
+
+        job = loop.run_in_executor(executor, _solve, spec)
+        self._jobs.add(job)
+
+        try:
+            result = await job
+        except BrokenProcessPool:
+            self.errors += 1
+
+            # A worker died, the pool can't take any more jobs
+            if self.executor is executor:
+                self._kill_workers()
+                self.executor = self._start_pool()
+
+            raise BadRequest(HTTPStatus.INTERNAL_SERVER_ERROR, "The worker died.")
+        except asyncio.CancelledError:
+            if not self._stopping:
+                raise
+
+            raise BadRequest(HTTPStatus.SERVICE_UNAVAILABLE, "The service stopped.")
+        except Exception as error:
+            self.errors += 1
+            raise BadRequest(HTTPStatus.INTERNAL_SERVER_ERROR, repr(error))
+        finally:
+            self._jobs.discard(job)
+            self.pending -= 1
+
+        elapsed = time.perf_counter() - start
+        self.statuses[result["status"]] += 1
+        self.solve_time += elapsed
+        self.max_solve_time = max(self.max_solve_time, elapsed)
+
+        return {"id": job_id(spec), **result, "elapsed": elapsed}
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answer one HTTP request."""
+        self.requests += 1
+
+        try:
+            (method, path, body) = await _read_request(reader)
+
+            if path in ("/health", "/metrics"):
+                if method != "GET":
+                    raise BadRequest(HTTPStatus.METHOD_NOT_ALLOWED, "Use GET.")
+
+                payload = self.health() if path == "/health" else self.metrics()
+            elif path == "/solve":
+                if method != "POST":
+                    raise BadRequest(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST.")
+
+                try:
+                    spec = json.loads(body)
+                except ValueError:
+                    raise BadRequest(HTTPStatus.BAD_REQUEST, "The spec isn't JSON.")
+
+                payload = await self.solve(spec)
+            else:
+                raise BadRequest(HTTPStatus.NOT_FOUND, f"No endpoint {path}.")
+
+            writer.write(_response(HTTPStatus.OK, payload))
+        except BadRequest as error:
+            writer.write(_response(error.status, {"error": str(error)}))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            # The client went away
+            pass
+
+        try:
+            await writer.drain()
+            writer.close()
+        except ConnectionError:
+            pass
+
+    async def serve(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        socket_path: Optional[str] = None,
+        ready: Optional[asyncio.Future] = None,
+    ) -> None:
+        """Answer requests until the task is cancelled or SIGTERM or SIGINT.
+
+        Afterwards, the waiting jobs are dropped and the running ones are
+        killed together with their solvers.
+
+        Args:
+            host: The host to listen on.
+            port: The port to listen on, 0 for any free port.
+            socket_path: Listen on this Unix socket instead of the host and port.
+            ready: Set to the address of the service once it listens.
+        """
+        if socket_path is not None:
+            server = await asyncio.start_unix_server(self.handle, socket_path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        # Start the fork server, so that the first request doesn't wait for it
+        await loop.run_in_executor(self.executor, _ping)
+
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(signum, stop.set)
+            except (NotImplementedError, RuntimeError):
+                # Only the main thread on Unix can handle signals
+                pass
+
+        if ready is not None:
+            ready.set_result(server.sockets[0].getsockname())
+
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            self._stopping = True
+
+            for job in self._jobs:
+                job.cancel()
+
+            self._kill_workers()
+
+            if socket_path is not None and os.path.exists(socket_path):
+                os.remove(socket_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser("Factorio belt balancer service")
+
+    parser.add_argument("--host", default=DEFAULT_HOST, help="The host to listen on.")
+    parser.add_argument(
+        "--port", type=int, default=DEFAULT_PORT, help="The port to listen on."
+    )
+    parser.add_argument(
+        "--socket",
+        default=None,
+        help="Listen on this Unix socket instead of the host and port.",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="The number of jobs to run at the same time. Defaults to the number of CPUs.",
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=DEFAULT_MAX_QUEUE,
+        help="Reject further requests while this many jobs wait for a worker.",
+    )
+    parser.add_argument(
+        "--max-models",
+        type=int,
+        default=DEFAULT_MAX_MODELS,
+        help="The number of built problems that every worker keeps.",
+    )
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        default=None,
+        help="The time limit of the solver for specs without one, in seconds.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help="The directory of the solution cache.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't look up or store solutions in the cache.",
+    )
+    parser.add_argument(
+        "--model-cache-dir",
+        default=DEFAULT_MODEL_CACHE_DIR,
+        help="The directory of the cache of built problems.",
+    )
+    parser.add_argument(
+        "--no-model-cache",
+        action="store_true",
+        help="Don't load or store built problems in the model cache.",
+    )
+
+    args = parser.parse_args()
+
+    service = SolverService(
+        workers=args.workers,
+        max_queue=args.max_queue,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        max_models=args.max_models,
+        time_limit=args.time_limit,
+        model_cache_dir=None if args.no_model_cache else args.model_cache_dir,
+    )
+    address = args.socket or f"http://{args.host}:{args.port}"
+    print(f"Solving on {args.workers} workers at {address}.")
+
+    asyncio.run(service.serve(args.host, args.port, args.socket))
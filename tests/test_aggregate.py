@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+from factorizer import aggregate
+from factorizer.aggregate import solve_aggregated
+from factorizer.graph import build_graph
+from factorizer.problem import TOTAL, build_problem
+from factorizer.solvers import SolverConfig, make_solver, solve_status
+from factorizer.utils import centered_tiles
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+
+def _graph(belt_n: int, belt_m: int, n: int, m: int, R: int):
+    return build_graph(n, m, centered_tiles(m, belt_n), centered_tiles(m, belt_m), R)
+
+
+def _solve(G, commodities):
+    (problem, *_) = build_problem(G, c, presolve=True, commodities=commodities)
+    problem.solve(make_solver(SolverConfig()))
+
+    return solve_status(problem), problem.objective.value()
+
+
+def test_total_commodity() -> None:
+    """The total flow and all but one input are exact, the total flow alone isn't."""
+    G = _graph(2, 2, 2, 2, 2)
+
+    assert _solve(G, None) == ("Optimal", 29.5)
+    assert _solve(G, [TOTAL, G.graph["B"][0]]) == ("Optimal", 29.5)
+
+    (status, cost) = _solve(G, [TOTAL])
+    assert status == "Optimal"
+    assert cost < 29.5
+
+
+def test_commodities_shrink_model() -> None:
+    """Every left out input saves one flow variable per arc."""
+    G = _graph(3, 4, 5, 4, 3)
+    (_, _, _, _, x, y) = build_problem(G, c, presolve=True)
+    (_, _, _, _, x_total, _) = build_problem(
+        G, c, presolve=True, commodities=[TOTAL, 0]
+    )
+
+    assert len(x) == 3 * len(y)
+    assert len(x_total) == 2 * len(y)
+
+
+def test_solve_aggregated_infeasible() -> None:
+    """An infeasible relaxation proves the instance infeasible."""
+    G = _graph(3, 3, 4, 3, 3)
+    (problem, *variables) = build_problem(G, c, presolve=True, strengthen=True)
+    (status, rounds) = solve_aggregated(
+        problem, G, c, tuple(variables), strengthen=True
+    )
+
+    assert status == "Infeasible"
+    assert [solve_round.commodities for solve_round in rounds] == [[TOTAL, 0]]
+
+
+def test_solve_aggregated_two_inputs() -> None:
+    """Instances with up to two inputs are solved directly."""
+    G = _graph(2, 2, 2, 2, 2)
+    (problem, *variables) = build_problem(G, c, presolve=True)
+    (status, rounds) = solve_aggregated(problem, G, c, tuple(variables))
+
+    assert status == "Optimal"
+    assert problem.objective.value() == 29.5
+    assert rounds == []
+
+
+def test_solve_aggregated_time_limit(monkeypatch) -> None:
+    """The certification only gets the time that the relaxation left."""
+    G = _graph(3, 3, 3, 4, 3)
+    (problem, *variables) = build_problem(G, c, presolve=True)
+    limits = []
+
+    def certify(problem, variables, relaxed, solver) -> bool:
+        limits.append(solver.time_limit)
+        return True
+
+    # Every reading of the clock takes 10 seconds, and every relaxation is solved
+    clock = iter(range(0, 1000, 10))
+    monkeypatch.setattr(
+        aggregate, "time", SimpleNamespace(perf_counter=lambda: next(clock))
+    )
+    monkeypatch.setattr(aggregate, "solve_status", lambda problem: "Optimal")
+    monkeypatch.setattr(aggregate, "_certify", certify)
+
+    (status, _) = solve_aggregated(
+        problem, G, c, tuple(variables), SolverConfig(time_limit=100)
+    )
+
+    assert status == "Optimal"
+    assert limits == [70]
+
+    # The relaxation used up the time, so its layout isn't certified
+    (status, rounds) = solve_aggregated(
+        problem, G, c, tuple(variables), SolverConfig(time_limit=25)
+    )
+
+    assert status == "Not Solved"
+    assert limits == [70]
+    assert [solve_round.certified for solve_round in rounds] == [False]
@@ -0,0 +1,148 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from factorizer.anytime import solve_anytime
+from factorizer.graph import build_graph
+from factorizer.problem import build_problem
+from factorizer.solvers import SolverConfig
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+
+def _problem(n, m, B, E, R):
+    G = build_graph(n, m, B, E, R)
+    (problem, *variables) = build_problem(G, c, presolve=True)
+
+    return problem, G, tuple(variables)
+
+
+def test_solve_anytime_optimal(tmp_path) -> None:
+    """Save the solution of a round that proves it optimal."""
+    (problem, G, variables) = _problem(3, 2, [0], [0, 1], 2)
+    (status, cost, incumbents) = solve_anytime(problem, G, variables, str(tmp_path))
+
+    assert (status, cost) == ("Optimal", 32.5)
+    assert [(incumbent.index, incumbent.gap) for incumbent in incumbents] == [(1, 0)]
+    assert problem.objective.value() == cost
+
+    with open(tmp_path / "blueprint.txt") as file:
+        blueprint = file.read()
+
+    with open(incumbents[0].path) as file:
+        assert file.read() == blueprint
+
+    with open(tmp_path / "best.json") as file:
+        assert json.load(file)["status"] == "Optimal"
+
+
+def test_solve_anytime_time_limit(tmp_path) -> None:
+    """Save every improved solution until the time limit."""
+    (problem, G, variables) = _problem(4, 4, [1, 2], [0, 1, 2, 3], 3)
+    (status, cost, incumbents) = solve_anytime(
+        problem,
+        G,
+        variables,
+        str(tmp_path),
+        SolverConfig(time_limit=4),
+        first_round=0.5,
+    )
+
+    assert status == "Feasible"
+    assert incumbents and cost == incumbents[-1].cost
+    assert all(a.cost > b.cost for (a, b) in zip(incumbents, incumbents[1:]))
+
+    with open(tmp_path / "incumbents.jsonl") as file:
+        records = [json.loads(line) for line in file]
+
+    assert [record["cost"] for record in records] == [i.cost for i in incumbents]
+    assert all(os.path.exists(record["path"]) for record in records)
+
+
+def test_solve_anytime_no_time(tmp_path) -> None:
+    """Verify that a run without time for a round finds nothing, with no log."""
+    (problem, G, variables) = _problem(3, 2, [0], [0, 1], 2)
+
+    with open(tmp_path / "cbc.log", "w") as file:
+        file.write("The log of an earlier run")
+
+    (status, cost, incumbents) = solve_anytime(
+        problem, G, variables, str(tmp_path), SolverConfig(time_limit=0)
+    )
+
+    assert (status, cost, incumbents) == ("Not Solved", None, [])
+    assert not os.path.exists(tmp_path / "cbc.log")
+    assert not os.path.exists(tmp_path / "blueprint.txt")
+
+
+def _wait_until(condition, timeout: float = 30) -> bool:
+    deadline = time.time() + timeout
+
+    while not condition():
+        if time.time() > deadline:
+            return False
+
+        time.sleep(0.1)
+
+    return True
+
+
+def _group_alive(pgid: int) -> bool:
+    try:
+        os.killpg(pgid, 0)
+    except ProcessLookupError:
+        return False
+
+    return True
+
+
+@pytest.mark.skipif(not hasattr(os, "setsid"), reason="Needs process groups")
+def test_solve_anytime_terminate(tmp_path) -> None:
+    """Verify that terminating the run kills the process group of the round."""
+    script = f"""
+import factorizer.anytime
+from tests.test_anytime import _problem
+
+class Process(factorizer.anytime.Process):
+    def start(self):
+        super().start()
+        print("round", self.pid, flush=True)
+
+factorizer.anytime.Process = Process
+(problem, G, variables) = _problem(4, 4, [1, 2], [0, 1, 2, 3], 3)
+factorizer.anytime.solve_anytime(
+    problem, G, variables, {str(tmp_path)!r}, first_round=600
+)
+"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(
+        [sys.executable, "-c", script], cwd=root, stdout=subprocess.PIPE, text=True
+    )
+    pgid = None
+
+    try:
+        for line in process.stdout:
+            if line.startswith("round "):
+                pgid = int(line.split()[1])
+                break
+
+        # The round starts its own process group, then the solver in it
+        assert pgid is not None
+        assert _wait_until(lambda: os.getpgid(pgid) == pgid)
+        time.sleep(1)
+
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+
+        # Killed solvers linger until they are reaped
+        assert _wait_until(lambda: not _group_alive(pgid))
+    finally:
+        process.kill()
+
+        if pgid is not None and _group_alive(pgid):
+            os.killpg(pgid, signal.SIGKILL)
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from batch import Job, finished_jobs, job_id, read_jobs, run_batch
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+
+def _write_specs(path, specs) -> None:
+    with open(path, "w") as file:
+        for spec in specs:
+            file.write(json.dumps(spec) + "\n")
+
+
+def test_job_id() -> None:
+    """Verify that specs without id are identified by their content."""
+    spec = {"balancer": "1x2", "grid": "3x2", "R": 2}
+
+    assert job_id({"id": 5, **spec}) == "5"
+    assert job_id(spec) == job_id(dict(reversed(spec.items())))
+    assert job_id(spec) != job_id({**spec, "R": 3})
+
+
+def test_run_batch(tmp_path) -> None:
+    """Verify that the results are appended and finished jobs are skipped."""
+    specs = [
+        {"balancer": "1x2", "grid": "3x2", "R": 2, "costs": c},
+        {"id": "narrow", "balancer": "1x2", "grid": "1x2", "R": 2, "costs": c},
+    ]
+    _write_specs(tmp_path / "specs.jsonl", specs)
+    output = str(tmp_path / "results.jsonl")
+    jobs = read_jobs(tmp_path / "specs.jsonl")
+
+    assert run_batch(jobs, output) == 2
+    assert run_batch(jobs, output) == 0
+
+    with open(output) as file:
+        records = {record["id"]: record for record in map(json.loads, file)}
+
+    assert set(records) == {jobs[0].id, "narrow"}
+    assert finished_jobs(output) == set(records)
+    assert records[jobs[0].id]["status"] == "Optimal"
+    assert records[jobs[0].id]["blueprint"] is not None
+    assert records[jobs[0].id]["spec"] == specs[0]
+    assert records["narrow"]["status"] == "Infeasible"
+
+
+def test_run_batch_duplicates(tmp_path) -> None:
+    """Verify that identical specs without id run only once."""
+    spec = {"balancer": "1x2", "grid": "3x2", "R": 2, "costs": c}
+    _write_specs(tmp_path / "specs.jsonl", [spec, spec])
+    output = str(tmp_path / "results.jsonl")
+    jobs = read_jobs(tmp_path / "specs.jsonl")
+
+    with pytest.warns(UserWarning, match=jobs[0].id):
+        assert run_batch(jobs, output) == 1
+
+    with open(output) as file:
+        (record,) = map(json.loads, file)
+
+    assert record["id"] == jobs[0].id
+    assert record["status"] == "Optimal"
+
+
+def test_run_batch_timeout(tmp_path) -> None:
+    """Verify that a job is killed and recorded once it exceeds its timeout."""
+    spec = {"balancer": "1x4", "grid": "5x4", "R": 4, "timeout": 0.5}
+    output = str(tmp_path / "results.jsonl")
+
+    run_batch([Job("slow", spec)], output)
+
+    with open(output) as file:
+        (record,) = map(json.loads, file)
+
+    assert record["id"] == "slow"
+    assert record["status"] == "Timeout"
+    assert record["elapsed"] < 5
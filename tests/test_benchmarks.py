@@ -0,0 +1,14 @@
+import json
+
+from benchmarks.run import Case, run_case
+
+
+def test_run_case() -> None:
+    """Verify that the record of a solved case can be written as JSON."""
+    result = run_case(Case(1, 2, 3, 2, 2), time_limit=60)
+
+    assert result["status"] == "Optimal"
+    assert result["solution"] == "Optimal Solution Found"
+    assert "blueprint" in result["times"]
+
+    assert json.loads(json.dumps(result))["cost"] == result["cost"]
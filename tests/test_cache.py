@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+
+from factorizer.cache import SolutionCache
+from factorizer.graph import build_graph
+from factorizer.problem import build_problem
+from factorizer.solve import solve_instance
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+
+def test_cache_hit(tmp_path) -> None:
+    """Verify that a solved instance is served from the cache."""
+    cache = SolutionCache(str(tmp_path))
+    result = solve_instance(3, 2, [0], [0, 1], 2, c, cache=cache)
+    cached = cache.get(3, 2, [0], [0, 1], 2, c)
+
+    assert cached is not None
+    assert cached.cost == result.cost
+    assert cached.blueprint == result.blueprint
+    assert cached.assignment == result.assignment
+
+    assert cache.get(3, 2, [0], [0, 1], 3, c) is None
+
+
+def test_cache_mirror(tmp_path) -> None:
+    """Verify that a mirrored instance gets a valid mirrored solution."""
+    cache = SolutionCache(str(tmp_path))
+    result = solve_instance(3, 3, [0], [0, 1], 2, c, cache=cache)
+    mirrored = cache.get(3, 3, [2], [1, 2], 2, c)
+
+    assert mirrored is not None
+    assert mirrored.cost == result.cost
+    assert mirrored.blueprint != result.blueprint
+
+    # The mirrored assignment must be a solution of the mirrored problem
+    G = build_graph(3, 3, [2], [1, 2], 2)
+    problem, *variables = build_problem(G, c)
+
+    for (name, var_dict) in zip("tusxy", variables):
+        for (key, variable) in var_dict.items():
+            variable.varValue = mirrored.assignment[name].get(key, 0)
+
+    assert problem.valid(eps=1e-6)
+
+
+def test_cache_eviction(tmp_path) -> None:
+    """Verify that the least recently used entries are evicted."""
+    cache = SolutionCache(str(tmp_path), max_entries=1)
+
+    solve_instance(2, 2, [0], [0, 1], 2, c, cache=cache)
+    solve_instance(3, 2, [0], [0, 1], 2, c, cache=cache)
+
+    assert cache.get(2, 2, [0], [0, 1], 2, c) is None
+    assert cache.get(3, 2, [0], [0, 1], 2, c) is not None
+
+
+def test_cache_imports() -> None:
+    """Verify that cache hits don't have to import the solver and graph libraries."""
+    code = (
+        "import sys, main; "
+        "print(sorted({'matplotlib', 'pulp', 'networkx', 'numpy'} & set(sys.modules)))"
+    )
+    process = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.dirname(__file__)),
+    )
+
+    assert process.stdout.strip() == "[]"
@@ -0,0 +1,62 @@
+import pytest
+
+from factorizer.compose import (
+    choose_factors,
+    compose_balancer,
+    layout_cost,
+    route_lanes,
+    sort_rounds,
+)
+from factorizer.simulate import simulate, verify_blueprint
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+
+def test_choose_factors() -> None:
+    """Split balancers into the smallest blocks with enough outputs."""
+    assert choose_factors(4, 4) == (2, 2)
+    assert choose_factors(1, 4) == (1, 2)
+    assert choose_factors(16, 16) == (4, 4)
+
+    with pytest.raises(ValueError):
+        choose_factors(3, 3)
+
+
+def test_sort_rounds() -> None:
+    """Sort the lanes by swapping two lanes at the edge of each window."""
+    targets = [0, 2, 4, 6, 1, 3, 5, 7]
+    rows = list(targets)
+
+    for changes in sort_rounds(targets, 4):
+        for (low, before, after) in changes:
+            assert rows[low : low + len(before)] == before
+            swapped = [k for (k, (x, y)) in enumerate(zip(before, after)) if x != y]
+            assert swapped in ([0, 1], [2, 3])
+            rows[low : low + len(before)] = after
+
+    assert rows == sorted(targets)
+
+
+def test_route_lanes() -> None:
+    """Swap two lanes without splitters."""
+    solution = route_lanes({0: 1, 1: 0}, 3, 3, c)
+    simulation = simulate(solution)
+
+    assert simulation.shares.tolist() == [[0, 1], [1, 0]]
+    assert simulation.leaked.tolist() == [0, 0]
+
+
+def test_compose_balancer() -> None:
+    """Compose a 4x4 balancer of 2x2 balancers that verifies as balancer."""
+    (result, solution) = compose_balancer(4, 4, 4, c)
+
+    assert result.status == "Feasible"
+    assert (result.m, result.B, result.E) == (4, [0, 1, 2, 3], [0, 1, 2, 3])
+    assert result.cost == layout_cost(solution, c)
+    assert simulate(solution).problems() == []
+    assert (
+        verify_blueprint(
+            result.blueprint, result.n, result.m, result.B, result.E, result.R
+        ).problems()
+        == []
+    )
@@ -6,7 +6,7 @@ def test_build_graph() -> None:
     n, m = 3, 3
     B = [1]
     E = [1, 2]
-    R = range(1, 3)
+    R = 2
 
     G = build_graph(n, m, B, E, R)
 
@@ -0,0 +1,40 @@
+from factorizer.graph import build_graph
+from factorizer.grid import GridGraph, build_grid_graph
+from factorizer.utils import dir_out_edge, dir_in_edge, splitter_out_edge
+
+
+def test_build_grid_graph() -> None:
+    """Verify that the compact graph has the same nodes and arcs as the networkx graph."""
+    G = build_graph(4, 3, [1], [0, 2], 3)
+    H = build_grid_graph(4, 3, [1], [0, 2], 3)
+
+    assert list(H.nodes) == list(G.nodes)
+    assert list(H.edges) == list(G.edges)
+
+    for v in G.nodes:
+        assert H.nodes[v] == G.nodes[v]
+        assert H.out_edges(v) == list(G.out_edges(v))
+        assert H.in_edges(v) == list(G.in_edges(v))
+
+        for d in ["right", "left", "up", "down"]:
+            for r in range(1, 4):
+                assert dir_out_edge(H, v, d, r) == dir_out_edge(G, v, d, r)
+                assert dir_in_edge(H, v, d, r) == dir_in_edge(G, v, d, r)
+
+        for f in ["left", "right"]:
+            assert splitter_out_edge(H, v, f) == splitter_out_edge(G, v, f)
+
+    for a in G.edges:
+        assert H.edges[a] == G.edges[a]
+
+    assert H.start_edges() == [((-1, 1), (0, 1))]
+    assert H.end_edges() == [((3, 0), (4, 0)), ((3, 2), (4, 2))]
+
+
+def test_grid_graph_conversion() -> None:
+    """Verify that converting to networkx and back preserves the graph."""
+    G = build_graph(3, 3, [0, 1], [1, 2], 2)
+    H = GridGraph.from_networkx(G)
+
+    assert list(H.edges) == list(G.edges)
+    assert list(H.to_networkx().edges(data=True)) == list(G.edges(data=True))
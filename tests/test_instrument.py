@@ -0,0 +1,60 @@
+from factorizer.graph import build_graph
+from factorizer.instrument import Instrumentation, parse_cbc_log
+from factorizer.problem import ModelReport, build_problem
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+CBC_LOG = """Cbc0012I Integer solution of 103.5 found by feasibility pump after 0 iterations and 0 nodes (0.64 seconds)
+Cbc0010I After 0 nodes, 1 on tree, 103.5 best solution, best possible 97.717041 (4.11 seconds)
+Cbc0012I Integer solution of 100.5 found by DiveCoefficient after 9262 iterations and 2 nodes (4.31 seconds)
+Result - Stopped on time limit
+
+Objective value:                100.50000000
+Lower bound:                    97.717
+Gap:                            0.03
+Enumerated nodes:               4
+Total iterations:               9300
+Time (CPU seconds):             4.30
+Time (Wallclock seconds):       4.44
+
+Total time (CPU seconds):       4.30   (Wallclock seconds):       4.44
+"""
+
+
+def test_parse_cbc_log() -> None:
+    """Verify that the solver statistics are read from the CBC log."""
+    stats = parse_cbc_log(CBC_LOG)
+
+    assert stats["result"] == "Stopped on time limit"
+    assert stats["objective"] == 100.5
+    assert stats["lower_bound"] == 97.717
+    assert stats["gap"] == 0.03
+    assert stats["nodes"] == 4
+    assert stats["iterations"] == 9300
+    assert stats["wall_time"] == 4.44
+    assert stats["first_incumbent"] == 103.5
+    assert stats["time_to_first_incumbent"] == 0.64
+    assert stats["incumbents"] == 2
+
+
+def test_phases(tmp_path) -> None:
+    """Verify that the phases are measured and profiled."""
+    instrumentation = Instrumentation(profile_dir=str(tmp_path))
+
+    with instrumentation.phase("graph"):
+        G = build_graph(3, 2, [0], [0, 1], 2)
+
+    with instrumentation.phase("problem"):
+        report = ModelReport()
+        build_problem(G, c, presolve=True, strengthen=True, report=report)
+
+    assert list(instrumentation.phases) == ["graph", "problem"]
+    assert instrumentation.phases["problem"]["wall_time"] > 0
+    assert (tmp_path / "problem.prof").exists()
+
+    # Every row belongs to a family
+    families = report.families.values()
+
+    assert sum(family["rows"] for family in families) == report.constraints
+    assert sum(family["nonzeros"] for family in families) == report.nonzeros
+    assert "flow_cover" in report.families
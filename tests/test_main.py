@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        ["--grid", "2-3x2", "--matrix"],
+        ["--portfolio", "2", "--anytime"],
+        ["--compose", "--aggregate"],
+        ["--grid", "2-3x2", "--template", "--break-symmetry"],
+    ],
+)
+def test_unsupported_options(options) -> None:
+    """Verify that options that a mode would ignore are rejected."""
+    process = subprocess.run(
+        [sys.executable, "main.py", "--balancer", "1x2", *options],
+        capture_output=True,
+        cwd=ROOT,
+        text=True,
+    )
+
+    assert process.returncode == 2
+    assert "can't be combined" in process.stderr
+
+
+def test_anytime_without_time(tmp_path) -> None:
+    """Verify that --anytime reports a run without any round."""
+    process = subprocess.run(
+        [
+            sys.executable,
+            os.path.join(ROOT, "main.py"),
+            *("--balancer", "1x2", "--grid", "3x2", "--anytime"),
+            *("--time-limit", "0", "--no-cache", "--no-model-cache"),
+        ],
+        capture_output=True,
+        cwd=tmp_path,
+        text=True,
+    )
+
+    assert process.returncode == 0, process.stderr
+    assert "Not Solved" in process.stdout
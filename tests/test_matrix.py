@@ -0,0 +1,56 @@
+from collections import Counter
+
+from factorizer.graph import build_graph
+from factorizer.matrix import build_matrix_problem
+from factorizer.problem import build_problem
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+
+def test_matrix_problem_equivalence() -> None:
+    """Verify that the sparse problem has the same rows and columns as the PuLP problem."""
+    G = build_graph(4, 3, [1], [0, 1, 2], 3)
+
+    problem, *_ = build_problem(G, c)
+    matrix, *_ = build_matrix_problem(G, c)
+
+    # Compare the columns by their names
+    variables = {v.name: v for v in problem.variables()}
+    objective = {v.name: coefficient for (v, coefficient) in problem.objective.items()}
+
+    assert sorted(variables) == sorted(
+        matrix.column_name(i) for i in range(matrix.num_cols)
+    )
+
+    for i in range(matrix.num_cols):
+        variable = variables[matrix.column_name(i)]
+
+        assert matrix.objective[i] == objective.get(variable.name, 0)
+        assert matrix.integer[i] == (variable.cat == "Integer")
+        assert matrix.upper[i] == (variable.upBound or float("inf"))
+
+    # Compare the rows as multisets, because the order of the coefficients differs
+    expected = Counter(
+        (
+            tuple(sorted((v.name, float(a)) for (v, a) in constraint.items())),
+            constraint.sense,
+            float(-constraint.constant),
+        )
+        for constraint in problem.constraints.values()
+    )
+
+    coefficients = {}
+
+    for (row, col, val) in zip(matrix.rows, matrix.cols, matrix.vals):
+        coefficients.setdefault(row, []).append((matrix.column_name(col), float(val)))
+
+    actual = Counter(
+        (
+            tuple(sorted(coefficients.get(i, []))),
+            int(matrix.sense[i]),
+            float(matrix.rhs[i]),
+        )
+        for i in range(matrix.num_rows)
+    )
+
+    assert actual == expected
@@ -0,0 +1,74 @@
+import os
+
+from factorizer.graph import build_graph
+from factorizer.models import Model, ModelCache, model_key
+from factorizer.problem import ModelReport, build_problem
+from factorizer.solve import solve_instance
+from factorizer.solvers import SolverConfig, make_solver
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+
+def test_model_cache_round_trip(tmp_path) -> None:
+    """Verify that a loaded problem solves to the same optimum as the built one."""
+    cache = ModelCache(str(tmp_path))
+    key = model_key(3, 2, [0], [0, 1], 2, c)
+    G = build_graph(3, 2, [0], [0, 1], 2)
+    report = ModelReport()
+    problem, *variables = build_problem(G, c, report=report)
+
+    assert cache.get(key) is None
+
+    cache.put(key, Model(G, problem, tuple(variables), report))
+    model = cache.get(key)
+
+    assert model is not None
+    assert model.report.variables == report.variables
+
+    problem.solve(make_solver(SolverConfig()))
+    model.problem.solve(make_solver(SolverConfig()))
+
+    assert model.problem.objective.value() == problem.objective.value()
+    # The variable dicts hold the solution of the loaded problem
+    assert all(
+        variable.value() is not None
+        for var_dict in model.variables
+        for variable in var_dict.values()
+    )
+
+
+def test_model_key() -> None:
+    """Verify that the key depends on the instance and the options."""
+    key = model_key(3, 2, [0], [0, 1], 2, c)
+
+    assert key == model_key(3, 2, [0], [0, 1], 2, dict(c))
+    assert key != model_key(3, 2, [0], [0, 1], 3, c)
+    assert key != model_key(3, 2, [0], [0, 1], 2, c, strengthen=True)
+    assert key != model_key(3, 2, [0], [0, 1], 2, c, presolve=False)
+    assert key != model_key(3, 2, [0], [0, 1], 2, c, break_symmetry=True)
+
+
+def test_model_cache_corrupt(tmp_path) -> None:
+    """Verify that a corrupt entry is removed instead of loaded."""
+    cache = ModelCache(str(tmp_path))
+    key = model_key(3, 2, [0], [0, 1], 2, c)
+    path = cache._path(key)
+    os.makedirs(os.path.dirname(path))
+
+    with open(path, "wb") as file:
+        file.write(b"not a pickle")
+
+    assert cache.get(key) is None
+    assert not os.path.exists(path)
+
+
+def test_solve_with_model_cache(tmp_path) -> None:
+    """Verify that solving an instance again loads its problem instead of building it."""
+    cache = ModelCache(str(tmp_path))
+    result = solve_instance(3, 2, [0], [0, 1], 2, c, model_cache=cache)
+    loaded = solve_instance(3, 2, [0], [0, 1], 2, c, model_cache=cache)
+
+    assert "problem" in result.times
+    assert "problem" not in loaded.times
+    assert "model_cache" in loaded.times
+    assert loaded.cost == result.cost
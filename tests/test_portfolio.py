@@ -0,0 +1,48 @@
+from factorizer.portfolio import default_portfolio, race
+from factorizer.solve import solve_instance
+from factorizer.solvers import SolverConfig
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+
+def test_default_portfolio() -> None:
+    """Verify that the members differ in seed and formulation."""
+    members = default_portfolio(4, SolverConfig(seed=10, time_limit=60))
+
+    assert [member.solver.seed for member in members] == [10, 11, 12, 13]
+    assert [member.strengthen for member in members] == [False, True, False, True]
+    assert all(member.solver.threads == 1 for member in members)
+    assert all(member.solver.time_limit == 60 for member in members)
+
+    strengthened = default_portfolio(2, strengthen=True)
+    assert [member.strengthen for member in strengthened] == [True, True]
+
+
+def test_race() -> None:
+    """Verify that the race finds the optimum of a single solve."""
+    expected = solve_instance(3, 3, [0], [0, 1], 2, c)
+    result = race(3, 3, [0], [0, 1], 2, c, default_portfolio(2))
+
+    assert result.status == "Optimal"
+    assert result.cost == expected.cost
+    assert result.blueprint is not None
+    assert result.backend in [member.describe() for member in default_portfolio(2)]
+
+
+def test_race_options() -> None:
+    """Verify that the members build their problems with the options of the race."""
+    expected = solve_instance(3, 3, [1], [0, 2], 2, c)
+    result = race(
+        3,
+        3,
+        [1],
+        [0, 2],
+        2,
+        c,
+        default_portfolio(2),
+        presolve=False,
+        break_symmetry=True,
+    )
+
+    assert result.status == "Optimal"
+    assert result.cost == expected.cost
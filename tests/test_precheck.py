@@ -0,0 +1,54 @@
+from factorizer.graph import build_graph
+from factorizer.precheck import check_instance
+from factorizer.solve import solve_instance
+from factorizer.utils import centered_tiles
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+
+def _graph(belt_n: int, belt_m: int, n: int, m: int, R: int):
+    return build_graph(n, m, centered_tiles(m, belt_n), centered_tiles(m, belt_m), R)
+
+
+def test_more_inputs_than_outputs() -> None:
+    """An instance with more inputs than outputs is infeasible."""
+    check = check_instance(_graph(2, 1, 3, 2, 2), c)
+
+    assert not check.feasible
+    assert "inputs" in check.reason
+
+
+def test_splitters_do_not_fit() -> None:
+    """The splitters can't be in the last column."""
+    check = check_instance(_graph(2, 2, 1, 2, 2), c)
+
+    assert not check.feasible
+    assert not check.can_beat(None)
+
+
+def test_lower_bound() -> None:
+    """The lower bound doesn't exceed the optimal cost."""
+    for (belt_n, belt_m, n, m, R, optimum) in [
+        (1, 2, 3, 2, 2, 32.5),
+        (2, 2, 2, 2, 2, 29.5),
+    ]:
+        check = check_instance(_graph(belt_n, belt_m, n, m, R), c)
+
+        assert check.feasible
+        assert 0 < check.lower_bound <= optimum
+        assert check.can_beat(optimum)
+        assert not check.can_beat(check.lower_bound)
+
+
+def test_solve_instance_precheck() -> None:
+    """Infeasible and hopeless instances are not solved."""
+    B = centered_tiles(2, 2)
+    E = centered_tiles(2, 2)
+
+    result = solve_instance(1, 2, B, E, 2, c)
+    assert result.status == "Infeasible"
+    assert "problem" not in result.times
+
+    result = solve_instance(2, 2, B, E, 2, c, cutoff=1)
+    assert result.status == "Skipped"
+    assert result.lower_bound is not None
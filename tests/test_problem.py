@@ -0,0 +1,89 @@
+from pulp import PULP_CBC_CMD, LpStatus, value
+
+from factorizer.graph import build_graph
+from factorizer.problem import ModelReport, build_problem, is_mirror_symmetric
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+
+def test_presolve() -> None:
+    """Verify that presolve shrinks the problem without changing the optimum."""
+    objectives = []
+    reports = []
+
+    for presolve in [False, True]:
+        G = build_graph(3, 3, [0], [0, 1], 3)
+        report = ModelReport()
+        problem, *_ = build_problem(G, c, presolve=presolve, report=report)
+
+        assert report.variables == len(problem.variables())
+        assert report.constraints == len(problem.constraints)
+
+        problem.solve(PULP_CBC_CMD(msg=False))
+
+        assert LpStatus[problem.status] == "Optimal"
+
+        objectives.append(value(problem.objective))
+        reports.append(report)
+
+    (full, reduced) = reports
+
+    assert objectives[0] == objectives[1]
+    assert reduced.variables + reduced.pruned_variables == full.variables
+    assert reduced.constraints < full.constraints
+    assert reduced.duplicate_constraints > 0
+
+
+def test_presolve_missing_variables() -> None:
+    """Verify that pruned variables read as 0."""
+    G = build_graph(3, 2, [0], [0, 1], 3)
+    (_, t, u, s, x, y) = build_problem(G, c, presolve=True)
+
+    # There is no splitter fragment on the last column
+    assert ((2, 0), "right") not in s
+    assert s[(2, 0), "right"].value() == 0
+
+
+def test_strengthen() -> None:
+    """Verify that the strengthened formulation has the same optimum."""
+    for (n, m, B, E) in [(3, 3, [0], [0, 1]), (3, 3, [0, 1], [0, 1])]:
+        objectives = []
+
+        for strengthen in [False, True]:
+            G = build_graph(n, m, B, E, 3)
+            problem, *_ = build_problem(G, c, presolve=True, strengthen=strengthen)
+            problem.solve(PULP_CBC_CMD(msg=False))
+
+            assert LpStatus[problem.status] == "Optimal"
+
+            objectives.append(value(problem.objective))
+
+        assert objectives[0] == objectives[1]
+
+
+def test_break_symmetry() -> None:
+    """Verify that symmetry breaking keeps the optimum of mirrored instances."""
+    assert is_mirror_symmetric(build_graph(4, 2, [0, 1], [0, 1], 2))
+    assert is_mirror_symmetric(build_graph(4, 3, [1], [0, 2], 2))
+    assert not is_mirror_symmetric(build_graph(3, 2, [0], [0, 1], 2))
+
+    for (n, m, B, E, symmetric) in [
+        (4, 2, [0, 1], [0, 1], True),
+        (3, 2, [0], [0, 1], False),
+    ]:
+        objectives = []
+
+        for break_symmetry in [False, True]:
+            G = build_graph(n, m, B, E, 2)
+            report = ModelReport()
+            problem, *_ = build_problem(
+                G, c, presolve=True, report=report, break_symmetry=break_symmetry
+            )
+            problem.solve(PULP_CBC_CMD(msg=False))
+
+            assert LpStatus[problem.status] == "Optimal"
+            assert ("symmetry" in report.families) == (symmetric and break_symmetry)
+
+            objectives.append(value(problem.objective))
+
+        assert objectives[0] == objectives[1]
@@ -0,0 +1,41 @@
+import xml.etree.ElementTree as ElementTree
+
+from pulp import PULP_CBC_CMD
+
+from factorizer.graph import build_graph
+from factorizer.problem import build_problem
+from factorizer.solution import decode_solution
+from factorizer.visualization.render import render_ascii, render_svg
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+
+def _solution(n, m, B, E, R):
+    G = build_graph(n, m, B, E, R)
+    (problem, *variables) = build_problem(G, c)
+    problem.solve(PULP_CBC_CMD(msg=False))
+
+    return decode_solution(G, *variables)
+
+
+def test_render_ascii() -> None:
+    """Verify the text rendering of a 1x2 balancer."""
+    solution = _solution(3, 2, [0], [0, 1], 2)
+
+    assert render_ascii(solution) == "  .s> > E\nB >s> > E\n"
+
+    lines = render_ascii(solution, flows=True).splitlines()
+    assert "Flows of 0:" in lines
+    assert "  (-1, 0) -> (0, 0): 2" in lines
+
+
+def test_render_svg() -> None:
+    """Verify that the image is valid SVG with a label for every used arc."""
+    solution = _solution(3, 4, [1, 2], [0, 1, 2, 3], 3)
+    root = ElementTree.fromstring(render_svg(solution))
+    texts = [element.text for element in root.iter("{http://www.w3.org/2000/svg}text")]
+
+    assert root.get("width") == str(5 * 40)
+    assert sorted(texts) == sorted(
+        list(solution.flow_labels().values()) + ["B"] * 2 + ["E"] * 4
+    )
@@ -0,0 +1,188 @@
+import asyncio
+import json
+import os
+from typing import Dict, Tuple
+
+import pytest
+
+from server import SolverService
+from tests.test_anytime import _group_alive, _wait_until
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+
+async def _raw_request(address, request: bytes) -> Tuple:
+    (reader, writer) = await asyncio.open_connection(*address)
+    writer.write(request)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+
+    (head, _, payload) = response.partition(b"\r\n\r\n")
+
+    return int(head.split()[1]), json.loads(payload)
+
+
+async def _request(address, method: str, path: str, body: bytes = b"") -> Tuple:
+    head = f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n"
+
+    return await _raw_request(address, head.encode() + body)
+
+
+def _run(requests, max_queue: int = 4) -> Dict:
+    """Answer the requests of a service on a free port."""
+
+    async def run() -> Dict:
+        service = SolverService(workers=1, max_queue=max_queue)
+        ready = asyncio.get_running_loop().create_future()
+        task = asyncio.ensure_future(service.serve(port=0, ready=ready))
+        address = await ready
+
+        try:
+            return await requests(address)
+        finally:
+            task.cancel()
+
+    return asyncio.run(run())
+
+
+def test_service() -> None:
+    """Solve an instance on a worker and report it in the metrics."""
+
+    async def requests(address) -> Dict:
+        spec = {"balancer": "1x2", "grid": "3x2", "R": 2}
+        body = json.dumps(spec).encode()
+
+        return {
+            "health": await _request(address, "GET", "/health"),
+            "solve": await _request(address, "POST", "/solve", body),
+            "again": await _request(address, "POST", "/solve", body),
+            "metrics": await _request(address, "GET", "/metrics"),
+        }
+
+    responses = _run(requests)
+
+    assert responses["health"] == (200, responses["health"][1])
+    assert responses["health"][1]["status"] == "ok"
+
+    (code, result) = responses["solve"]
+    assert code == 200
+    assert result["status"] == "Optimal"
+    assert result["blueprint"]
+    assert "problem" in result["times"]
+
+    # The worker keeps the problem of the instance
+    (code, result) = responses["again"]
+    assert code == 200
+    assert result["status"] == "Optimal"
+    assert "problem" not in result["times"]
+
+    (code, metrics) = responses["metrics"]
+    assert code == 200
+    assert metrics["jobs"] == 2
+    assert metrics["statuses"] == {"Optimal": 2}
+    assert metrics["requests"] == 4
+
+
+def test_bad_requests() -> None:
+    """Answer unknown paths, wrong methods and invalid specs with errors."""
+
+    async def requests(address) -> Dict:
+        return {
+            "path": await _request(address, "GET", "/unknown"),
+            "method": await _request(address, "GET", "/solve"),
+            "json": await _request(address, "POST", "/solve", b"{"),
+            "spec": await _request(address, "POST", "/solve", b'{"grid": "3x2"}'),
+            "size": await _request(
+                address, "POST", "/solve", b'{"balancer": "1x2", "grid": "abc"}'
+            ),
+            "R": await _request(
+                address,
+                "POST",
+                "/solve",
+                b'{"balancer": "1x2", "grid": "3x2", "R": "two"}',
+            ),
+            "solver": await _request(
+                address,
+                "POST",
+                "/solve",
+                b'{"balancer": "1x2", "grid": "3x2", "solver": "foo"}',
+            ),
+            "costs": await _request(
+                address,
+                "POST",
+                "/solve",
+                json.dumps(
+                    {"balancer": "1x2", "grid": "3x2", "costs": {**c, "x": "a"}}
+                ).encode(),
+            ),
+            "length": await _raw_request(
+                address, b"POST /solve HTTP/1.1\r\nContent-Length: -1\r\n\r\n"
+            ),
+            "metrics": await _request(address, "GET", "/metrics"),
+        }
+
+    responses = _run(requests)
+
+    (_, metrics) = responses.pop("metrics")
+
+    assert {key: code for (key, (code, _)) in responses.items()} == {
+        "path": 404,
+        "method": 405,
+        "json": 400,
+        "spec": 400,
+        "size": 400,
+        "R": 400,
+        "solver": 400,
+        "costs": 400,
+        "length": 400,
+    }
+    # The invalid specs never reach a worker
+    assert metrics["jobs"] == 0
+    assert metrics["errors"] == 0
+
+
+def test_queue_limit() -> None:
+    """Reject jobs beyond the running and waiting ones."""
+
+    async def requests(address) -> Dict:
+        body = json.dumps({"balancer": "2x2", "grid": "2x2", "R": 2}).encode()
+        responses = await asyncio.gather(
+            *(_request(address, "POST", "/solve", body) for _ in range(3))
+        )
+        (_, metrics) = await _request(address, "GET", "/metrics")
+
+        return {"codes": sorted(code for (code, _) in responses), **metrics}
+
+    responses = _run(requests, max_queue=1)
+
+    assert responses["codes"] == [200, 200, 503]
+    assert responses["rejected"] == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "setsid"), reason="Needs process groups")
+def test_shutdown_kills_jobs() -> None:
+    """Kill the running jobs together with their solvers when the service stops."""
+
+    async def run():
+        service = SolverService(workers=1)
+        ready = asyncio.get_running_loop().create_future()
+        task = asyncio.ensure_future(service.serve(port=0, ready=ready))
+        address = await ready
+
+        # A job that takes minutes
+        body = json.dumps({"balancer": "2x4", "grid": "6x4", "R": 4}).encode()
+        request = asyncio.ensure_future(_request(address, "POST", "/solve", body))
+        await asyncio.sleep(3)
+        groups = service._worker_groups()
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        return groups, await request
+
+    (groups, (code, _)) = asyncio.run(run())
+
+    assert code == 503
+    assert groups
+    assert _wait_until(lambda: not any(_group_alive(pgid) for pgid in groups))
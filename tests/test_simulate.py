@@ -0,0 +1,127 @@
+import numpy as np
+from pulp import PULP_CBC_CMD
+
+from factorizer.graph import build_graph
+from factorizer.problem import build_problem
+from factorizer import simulate as simulate_module
+from factorizer.simulate import simulate, verify_blueprint
+from factorizer.solution import decode_solution, solution_from_blueprint
+from factorizer.visualization.blueprint import (
+    construct_blueprint_data,
+    convert_to_blueprint,
+    direction_to_index,
+    parse_blueprint,
+)
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+
+def _solution(n, m, B, E, R):
+    G = build_graph(n, m, B, E, R)
+    (problem, *variables) = build_problem(G, c)
+    problem.solve(PULP_CBC_CMD(msg=False))
+
+    return decode_solution(G, *variables)
+
+
+def _belts(belts):
+    return {
+        "blueprint": {
+            "entities": [
+                {
+                    "name": "transport-belt",
+                    "position": {"x": x, "y": y},
+                    "direction": direction_to_index(d),
+                }
+                for (x, y, d) in belts
+            ]
+        }
+    }
+
+
+def test_simulate_balancer() -> None:
+    """Verify that solved layouts and their blueprints are balancers."""
+    for (n, m, B, E, R) in [(3, 2, [0], [0, 1], 2), (3, 4, [1, 2], [0, 1, 2, 3], 3)]:
+        solution = _solution(n, m, B, E, R)
+        simulation = simulate(solution)
+
+        assert simulation.problems() == []
+        assert np.allclose(simulation.shares, 1 / len(E))
+        assert simulation.max_load == 1
+
+        blueprint = convert_to_blueprint(solution)
+        assert verify_blueprint(blueprint, n, m, B, E, R).balanced
+
+
+def test_solution_from_blueprint() -> None:
+    """Verify that the entities of a blueprint match the decoded solution."""
+    solution = _solution(3, 4, [1, 2], [0, 1, 2, 3], 3)
+    data = parse_blueprint(convert_to_blueprint(solution))
+    parsed = solution_from_blueprint(data, 3, 4, [1, 2], [0, 1, 2, 3], 3)
+
+    assert np.array_equal(parsed.entity, solution.entity)
+    assert np.array_equal(parsed.direction, solution.direction)
+
+
+def test_simulate_unbalanced() -> None:
+    """Verify that missing splitters and straight belts are detected."""
+    solution = _solution(3, 2, [0], [0, 1], 2)
+    data = construct_blueprint_data(solution)
+    data["blueprint"]["entities"] = [
+        entity
+        for entity in data["blueprint"]["entities"]
+        if entity["name"] != "splitter"
+    ]
+    simulation = simulate(solution_from_blueprint(data, 3, 2, [0], [0, 1], 2))
+
+    assert not simulation.balanced
+    assert simulation.leaked[0] == 1
+
+    # Two inputs that are passed straight through
+    straight = _belts([(x, y, "right") for x in range(2) for y in range(2)])
+    simulation = simulate(solution_from_blueprint(straight, 2, 2, [0, 1], [0, 1], 2))
+
+    assert simulation.leaked.tolist() == [0, 0]
+    assert simulation.shares.tolist() == [[1, 0], [0, 1]]
+    assert "Output 0 gets 1.000 of input 0 instead of 0.500." in simulation.problems()
+
+
+def test_simulate_loop() -> None:
+    """Verify that items going around in circles are reported."""
+    loop = _belts([(0, 0, "up"), (0, 1, "right"), (1, 1, "down"), (1, 0, "left")])
+    simulation = simulate(solution_from_blueprint(loop, 2, 2, [0], [0], 2))
+
+    assert simulation.errors == ["Items circle in a loop forever."]
+    assert not simulation.balanced
+
+
+def test_simulate_propagate(monkeypatch) -> None:
+    """Verify that pushing the items along the arcs matches the dense solve."""
+    solution = _solution(3, 4, [1, 2], [0, 1, 2, 3], 3)
+    straight = solution_from_blueprint(
+        _belts([(x, y, "right") for x in range(2) for y in range(2)]),
+        2,
+        2,
+        [0, 1],
+        [0, 1],
+        2,
+    )
+    loop = solution_from_blueprint(
+        _belts([(0, 0, "up"), (0, 1, "right"), (1, 1, "down"), (1, 0, "left")]),
+        2,
+        2,
+        [0],
+        [0],
+        2,
+    )
+    dense = [simulate(layout) for layout in (solution, straight, loop)]
+
+    monkeypatch.setattr(simulate_module, "MAX_DENSE_NODES", 0)
+
+    for (layout, expected) in zip((solution, straight, loop), dense):
+        simulation = simulate(layout)
+
+        assert np.allclose(simulation.shares, expected.shares)
+        assert np.allclose(simulation.leaked, expected.leaked)
+        assert simulation.max_load == expected.max_load
+        assert simulation.errors == expected.errors
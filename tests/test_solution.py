@@ -0,0 +1,78 @@
+import numpy as np
+from pulp import PULP_CBC_CMD
+
+from factorizer.graph import build_graph
+from factorizer.matrix import MatrixVariable
+from factorizer.problem import build_problem
+from factorizer.solution import (
+    SPLITTER_LEFT,
+    SPLITTER_RIGHT,
+    TRANSPORT,
+    decode_solution,
+)
+from factorizer.utils import build_edge_index
+from factorizer.visualization.blueprint import convert_to_blueprint
+from factorizer.visualization.graph import build_solution_graph
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+
+def _solve(n, m, B, E, R):
+    G = build_graph(n, m, B, E, R)
+    (problem, *variables) = build_problem(G, c)
+    problem.solve(PULP_CBC_CMD(msg=False))
+
+    return G, variables
+
+
+def test_decode_solution() -> None:
+    """Verify the entities and flows of a 1x2 balancer."""
+    (G, variables) = _solve(3, 2, [0], [0, 1], 2)
+    solution = decode_solution(G, *variables)
+
+    assert solution.entity.shape == (3, 2)
+    assert (solution.entity == SPLITTER_LEFT).sum() == 1
+    assert (solution.entity == SPLITTER_RIGHT).sum() == 1
+
+    for (a, flows) in solution.used_arcs():
+        # Every belt carries one whole or half of the input
+        assert flows[0] in (1, 2)
+
+    # Every used belt tile has a direction
+    belts = solution.entity == TRANSPORT
+    assert (solution.direction[belts] >= 0).all()
+
+
+def test_decode_solution_tolerance() -> None:
+    """Verify that values that are almost integral decode the same."""
+    (G, variables) = _solve(3, 3, [0], [0, 1, 2], 3)
+    inexact = [
+        {
+            key: MatrixVariable((variable.value() or 0) * (1 - 1e-7))
+            for (key, variable) in dict(values).items()
+        }
+        for values in variables
+    ]
+
+    exact = decode_solution(G, *variables)
+    decoded = decode_solution(G, *inexact)
+
+    assert np.array_equal(decoded.entity, exact.entity)
+    assert np.array_equal(decoded.flows, exact.flows)
+    assert convert_to_blueprint(decoded) == convert_to_blueprint(exact)
+
+    labels = build_solution_graph(G, decoded).edges(data="edge_labels")
+    assert list(labels) == list(
+        build_solution_graph(G, exact).edges(data="edge_labels")
+    )
+
+
+def test_build_solution_graph_attributes() -> None:
+    """Verify that the solution graph only gets the instance attributes of G."""
+    (G, variables) = _solve(3, 2, [0], [0, 1], 2)
+    build_edge_index(G)
+    H = build_solution_graph(G, decode_solution(G, *variables))
+
+    assert "out_index" not in H.graph
+    assert "in_index" not in H.graph
+    assert H.graph == {key: G.graph[key] for key in ("name", "n", "m", "B", "E", "R")}
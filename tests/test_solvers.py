@@ -0,0 +1,43 @@
+import pytest
+
+from factorizer.solve import solve_instance
+from factorizer.solvers import SolverConfig, cbc_arguments, make_solver
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+
+def test_make_solver() -> None:
+    """Verify that the settings are passed to the solver."""
+    config = SolverConfig("cbc", threads=2, time_limit=10, gap_rel=0.01, seed=5)
+    solver = make_solver(config, warm_start=True)
+
+    assert solver.optionsDict["threads"] == 2
+    assert solver.optionsDict["gapRel"] == 0.01
+    assert solver.optionsDict["warmStart"]
+    assert solver.timeLimit == 10
+    assert "randomSeed 5" in solver.options
+
+    assert cbc_arguments(config) == [
+        "threads",
+        "2",
+        "sec",
+        "10",
+        "ratioGap",
+        "0.01",
+        "randomSeed",
+        "5",
+        "randomCbcSeed",
+        "5",
+    ]
+
+    with pytest.raises(ValueError):
+        make_solver(SolverConfig("unknown"))
+
+
+def test_solve_with_config() -> None:
+    """Verify that the backend of a result is recorded."""
+    config = SolverConfig("cbc", threads=1, seed=1)
+    result = solve_instance(3, 2, [0], [0, 1], 2, c, solver=config)
+
+    assert result.status == "Optimal"
+    assert result.backend == "cbc (threads=1, seed=1)"
@@ -0,0 +1,52 @@
+from factorizer.sweep import dominates, sweep, smallest_feasible
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+
+def test_dominates() -> None:
+    """Verify that a grid size dominates exactly the sizes it fits into."""
+    assert dominates((2, 2), (3, 2))
+    assert dominates((2, 2), (2, 2))
+    assert not dominates((3, 2), (2, 3))
+
+
+def test_sweep() -> None:
+    """Verify that the sweep finds the smallest grid and skips impossible heights."""
+    results = sweep(1, 2, range(1, 3), range(1, 3), 2, c, workers=1)
+    statuses = {(result.n, result.m): result.status for result in results}
+
+    assert statuses[1, 1] == "Skipped"
+    assert statuses[2, 1] == "Skipped"
+    assert statuses[1, 2] == "Infeasible"
+
+    best = smallest_feasible(results)
+
+    assert (best.n, best.m) == (2, 2)
+    assert best.blueprint.startswith("0")
+
+
+def test_sweep_options() -> None:
+    """Verify that the formulation options reach the solves of the sweep."""
+    results = sweep(
+        1,
+        2,
+        range(2, 4),
+        range(2, 4),
+        2,
+        c,
+        workers=1,
+        strengthen=True,
+        break_symmetry=True,
+    )
+    plain = sweep(1, 2, range(2, 4), range(2, 4), 2, c, workers=1)
+
+    # Which larger sizes get cancelled depends on when the smaller ones finish
+    costs = {
+        (result.n, result.m): result.cost
+        for result in results
+        if result.status != "Cancelled"
+    }
+    for result in plain:
+        if result.status != "Cancelled" and (result.n, result.m) in costs:
+            assert costs[result.n, result.m] == result.cost
+    assert (2, 2) in costs
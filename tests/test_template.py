@@ -0,0 +1,37 @@
+import pytest
+
+from factorizer.solve import solve_instance
+from factorizer.template import ModelTemplate
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+
+@pytest.mark.parametrize("strengthen", [False, True])
+def test_template(strengthen: bool) -> None:
+    """Verify that the specialised template has the optimum of the instance."""
+    template = ModelTemplate(4, 3, 2, c, strengthen=strengthen)
+
+    # Switch back and forth, to check that the specialisations are independent
+    for (n, m, B, E) in [
+        (3, 2, [0], [0, 1]),
+        (4, 3, [1], [0, 1, 2]),
+        (3, 3, [0, 1], [0, 1]),
+        (4, 3, [1], [1, 2]),
+        (3, 2, [0], [0, 1]),
+    ]:
+        result = template.solve(n, m, B, E)
+        expected = solve_instance(n, m, B, E, 2, c, strengthen=strengthen)
+
+        assert result.status == expected.status
+
+        if expected.feasible:
+            assert result.cost == pytest.approx(expected.cost)
+            assert result.blueprint is not None
+
+
+def test_template_size() -> None:
+    """Verify that larger grids than the template are rejected."""
+    template = ModelTemplate(3, 2, 2, c)
+
+    with pytest.raises(ValueError):
+        template.specialize(4, 2, [0], [0, 1])
@@ -0,0 +1,39 @@
+from factorizer.graph import build_graph
+from factorizer.utils import dir_out_edge, dir_in_edge, splitter_out_edge
+
+
+def test_edge_index() -> None:
+    """Verify that the indexed lookups find the same arcs as a scan over the graph."""
+    G = build_graph(4, 3, [1], [0, 1], 3)
+
+    for v in G.nodes:
+        for d in ["right", "left", "up", "down"]:
+            for r in range(1, 4):
+                out_edges = [
+                    a
+                    for a in G.out_edges(v)
+                    if G.edges[a]["d"] == d
+                    and G.edges[a]["r"] == r
+                    and not G.edges[a]["split"]
+                ]
+                in_edges = [
+                    a
+                    for a in G.in_edges(v)
+                    if G.edges[a]["d"] == d
+                    and G.edges[a]["r"] == r
+                    and not G.edges[a]["split"]
+                ]
+
+                assert dir_out_edge(G, v, d, r) == (out_edges[0] if out_edges else None)
+                assert dir_in_edge(G, v, d, r) == (in_edges[0] if in_edges else None)
+
+        for (f, d) in [("right", "up"), ("left", "down")]:
+            split_edges = [
+                a
+                for a in G.out_edges(v)
+                if G.edges[a]["d"] == d and G.edges[a]["split"]
+            ]
+
+            assert splitter_out_edge(G, v, f) == (
+                split_edges[0] if split_edges else None
+            )
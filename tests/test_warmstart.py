@@ -0,0 +1,43 @@
+from factorizer.graph import build_graph
+from factorizer.problem import build_problem
+from factorizer.solve import solve_instance
+from factorizer.visualization.blueprint import parse_blueprint
+from factorizer.warmstart import (
+    apply_warm_start,
+    assignment_from_blueprint,
+    embed_assignment,
+)
+
+c = {"transport": 3, "underground": 14.5, "splitter": 11.75}
+
+
+def test_embed_assignment() -> None:
+    """Verify that an embedded solution is a solution of the larger instance."""
+    result = solve_instance(3, 2, [0], [0, 1], 2, c)
+    embedded = embed_assignment(
+        result.assignment, (3, 2, [0], [0, 1]), (5, 3, [1], [1, 2])
+    )
+
+    G = build_graph(5, 3, [1], [1, 2], 2)
+    problem, t, u, s, x, y = build_problem(G, c)
+
+    assert apply_warm_start(embedded, t, u, s, x, y)
+    assert problem.valid(eps=1e-6)
+    assert problem.objective.value() == result.cost + 2 * 2 * c["transport"]
+
+    # The start and end points don't line up
+    assert (
+        embed_assignment(result.assignment, (3, 2, [0], [0, 1]), (3, 3, [1], [0, 1]))
+        is None
+    )
+
+
+def test_assignment_from_blueprint() -> None:
+    """Verify that the entities of a blueprint are recovered."""
+    result = solve_instance(4, 2, [0, 1], [0, 1], 2, c)
+
+    G = build_graph(4, 2, [0, 1], [0, 1], 2)
+    assignment = assignment_from_blueprint(parse_blueprint(result.blueprint), G)
+
+    for name in "tus":
+        assert assignment[name] == result.assignment[name]